@@ -1,4 +1,5 @@
 from neuronpp.core.cells.core_cell import CoreCell
+from neuronpp.core.cells.cell_template import CellTemplate
 
 from neuronpp.core.decorators import non_removable_fields
 from neuronpp.core.cells.synaptic_spine_cell import SynapticSpineCell
@@ -20,8 +21,8 @@ class Cell(SynapticSpineCell):
            If False and the target path exists, the function will skip the compilation step.
            Default is True.
         :param wait_in_sec:
-           The number of seconds to wait between retries if loading the mechanisms fails.
-           Default is 2 seconds.
+           Not used. Concurrent compilation and loading of MODs is synchronized with file
+           locks. It is left for backward compatibility.
         :param compile_mods_with_random_subfolder:
             if True it will create a random subfolder in the target folder as compiled/random_string/modsNUM.
             if False it will create folder compiled/modsNUM
@@ -30,3 +31,24 @@ class Cell(SynapticSpineCell):
                           override=override, wait_in_sec=wait_in_sec, compile_mods_with_random_subfolder=compile_mods_with_random_subfolder)
         SynapticSpineCell.__init__(self, name)
         self.population = population
+
+    def clone(self, name=None, cell_function=None):
+        """
+        Create a copy of sections and density mechanisms of this cell (see CellTemplate) without
+        re-running its setup code. Point processes, synapses, NetCons and spines are not copied.
+
+        To create many copies use Population.add_clones(), which captures the cell only once.
+
+        :param name:
+            name of the new cell. Default is None, which means the name of this cell (or the name
+            set by cell_function if provided)
+        :param cell_function:
+            Callable function without arguments, which returns a new empty cell (without sections)
+            of the required type, eg. lambda: Hay2011Cell("cell"). Default is None, which means
+            a new Cell object.
+        :return:
+            the new cell
+        """
+        if name is None and cell_function is None:
+            name = self.name
+        return CellTemplate(self).instantiate_cell(name=name, cell_function=cell_function)
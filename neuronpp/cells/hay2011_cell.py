@@ -1,7 +1,5 @@
 import os
 
-import numpy as np
-from neuron import h
 from neuronpp.cells.cell import Cell
 
 path = os.path.dirname(os.path.abspath(__file__))
@@ -165,38 +163,11 @@ class Hay2011Cell(Cell):
             'exp' - exponential
         :return:
         """
-        soma = self.filter_secs(soma_name, as_list=True)
-        if len(soma) != 1:
-            raise LookupError("Central section for channel distribution must be only one for name %s, "
-                              "but found %s sections containing this name." % (soma_name, len(soma)))
-        soma = soma[0]
-        secs = self.filter_secs(name=sections, as_list=True)
-
-        max_dist = max([h.distance(soma(0.5).hoc, s(1).hoc) for s in secs])
-        for sec in secs:
-            for x in sec.hoc:
-                dist = h.distance(soma(0.5).hoc, x)
-                dist_norm = dist/max_dist
-
-                if dist_type == 'lin':
-                    val = s3 + dist_norm * s4
-                elif dist_type == 'sigm':
-                    ex = np.exp((dist_norm - s5) / s6)
-                    sigmoid = s4 / (1 + ex)
-                    val = s3 + sigmoid
-                elif dist_type == 'exp':
-                    val = s3 + s6 * np.exp(s4 * (dist_norm - s5))
-                elif dist_type == 'abs':
-                    if s5 < dist < s6:
-                        val = s3
-                    else:
-                        val = s4
-                else:
-                    raise ValueError("The only allowed dist_type are abs,lin,sigm,exp, but provided %s" % dist_type)
-                val *= s7
-
-                mech_obj = getattr(x, mech)
-                setattr(mech_obj, mech_param, val)
+        # lin, sigm and exp are functions of the distance normalized to the maximal distance
+        self.distribute_mechanism_param(mech=mech, param=mech_param, func=dist_type,
+                                        secs=sections, origin=soma_name,
+                                        normalize=dist_type != 'abs',
+                                        s3=s3, s4=s4, s5=s5, s6=s6, s7=s7)
 
     @staticmethod
     def _adjust_nsec(secs):
@@ -16,8 +16,8 @@ class HocCell(CoreHocCell, Cell):
            If False and the target path exists, the function will skip the compilation step.
            Default is True.
         :param wait_in_sec:
-           The number of seconds to wait between retries if loading the mechanisms fails.
-           Default is 2 seconds.
+           Not used. Concurrent compilation and loading of MODs is synchronized with file
+           locks. It is left for backward compatibility.
         """
         CoreCell.__init__(self, name=name, compile_paths=compile_paths, override=override,
                           wait_in_sec=wait_in_sec)
@@ -0,0 +1,152 @@
+from typing import List
+
+import numpy as np
+from neuron import h
+
+from neuronpp.core.hocwrappers.sec import Sec
+from neuronpp.core.cells.morphology_cache import Morphology
+
+
+class CellTemplate:
+    def __init__(self, cell):
+        """
+        Snapshot of sections and density mechanisms of the built cell, which allows to stamp out
+        copies of the cell without re-running its setup code (loading morphology, inserting
+        mechanisms and setting parameters).
+
+        It captures:
+            * section tree, nseg and geometry (3D points or L and diam of each segment)
+            * Ra of each section and cm of each segment
+            * density mechanisms inserted to each section and values of their PARAMETER range
+              variables for each segment
+            * reversal potentials and concentrations of ions used in each section
+
+        Point processes, synapses, NetCons and spines are not captured. Ion styles (ion_style())
+        are not captured either, they are the default styles after inserting mechanisms.
+
+        :param cell:
+            built cell (SectionCell or its subclass) to capture
+        """
+        if len(getattr(cell, "spines", [])) > 0:
+            raise ValueError("Cell %s has spines, which can't be captured by CellTemplate. "
+                             "Add spines to each copy after instantiation." % cell.name)
+
+        hoc_secs = [sec.hoc for sec in cell.secs]
+        self.morphology = Morphology.from_secs(hoc_secs)
+
+        # True if the Sec name is the full hoc name (eg. created by add_sec()), False if it is
+        # the name without the cell's prefix (eg. created by load_morpho())
+        self.full_names = np.array([sec.name == sec.hoc.name() for sec in cell.secs],
+                                   dtype=bool)
+        self.ra = np.array([sec.Ra for sec in hoc_secs], dtype=float)
+        self.lengths = np.array([sec.L for sec in hoc_secs], dtype=float)
+
+        # names of mechanisms inserted to each section
+        self.mechs = []
+        # list of (range variable name, values for each segment) of each section. Values are
+        # a single float if they are the same for all segments of the section
+        self.values = []
+        param_names = {}
+        for sec in hoc_secs:
+            segs = list(sec)
+            mechs = [m.name() for m in segs[0] if not m.is_ion()]
+            ions = [m.name()[:-len("_ion")] for m in segs[0] if m.is_ion()]
+
+            names = ["cm"]
+            if sec.n3d() == 0:
+                names.append("diam")
+            for mech in mechs:
+                if mech not in param_names:
+                    param_names[mech] = self._get_param_names(mech)
+                names.extend(param_names[mech])
+            for ion in ions:
+                names.extend(["e%s" % ion, "%si" % ion, "%so" % ion])
+
+            sec_values = []
+            for name in names:
+                values = np.array([getattr(seg, name) for seg in segs], dtype=float)
+                if np.all(values == values[0]):
+                    sec_values.append((name, float(values[0])))
+                else:
+                    sec_values.append((name, values))
+            self.mechs.append(mechs)
+            self.values.append(sec_values)
+
+    def instantiate(self, cell) -> List[Sec]:
+        """
+        Create copies of the captured sections and mechanisms in the cell.
+
+        :param cell:
+            cell (SectionCell or its subclass) to create sections in, eg. a new Cell object
+        :return:
+            list of created Sec objects
+        """
+        hoc_secs = self.morphology.instantiate(cell=cell)
+        secs = []
+        for i, hoc_sec in enumerate(hoc_secs):
+            if hoc_sec.n3d() == 0:
+                hoc_sec.L = self.lengths[i]
+            hoc_sec.Ra = self.ra[i]
+            for mech in self.mechs[i]:
+                hoc_sec.insert(mech)
+
+            for name, values in self.values[i]:
+                if isinstance(values, float):
+                    setattr(hoc_sec, name, values)
+                else:
+                    for seg, value in zip(hoc_sec, values.tolist()):
+                        setattr(seg, name, value)
+
+            name = hoc_sec.name() if self.full_names[i] else hoc_sec.name().split('.')[-1]
+            secs.append(Sec(hoc_sec, cell=cell, name=name))
+
+        cell.secs.extend(secs)
+        return secs
+
+    def instantiate_cell(self, name=None, cell_function=None):
+        """
+        Create a new cell with copies of the captured sections and mechanisms.
+
+        :param name:
+            name of the new cell. If None and cell_function is provided - the name is set by
+            the cell_function
+        :param cell_function:
+            Callable function without arguments, which returns a new empty cell (without sections)
+            of the required type. Default is None, which means a new Cell object.
+        :return:
+            the new cell
+        """
+        if cell_function is None:
+            from neuronpp.cells.cell import Cell
+            cell = Cell(name=name)
+        else:
+            cell = cell_function()
+            if name is not None:
+                cell.name = name
+        if len(cell.secs) > 0:
+            raise ValueError("Cell function must return a cell without sections, but the cell %s "
+                             "has %s sections." % (cell.name, len(cell.secs)))
+        self.instantiate(cell)
+        return cell
+
+    @staticmethod
+    def _get_param_names(mech: str) -> List[str]:
+        """
+        :param mech:
+            name of the density mechanism
+        :return:
+            names of PARAMETER range variables of the mechanism, eg. gIhbar_Ih
+        """
+        ms = h.MechanismStandard(mech, 1)
+        name = h.ref("")
+        names = []
+        for i in range(int(ms.count())):
+            ms.name(name, i)
+            names.append(name[0])
+        return names
+
+    def __len__(self):
+        return len(self.morphology)
+
+    def __repr__(self):
+        return "{}[{}]".format(self.__class__.__name__, len(self))
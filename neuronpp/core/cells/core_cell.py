@@ -1,5 +1,8 @@
 import re
+from functools import lru_cache
 
+from neuronpp.core.dists import random_streams
+from neuronpp.core.cells.indexed_list import IndexedList
 from neuronpp.core.neuron_removable import NeuronRemovable
 from neuronpp.utils.compile_mod import compile_mods, load_mods
 
@@ -20,8 +23,8 @@ class CoreCell(NeuronRemovable):
            If False and the target path exists, the function will skip the compilation step.
            Default is True.
         :param wait_in_sec:
-           The number of seconds to wait between retries if loading the mechanisms fails.
-           Default is 2 seconds.
+           Not used. Concurrent compilation and loading of MODs is synchronized with file
+           locks. It is left for backward compatibility.
         :param compile_mods_with_random_subfolder:
             if True it will create a random subfolder in the target folder as compiled/random_string/modsNUM.
             if False it will create folder compiled/modsNUM
@@ -29,12 +32,28 @@ class CoreCell(NeuronRemovable):
         if compile_paths:
             target_path = compile_mods(compile_paths, override=override,
                                        compile_mods_with_random_subfolder=compile_mods_with_random_subfolder)
-            load_mods(target_path, wait_in_sec=wait_in_sec)
+            # None means that all MODs were already loaded
+            if target_path is not None:
+                load_mods(target_path, wait_in_sec=wait_in_sec)
 
         if name is None:
             name = ""
         self.name = name
 
+        # keys of the cell's random stream, see _get_random_stream()
+        if not hasattr(self, '_stream_key'):
+            self._stream_key = random_streams.get_cell_key(name)
+
+    def _get_random_stream(self):
+        """
+        Returns a numpy Generator of the next random stream of this cell.
+
+        Streams depend only on the seed (Dist.set_seed()), keys of the cell (its position in the
+        Population or its name) and the number of calls of this method, so random values of the
+        cell don't depend on other cells.
+        """
+        return random_streams.next_stream(random_streams.CELL_STREAM, *self._stream_key)
+
     @staticmethod
     def filter(searchable, obj_filter=None, as_list=False, **kwargs):
         """
@@ -53,6 +72,10 @@ class CoreCell(NeuronRemovable):
           cell.filter_secs(parent=lambda o: len(o.parent.name) < 10)
           ```
 
+        If the searchable is an IndexedList (eg. cell.secs) - str and regex patterns on indexed
+        fields are resolved by its hash indexes, all other patterns by scanning the matching
+        objects.
+
         :param searchable:
             is a list or list-like structure where filter will be performed
         :param obj_filter:
@@ -71,6 +94,8 @@ class CoreCell(NeuronRemovable):
             return "Pattern" in pattern.__class__.__name__
 
         patterns = CoreCell._prepare_patterns(kwargs)
+        if isinstance(searchable, IndexedList):
+            searchable, patterns = CoreCell._filter_indexed(searchable, patterns)
         pat_len = len(patterns)
         if obj_filter:
             pat_len += 1
@@ -129,6 +154,40 @@ class CoreCell(NeuronRemovable):
             searchable.remove(o)
             o.remove_immediate_from_neuron()
 
+    @staticmethod
+    def _filter_indexed(searchable: IndexedList, patterns):
+        """
+        Resolve patterns supported by indexes of the searchable.
+
+        :return:
+            tuple of (objects matching all resolved patterns, remaining patterns)
+        """
+        positions = None
+        remaining = []
+        for attr_name, pat in patterns:
+            found = searchable.find(attr_name, pat)
+            if found is None:
+                remaining.append((attr_name, pat))
+            elif positions is None:
+                positions = found
+            else:
+                found = set(found)
+                positions = [i for i in positions if i in found]
+
+        if positions is None:
+            return searchable, remaining
+        return [searchable[i] for i in positions], remaining
+
+    @staticmethod
+    def _find_exact(searchable, field, value):
+        """
+        :return:
+            list of objects which str() value of the field is equal to the value
+        """
+        if isinstance(searchable, IndexedList):
+            return searchable.lookup(field, value)
+        return [o for o in searchable if hasattr(o, field) and str(getattr(o, field)) == value]
+
     @staticmethod
     def _prepare_patterns(kwargs):
         """
@@ -140,16 +199,26 @@ class CoreCell(NeuronRemovable):
         for attr_name, v in kwargs.items():
 
             if v is not None and isinstance(v, str):
-                if "regex:" in v:
-                    v = v.replace("regex:", "")
-                    v = re.compile(v)
-                elif "," in v:
-                    v = '|'.join(["(%s)" % re.escape(p) for p in v.split(",")])
-                    v = re.compile(v)
+                v = CoreCell._compile_pattern(v)
             result.append((attr_name, v))
 
         return result
 
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _compile_pattern(v):
+        """
+        :return:
+            compiled regex for "regex:" and comma-separated patterns, otherwise the str pattern
+        """
+        if "regex:" in v:
+            v = v.replace("regex:", "")
+            v = re.compile(v)
+        elif "," in v:
+            v = '|'.join(["(%s)" % re.escape(p) for p in v.split(",")])
+            v = re.compile(v)
+        return v
+
     @staticmethod
     def _is_array_name(name):
         return "[" in name
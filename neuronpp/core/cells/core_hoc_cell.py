@@ -19,8 +19,8 @@ class CoreHocCell(PointProcessCell):
            If False and the target path exists, the function will skip the compilation step.
            Default is True.
         :param wait_in_sec:
-           The number of seconds to wait between retries if loading the mechanisms fails.
-           Default is 2 seconds.
+           Not used. Concurrent compilation and loading of MODs is synchronized with file
+           locks. It is left for backward compatibility.
         """
         PointProcessCell.__init__(self, name, compile_paths=compile_paths,
                                   override=override, wait_in_sec=wait_in_sec)
@@ -138,7 +138,7 @@ class CoreHocCell(PointProcessCell):
                         "This is en experimental feature, error %s" % e)
 
         sec_name = hoc_sec_obj.name()
-        if len(self.filter_secs(sec_name)) > 0:
+        if len(self._find_exact(self.secs, "name", sec_name)) > 0:
             raise LookupError(
                 "The name '%s' is already taken by another section of the cell: '%s' of type: '%s'."
                 % (sec_name, self.name, self.__class__.__name__))
@@ -0,0 +1,233 @@
+import re
+import weakref
+from collections import OrderedDict
+from typing import List, Optional, Union
+
+_MISSING = object()
+
+
+class IndexedList(list):
+    INDEXED_FIELDS = ("name", "tag", "mod_name", "parent", "hoc")
+    MAX_CACHED_QUERIES = 64
+
+    def __init__(self, iterable=()):
+        """
+        List of cell's objects (sections, synapses, point processes, netcons, synaptic groups)
+        with hash indexes on their fields used by CoreCell.filter().
+
+        For each of INDEXED_FIELDS the index maps str() value of the field to positions of
+        objects in the list, so exact lookups (see lookup()) are O(1). Results of substring and
+        regex queries (see find()) are cached and updated on append(), so repeated queries
+        are O(1) as well.
+
+        Indexes are built lazily on the first query. append() and extend() update them, all
+        other modifications of the list (remove, insert, del, etc.) reset them.
+
+        Indexed objects keep weak references to the list, so wrappers (see Wrapper.__setattr__)
+        invalidate the index of a field when the field of an indexed object changes (eg. the
+        name of the NetCon). For other objects, if you change an indexed field of an object
+        which is already in the list - call reindex(). Fields defined as properties (eg.
+        Sec.parent, which depends on the NEURON topology) are never indexed and they are always
+        filtered by scanning the list.
+
+        :param iterable:
+            initial objects
+        """
+        list.__init__(self, iterable)
+        self._indexes = {}
+        self._queries = OrderedDict()
+        self._unindexed = set()
+        self._ref = weakref.ref(self)
+
+    def lookup(self, field: str, value: str) -> list:
+        """
+        :param field:
+            name of the field
+        :param value:
+            str value of the field
+        :return:
+            list of objects which str() value of the field is equal to the value
+        """
+        index = self._get_index(field)
+        if index is None:
+            return [o for o in self if self._get_key(o, field) == value]
+        return [self[i] for i in index.get(value, [])]
+
+    def find(self, field: str, pattern) -> Optional[List[int]]:
+        """
+        :param field:
+            name of the field
+        :param pattern:
+            str (substring to find in the str() value of the field) or compiled regex
+        :return:
+            sorted list of positions of matching objects or None if the field or the pattern
+            can't be resolved by the index (eg. the pattern is a callable)
+        """
+        if not isinstance(pattern, (str, re.Pattern)):
+            return None
+        index = self._get_index(field)
+        if index is None:
+            return None
+
+        key = (field, pattern)
+        positions = self._queries.get(key)
+        if positions is None:
+            positions = []
+            for value, value_positions in index.items():
+                if self._match(pattern, value):
+                    positions.extend(value_positions)
+            positions.sort()
+            self._queries[key] = positions
+            if len(self._queries) > self.MAX_CACHED_QUERIES:
+                self._queries.popitem(last=False)
+        else:
+            self._queries.move_to_end(key)
+        return positions
+
+    def invalidate_field(self, field: str):
+        """
+        Reset the index and cached queries of the field, they will be rebuilt on the next query.
+
+        :param field:
+            name of the field
+        """
+        if field not in self.INDEXED_FIELDS:
+            return
+        self._indexes.pop(field, None)
+        for key in [k for k in self._queries if k[0] == field]:
+            del self._queries[key]
+
+    def reindex(self):
+        """
+        Reset all indexes and cached queries, they will be rebuilt on the next query.
+        """
+        self._indexes.clear()
+        self._queries.clear()
+        self._unindexed.clear()
+
+    def append(self, obj):
+        list.append(self, obj)
+        if not self._indexes and not self._queries:
+            return
+
+        position = len(self) - 1
+        for field in list(self._indexes):
+            if self._is_property(obj, field):
+                self._drop_field(field)
+                continue
+            value = self._get_key(obj, field)
+            if value is not _MISSING:
+                self._indexes[field].setdefault(value, []).append(position)
+        self._watch(obj)
+
+        for (field, pattern), positions in self._queries.items():
+            value = self._get_key(obj, field)
+            if value is not _MISSING and self._match(pattern, value):
+                positions.append(position)
+
+    def extend(self, iterable):
+        for obj in iterable:
+            self.append(obj)
+
+    def __iadd__(self, iterable):
+        self.extend(iterable)
+        return self
+
+    def insert(self, index, obj):
+        list.insert(self, index, obj)
+        self.reindex()
+
+    def remove(self, obj):
+        list.remove(self, obj)
+        self.reindex()
+
+    def pop(self, index=-1):
+        obj = list.pop(self, index)
+        self.reindex()
+        return obj
+
+    def clear(self):
+        list.clear(self)
+        self.reindex()
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self.reindex()
+
+    def reverse(self):
+        list.reverse(self)
+        self.reindex()
+
+    def __setitem__(self, index, value):
+        list.__setitem__(self, index, value)
+        self.reindex()
+
+    def __delitem__(self, index):
+        list.__delitem__(self, index)
+        self.reindex()
+
+    def __imul__(self, n):
+        list.__imul__(self, n)
+        self.reindex()
+        return self
+
+    def _get_index(self, field: str) -> Optional[dict]:
+        """
+        :return:
+            dict of str value of the field -> list of positions or None if the field can't
+            be indexed
+        """
+        if field not in self.INDEXED_FIELDS or field in self._unindexed:
+            return None
+        index = self._indexes.get(field)
+        if index is None:
+            index = {}
+            for position, obj in enumerate(self):
+                if self._is_property(obj, field):
+                    self._unindexed.add(field)
+                    return None
+                value = self._get_key(obj, field)
+                if value is not _MISSING:
+                    index.setdefault(value, []).append(position)
+                self._watch(obj)
+            self._indexes[field] = index
+        return index
+
+    def _watch(self, obj):
+        """
+        Add the weak reference of this list to the object, so the object can invalidate indexes
+        on change of its fields.
+        """
+        refs = getattr(obj, "_indexed_lists", None)
+        if refs is None:
+            refs = []
+            try:
+                obj._indexed_lists = refs
+            except AttributeError:
+                return
+        # identity check, since weakrefs compare their (list) referents by value
+        if not any(ref is self._ref for ref in refs):
+            refs.append(self._ref)
+
+    def _drop_field(self, field: str):
+        self._unindexed.add(field)
+        del self._indexes[field]
+        for key in [k for k in self._queries if k[0] == field]:
+            del self._queries[key]
+
+    @staticmethod
+    def _is_property(obj, field: str) -> bool:
+        return isinstance(getattr(type(obj), field, None), property)
+
+    @staticmethod
+    def _get_key(obj, field: str):
+        try:
+            return str(getattr(obj, field))
+        except (AttributeError, ReferenceError):
+            return _MISSING
+
+    @staticmethod
+    def _match(pattern: Union[str, re.Pattern], value: str) -> bool:
+        if isinstance(pattern, str):
+            return pattern in value
+        return pattern.search(value) is not None
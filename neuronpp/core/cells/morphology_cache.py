@@ -0,0 +1,237 @@
+import os
+import hashlib
+from typing import List
+
+import numpy as np
+from neuron import h
+from nrn import Section
+
+MORPHO_CACHE_DIR_ENV = "NEURONPP_MORPHO_CACHE_DIR"
+
+# version of the npz format, change it if arrays stored in the file change
+_FORMAT_VERSION = 1
+
+# parsed morphologies of the current process, keys are made of the absolute path, modification
+# time and size of the file
+_morphologies = {}
+
+
+class Morphology:
+    def __init__(self, names: np.ndarray, parent_ids: np.ndarray, parent_x: np.ndarray,
+                 child_x: np.ndarray, nseg: np.ndarray, pt_offsets: np.ndarray,
+                 points: np.ndarray):
+        """
+        Compact array representation of a parsed morphology. Each element of section arrays
+        (names, parent_ids, parent_x, child_x, nseg) describes a single section:
+            * names - name of the section, eg. "dend[19]". Name prefix is the section type
+            * parent_ids - index of the parent section, -1 means no parent
+            * parent_x - location on the parent section where the section is connected
+            * child_x - end of the section connected to the parent (0 or 1)
+            * nseg - number of segments of the section
+
+        3D points of section i are points[pt_offsets[i]:pt_offsets[i+1]], where each point is
+        made of: x, y, z (in um) and diam (in um).
+
+        :param names:
+        :param parent_ids:
+        :param parent_x:
+        :param child_x:
+        :param nseg:
+        :param pt_offsets:
+        :param points:
+        """
+        self.names = names
+        self.parent_ids = parent_ids
+        self.parent_x = parent_x
+        self.child_x = child_x
+        self.nseg = nseg
+        self.pt_offsets = pt_offsets
+        self.points = points
+
+    @property
+    def sec_types(self) -> np.ndarray:
+        """
+        :return:
+            array of section types (name prefix without index, eg. "dend") of all sections
+        """
+        return np.array([name.split('[')[0] for name in self.names])
+
+    @classmethod
+    def from_secs(cls, secs: List[Section]):
+        """
+        Create Morphology from existing NEURON Sections (eg. instantiated by Import3d).
+
+        :param secs:
+            list of Sections from NEURON
+        """
+        sec_ids = {sec: i for i, sec in enumerate(secs)}
+        names = []
+        parent_ids = []
+        parent_x = []
+        child_x = []
+        nseg = []
+        pt_offsets = [0]
+        points = []
+        for sec in secs:
+            names.append(sec.name().split('.')[-1])
+            parent_seg = sec.parentseg()
+            if parent_seg is None:
+                parent_ids.append(-1)
+                parent_x.append(0.0)
+            else:
+                parent_ids.append(sec_ids.get(parent_seg.sec, -1))
+                parent_x.append(parent_seg.x)
+            child_x.append(sec.orientation())
+            nseg.append(sec.nseg)
+
+            n3d = sec.n3d()
+            for i in range(n3d):
+                points.append((sec.x3d(i), sec.y3d(i), sec.z3d(i), sec.diam3d(i)))
+            pt_offsets.append(pt_offsets[-1] + n3d)
+
+        return cls(names=np.array(names, dtype=str),
+                   parent_ids=np.array(parent_ids, dtype=int),
+                   parent_x=np.array(parent_x, dtype=float),
+                   child_x=np.array(child_x, dtype=float),
+                   nseg=np.array(nseg, dtype=int),
+                   pt_offsets=np.array(pt_offsets, dtype=int),
+                   points=np.array(points, dtype=float).reshape(-1, 4))
+
+    def instantiate(self, cell) -> List[Section]:
+        """
+        Create NEURON Sections of the morphology for the cell. 3D points of each section are
+        added in bulk with Vectors.
+
+        :param cell:
+            cell object which will be the owner of Sections
+        :return:
+            list of created Sections in the order of names
+        """
+        secs = [h.Section(name=name, cell=cell) for name in self.names.tolist()]
+        for i, sec in enumerate(secs):
+            start, end = self.pt_offsets[i], self.pt_offsets[i + 1]
+            if end > start:
+                pts = self.points[start:end]
+                h.pt3dadd(h.Vector(pts[:, 0]), h.Vector(pts[:, 1]), h.Vector(pts[:, 2]),
+                          h.Vector(pts[:, 3]), sec=sec)
+            sec.nseg = int(self.nseg[i])
+
+        for i, parent_i in enumerate(self.parent_ids.tolist()):
+            if parent_i >= 0:
+                secs[i].connect(secs[parent_i](self.parent_x[i]), self.child_x[i])
+        return secs
+
+    def save(self, filepath):
+        """
+        :param filepath:
+            path of the npz file
+        """
+        np.savez(filepath, version=_FORMAT_VERSION, names=self.names, parent_ids=self.parent_ids,
+                 parent_x=self.parent_x, child_x=self.child_x, nseg=self.nseg,
+                 pt_offsets=self.pt_offsets, points=self.points)
+
+    @classmethod
+    def load(cls, filepath):
+        """
+        :param filepath:
+            path of the npz file
+        :return:
+            Morphology object or None if the file was saved in a different format version
+        """
+        with np.load(filepath) as f:
+            if int(f["version"]) != _FORMAT_VERSION:
+                return None
+            return cls(names=f["names"], parent_ids=f["parent_ids"], parent_x=f["parent_x"],
+                       child_x=f["child_x"], nseg=f["nseg"], pt_offsets=f["pt_offsets"],
+                       points=f["points"])
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return "{}[{}]".format(self.__class__.__name__, len(self))
+
+
+def _get_memory_key(filepath):
+    filepath = os.path.abspath(filepath)
+    stat = os.stat(filepath)
+    return filepath, stat.st_mtime_ns, stat.st_size
+
+
+def get_npz_path(filepath, cache_dir):
+    """
+    :param filepath:
+        swc or asc file path
+    :param cache_dir:
+        folder of npz files
+    :return:
+        path of the npz file of the morphology. Its name depends on the file content, so changed
+        files will be parsed again.
+    """
+    with open(filepath, 'rb') as f:
+        file_hash = hashlib.sha256(f.read()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    return os.path.join(cache_dir, "%s-%s.npz" % (name, file_hash))
+
+
+def get_morphology(filepath, cache_dir=None):
+    """
+    Returns cached Morphology of the file. It first checks the memory cache and then (if
+    cache_dir is provided) the npz file in the cache_dir.
+
+    :param filepath:
+        swc or asc file path
+    :param cache_dir:
+        folder of npz files. If None - it is taken from the NEURONPP_MORPHO_CACHE_DIR
+        environment variable. If not set - only the memory cache is used.
+    :return:
+        Morphology object or None if the morphology was not cached yet
+    """
+    key = _get_memory_key(filepath)
+    morpho = _morphologies.get(key)
+    if morpho is not None:
+        return morpho
+
+    if cache_dir is None:
+        cache_dir = os.environ.get(MORPHO_CACHE_DIR_ENV)
+    if cache_dir:
+        npz_path = get_npz_path(filepath, cache_dir)
+        if os.path.exists(npz_path):
+            morpho = Morphology.load(npz_path)
+            if morpho is not None:
+                _morphologies[key] = morpho
+    return morpho
+
+
+def cache_morphology(filepath, morpho: Morphology, cache_dir=None):
+    """
+    Store Morphology of the file in the memory cache and (if cache_dir is provided) in the npz
+    file in the cache_dir.
+
+    :param filepath:
+        swc or asc file path
+    :param morpho:
+        Morphology object parsed from the file
+    :param cache_dir:
+        folder of npz files. If None - it is taken from the NEURONPP_MORPHO_CACHE_DIR
+        environment variable. If not set - only the memory cache is used.
+    """
+    _morphologies[_get_memory_key(filepath)] = morpho
+
+    if cache_dir is None:
+        cache_dir = os.environ.get(MORPHO_CACHE_DIR_ENV)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        npz_path = get_npz_path(filepath, cache_dir)
+        # save to the temporary file and rename, so concurrent processes never read
+        # a partially written file
+        tmp_path = "%s.tmp-%s.npz" % (npz_path[:-4], os.getpid())
+        morpho.save(tmp_path)
+        os.replace(tmp_path, npz_path)
+
+
+def clear_morphology_cache():
+    """
+    Clear the memory cache of morphologies. Npz files are not removed.
+    """
+    _morphologies.clear()
@@ -5,18 +5,22 @@ from neuronpp.core.hocwrappers.netcon import NetCon
 from neuronpp.core.hocwrappers.point_process import PointProcess
 from neuronpp.core.hocwrappers.seg import Seg
 from neuronpp.core.hocwrappers.vecstim import VecStim
-import matplotlib.pyplot as plt
 from collections import defaultdict
 
 from neuronpp.core.hocwrappers.netstim import NetStim
 from neuronpp.core.cells.point_process_cell import PointProcessCell
+from neuronpp.core.cells.indexed_list import IndexedList
 
 
 class NetConCell(PointProcessCell):
     def __init__(self, name=None, compile_paths=None):
         PointProcessCell.__init__(self, name, compile_paths=compile_paths)
-        self.ncs = []
+        self.ncs = IndexedList()
         self._spike_detector = None
+        # (weakref to SpikeRecord, gid) if spikes are recorded by SpikeRecord
+        self._spike_record = None
+        # gid of the spike detector in ParallelContext, reused by the next SpikeRecord
+        self._spike_gid = None
         self._nc_num = defaultdict(int)
 
     def filter_netcons(self, mod_name: str, name: str, obj_filter=None, **kwargs):
@@ -169,10 +173,17 @@ class NetConCell(PointProcessCell):
             raise LookupError(
                 "Spike detector have not been setup before run. call cell.make_spike_detector() "
                 "function before.")
+        if self._spike_record is not None:
+            spike_record, gid = self._spike_record
+            spike_record = spike_record()
+            if spike_record is not None:
+                return spike_record.get_spikes(gid)
         spikes = self._spike_detector[1].as_numpy()
         return spikes
 
     def plot_spikes(self):
+        import matplotlib.pyplot as plt
+
         spikes = self.spikes()
         fig, ax = plt.subplots(1)
 
@@ -3,6 +3,7 @@ from collections import defaultdict
 
 from neuronpp.core.hocwrappers.seg import Seg
 from neuronpp.core.cells.section_cell import SectionCell
+from neuronpp.core.cells.indexed_list import IndexedList
 from neuronpp.core.decorators import distparams
 from neuronpp.core.hocwrappers.point_process import PointProcess
 
@@ -19,12 +20,12 @@ class PointProcessCell(SectionCell):
            If False and the target path exists, the function will skip the compilation step.
            Default is True.
         :param wait_in_sec:
-           The number of seconds to wait between retries if loading the mechanisms fails.
-           Default is 2 seconds.
+           Not used. Concurrent compilation and loading of MODs is synchronized with file
+           locks. It is left for backward compatibility.
         """
         SectionCell.__init__(self, name, compile_paths=compile_paths,
                              override=override, wait_in_sec=wait_in_sec)
-        self.pps = []
+        self.pps = IndexedList()
         self._pp_num = defaultdict(int)
 
     def filter_point_processes(self, mod_name: str = None, name: str = None, parent: str = None,
@@ -1,7 +1,6 @@
 import abc
 import numpy as np
 from neuron import rxd
-import matplotlib.pyplot as plt
 from neuron.rxd.node import Node3D
 from neuron.units import nM, ms, sec
 
@@ -100,6 +99,8 @@ class RxDncx(RxDTool):
 
 
 def plot_contours(species: rxd.Species):
+    import matplotlib.pyplot as plt
+
     r = species.nodes[0].region
     if not hasattr(r, '_xs'):
         raise LookupError("For RxD ionic contour plot - you must use 3D RxD model.")
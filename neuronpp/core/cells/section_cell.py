@@ -1,12 +1,20 @@
 from os import path
+import numpy as np
 from neuron import h
-from typing import Union, List
+from typing import Union, List, Callable
 
 from nrn import Section
 
 from neuronpp.core.hocwrappers.sec import Sec
+from neuronpp.core.hocwrappers.seg import Seg
+from neuronpp.core.cells.utils import get_distribution_function
 from neuronpp.core.decorators import distparams
 from neuronpp.core.cells.core_cell import CoreCell
+from neuronpp.core.cells.indexed_list import IndexedList
+from neuronpp.core.cells.segment_index import SegmentIndex
+from neuronpp.core.cells.segment_table import SegmentTable
+from neuronpp.core.cells.tree_index import TreeIndex
+from neuronpp.core.cells.morphology_cache import Morphology, get_morphology, cache_morphology
 
 h.load_file('stdlib.hoc')
 h.load_file('import3d.hoc')
@@ -25,8 +33,8 @@ class SectionCell(CoreCell):
            If False and the target path exists, the function will skip the compilation step.
            Default is True.
         :param wait_in_sec:
-           The number of seconds to wait between retries if loading the mechanisms fails.
-           Default is 2 seconds.
+           Not used. Concurrent compilation and loading of MODs is synchronized with file
+           locks. It is left for backward compatibility.
         :param compile_mods_with_random_subfolder:
             if True it will create a random subfolder in the target folder as compiled/random_string/modsNUM.
             if False it will create folder compiled/modsNUM
@@ -37,9 +45,45 @@ class SectionCell(CoreCell):
 
         # if Cell (named core_cell) have been built before on the stack of super() objects
         if not hasattr(self, '_core_cell_builded'):
-            self.secs = []
+            self.secs = IndexedList()
+            self._segment_index = None
+            self._tree_index = None
             self._core_cell_builded = True
 
+    @property
+    def segment_index(self) -> SegmentIndex:
+        """
+        Returns SegmentIndex of all inner segments of the cell. The index is cached and rebuilt
+        only if sections of the cell, their L or nseg have changed.
+
+        After changes of diam or 3D points call invalidate_segment_index().
+        """
+        if self._segment_index is None or not self._segment_index.is_valid(self.secs):
+            self._segment_index = SegmentIndex(self.secs)
+        return self._segment_index
+
+    @property
+    def tree_index(self) -> TreeIndex:
+        """
+        Returns TreeIndex of the cell, which gives path and electrotonic distances between
+        segments as numpy arrays. The index is cached and rebuilt together with the
+        segment_index or after connect_secs().
+
+        After changes of diam, Ra or g_pas call invalidate_segment_index().
+        """
+        segment_index = self.segment_index
+        if self._tree_index is None or self._tree_index.segment_index is not segment_index:
+            self._tree_index = TreeIndex(segment_index)
+        return self._tree_index
+
+    def invalidate_segment_index(self):
+        """
+        Force rebuild of the SegmentIndex (and TreeIndex) on the next access to
+        cell.segment_index (or cell.tree_index)
+        """
+        self._segment_index = None
+        self._tree_index = None
+
     def filter_secs(self, name=None, obj_filter=None, **kwargs):
         """
         Currently all filter passed are treated as AND statements.
@@ -99,6 +143,9 @@ class SectionCell(CoreCell):
             together with the
             obj_filter treated as AND statement.
         """
+        # index holds references to segments of removed sections
+        self._segment_index = None
+        self._tree_index = None
         self.remove(searchable=self.secs, obj_filter=obj_filter, name=name, **kwargs)
 
     def insert(self, mechanism_name: str, sec=None, **params):
@@ -180,7 +227,7 @@ class SectionCell(CoreCell):
             hoc_sec.insert('pas')
             self.set_pas(hoc_sec, E_rest=E_rest, g_pas=g_pas)
 
-        if len(self.filter_secs(name, as_list=True)) > 0:
+        if len(self._find_exact(self.secs, "name", hoc_sec.name())) > 0:
             raise LookupError(
                 "The name '%s' is already taken by another section of the cell: '%s' of type: '%s'."
                 % (name, self.name, self.__class__.__name__))
@@ -237,16 +284,30 @@ class SectionCell(CoreCell):
         child_loc = float(child_loc)
 
         child.hoc.connect(parent(parent_loc).hoc, child_loc)
+        self._tree_index = None
 
-    def load_morpho(self, filepath):
+    def load_morpho(self, filepath, use_cache=True, cache_dir=None):
         """
         :param filepath:
             swc or asc file path
             to load HOC-based morphology use HocCell object
+        :param use_cache:
+            If True (default), the file is parsed only once and next cells are instantiated from
+            the cached array representation of the morphology.
+        :param cache_dir:
+            folder where parsed morphologies are stored as npz files, so next runs skip parsing.
+            If None - it is taken from the NEURONPP_MORPHO_CACHE_DIR environment variable.
+            If not set - morphologies are cached only in memory.
         """
         if not path.exists(filepath):
             raise FileNotFoundError(filepath)
 
+        if use_cache:
+            morpho = get_morphology(filepath, cache_dir=cache_dir)
+            if morpho is not None:
+                self.load_cell_from_existing_neuron(secs=morpho.instantiate(cell=self))
+                return
+
         # SWC
         fileformat = filepath.split('.')[-1]
         if fileformat == 'swc':
@@ -262,6 +323,8 @@ class SectionCell(CoreCell):
         i3d = h.Import3d_GUI(morpho, 0)
         i3d.instantiate(self)
 
+        if use_cache:
+            cache_morphology(filepath, Morphology.from_secs(self.all), cache_dir=cache_dir)
         self.load_cell_from_existing_neuron(secs=self.all)
         del self.all
 
@@ -276,7 +339,7 @@ class SectionCell(CoreCell):
         """
         for hoc_sec in secs:
             name = hoc_sec.name().split('.')[-1]  # eg. name="dend[19]"
-            if len(self.filter_secs(name)) > 0:
+            if len(self._find_exact(self.secs, "name", name)) > 0:
                 raise LookupError(
                     "The name '%s' is already taken by another section of the cell: '%s' of "
                     "type: '%s'." % (name, self.name, self.__class__.__name__))
@@ -285,25 +348,44 @@ class SectionCell(CoreCell):
 
     @distparams
     def set_cell_position(self, x, y, z):
+        """
+        Move the whole cell, so that the first 3D point of its first section will be located
+        at (x, y, z). The shape of the cell is preserved.
+
+        :param x:
+            in um
+        :param y:
+            in um
+        :param z:
+            in um
+        """
         h.define_shape()
+        if len(self.secs) == 0:
+            return
+        origin = self.secs[0].hoc
+        dx = x - origin.x3d(0)
+        dy = y - origin.y3d(0)
+        dz = z - origin.z3d(0)
         for sec in self.secs:
+            sec = sec.hoc
             for i in range(sec.n3d()):
                 sec.pt3dchange(i,
-                               x - sec.x3d(i),
-                               y - sec.y3d(i),
-                               z - sec.z3d(i),
+                               sec.x3d(i) + dx,
+                               sec.y3d(i) + dy,
+                               sec.z3d(i) + dz,
                                sec.diam3d(i))
 
     @distparams
     def rotate_cell_z(self, theta):
-        h.define_shape()
         """Rotate the cell about the Z axis."""
+        h.define_shape()
+        c = h.cos(theta)
+        s = h.sin(theta)
         for sec in self.secs:
+            sec = sec.hoc
             for i in range(sec.n3d()):
                 x = sec.x3d(i)
                 y = sec.y3d(i)
-                c = h.cos(theta)
-                s = h.sin(theta)
                 xprime = x * c - y * s
                 yprime = x * s + y * c
                 sec.pt3dchange(i, xprime, yprime, sec.z3d(i), sec.diam3d(i))
@@ -348,6 +430,113 @@ class SectionCell(CoreCell):
                         except ValueError:
                             continue
 
+    def distribute_mechanism_param(self, mech: str, param: str,
+                                   func: Union[str, Callable[[np.ndarray], np.ndarray]],
+                                   secs: Union[str, List[Sec]] = None,
+                                   origin: Union[str, Sec, Seg] = 'soma', normalize=False,
+                                   **func_params) -> np.ndarray:
+        """
+        Set the mechanism's param of each inner segment of secs as a function of the path
+        distance of the segment from the origin.
+
+        Path distances of all segments are taken from the cell's tree_index (computed once,
+        until sections, their L, nseg or topology change), the function is evaluated once for
+        all segments, so it is cheap to call it many times, eg. during parameter fitting.
+
+        :param mech:
+            name of the density mechanism, eg. "Ih". It must be inserted to all secs
+        :param param:
+            name of the mechanism's param, eg. "gIhbar"
+        :param func:
+            vectorized function which takes numpy array of distances and returns numpy array of
+            values (or a single value), eg. lambda d: 0.0001 * np.exp(d / 300).
+            It can also be 'lin', 'sigm', 'exp' or 'abs' - see get_distribution_function() for
+            details and params (passed as func_params)
+        :param secs:
+            list of Sec objects or string (see filter_secs() name param). Default is None, which
+            means all sections of the cell
+        :param origin:
+            Seg, Sec (its center) or string name of exactly one section (its center) from which
+            distances are measured. Default is 'soma'
+        :param normalize:
+            if True distances are divided by the maximal distance of secs (to the farthest end of
+            secs) before passing them to the func. Default is False
+        :param func_params:
+            params of the func if it is a string, eg. s3=-0.8696, s4=3.6161
+        :return:
+            numpy array of set values, aligned with inner segments of secs (in order of secs)
+        """
+        if isinstance(func, str):
+            func = get_distribution_function(func, **func_params)
+        elif len(func_params) > 0:
+            raise TypeError("func_params can be provided only if func is a string, "
+                            "but provided: %s" % list(func_params.keys()))
+
+        if secs is None or isinstance(secs, str):
+            secs = self.filter_secs(name=secs, as_list=True)
+        elif isinstance(secs, Sec):
+            secs = [secs]
+
+        origin = self._get_origin(origin)
+        index = self.segment_index
+        tree = self.tree_index
+        seg_ids = index.get_seg_ids(secs)
+        dists = tree.get_distances_from(origin)[seg_ids]
+
+        if normalize and len(seg_ids) > 0:
+            end_dists = tree.get_end_distances_from(origin)
+            dists = dists / end_dists[np.unique(index.sec_ids[seg_ids])].max()
+
+        values = np.broadcast_to(np.asarray(func(dists), dtype=float), dists.shape)
+        var_name = "%s_%s" % (param, mech)
+        for seg, value in zip([index.segs[i].hoc for i in seg_ids], values.tolist()):
+            setattr(seg, var_name, value)
+        return values
+
+    def segment_table(self, origin: Union[str, Sec, Seg, None] = 'soma') -> SegmentTable:
+        """
+        Returns SegmentTable with properties of all inner segments of the cell (section id, x,
+        area, diam, L, Ra, cm, distance from the soma and mechanisms) as numpy arrays aligned
+        with cell.segment_index.segs, eg. to select segments for placement or channel
+        distribution without property access for each segment:
+          ```
+          table = cell.segment_table()
+          segs = [cell.segment_index.segs[i] for i in
+                  np.where(table.has_mechanism("Ih") & (table.soma_distances > 300))[0]]
+          ```
+
+        :param origin:
+            Seg, Sec (its center) or string name of exactly one section (its center) from which
+            soma_distances are measured. If None - distances are measured from the root of the
+            tree. Default is 'soma'
+        :return:
+            SegmentTable
+        """
+        tree = self.tree_index
+        if origin is None:
+            dists = tree.root_distances
+        else:
+            dists = tree.get_distances_from(self._get_origin(origin))
+        return SegmentTable(self.segment_index, soma_distances=dists)
+
+    def _get_origin(self, origin: Union[str, Sec, Seg]):
+        """
+        :param origin:
+            Seg, Sec or string name of exactly one section
+        :return:
+            hoc segment of the origin (the center of the section for Sec and string)
+        """
+        if isinstance(origin, str):
+            origin_secs = self.filter_secs(name=origin, as_list=True)
+            if len(origin_secs) != 1:
+                raise LookupError("Origin section must be only one for name "
+                                  "%s, but found %s sections containing this name."
+                                  % (origin, len(origin_secs)))
+            origin = origin_secs[0]
+        if isinstance(origin, Sec):
+            return origin.hoc(0.5)
+        return origin.hoc
+
     @staticmethod
     def _hasmech(sec: Sec, mech_name: str):
         for s in sec.hoc:
@@ -0,0 +1,115 @@
+from typing import List, Optional
+
+import numpy as np
+
+from neuronpp.core.hocwrappers.sec import Sec
+from neuronpp.core.hocwrappers.seg import Seg
+
+
+class SegmentIndex:
+    def __init__(self, secs: List[Sec]):
+        """
+        Flat index of all inner segments (without 0 and 1 ends) of the provided sections.
+
+        Seg wrappers are created only once and they are reused by all Connectors, synapse
+        placement and recording, instead of creating new wrappers from sec.segs each time.
+
+        All arrays have the same length as segs and are aligned with them:
+            * sec_ids - index of the section (in secs) of each segment
+            * x - location of each segment on its section (between 0 and 1)
+            * areas - area of each segment (in um2)
+            * lengths - length of each segment (in um)
+            * list_cum_lengths - cumulative sum of lengths (in um) in the order of segs. It is
+              not a path length for branched morphologies, since the order of segs doesn't follow
+              the tree. For path distances from the root use TreeIndex.root_distances
+              (eg. cell.tree_index.root_distances), which is aligned with segs as well.
+
+        The index is invalid after changes of sections list, their L or nseg (see is_valid()).
+        After changes of diam or 3D points you need to invalidate it by yourself, eg. with
+        cell.invalidate_segment_index().
+
+        :param secs:
+            list of Sec objects
+        """
+        self.secs = list(secs)
+        self.segs = []
+        self.signature = self.get_signature(self.secs)
+
+        sec_ids = []
+        xs = []
+        areas = []
+        lengths = []
+        self._sec_slices = {}
+        for sec_i, sec in enumerate(self.secs):
+            hoc_sec = sec.hoc
+            seg_len = hoc_sec.L / hoc_sec.nseg
+            start = len(self.segs)
+            # without 0 and 1 ends, wrappers are shared with the section
+            for seg in sec.segs[1:-1]:
+                hoc_seg = seg.hoc
+                self.segs.append(seg)
+                sec_ids.append(sec_i)
+                xs.append(hoc_seg.x)
+                areas.append(hoc_seg.area())
+                lengths.append(seg_len)
+            self._sec_slices[id(sec)] = (start, len(self.segs))
+
+        self.sec_ids = np.array(sec_ids, dtype=int)
+        self.x = np.array(xs, dtype=float)
+        self.areas = np.array(areas, dtype=float)
+        self.lengths = np.array(lengths, dtype=float)
+        self.list_cum_lengths = np.cumsum(self.lengths)
+
+    @staticmethod
+    def get_signature(secs: List[Sec]) -> tuple:
+        """
+        :param secs:
+            list of Sec objects
+        :return:
+            tuple describing identity, nseg and L of all sections
+        """
+        return tuple((id(sec), sec.hoc.nseg, sec.hoc.L) for sec in secs)
+
+    def is_valid(self, secs: List[Sec]) -> bool:
+        """
+        :param secs:
+            current list of Sec objects
+        :return:
+            True if the index still describes the provided sections
+        """
+        return self.signature == self.get_signature(secs)
+
+    def get_sec_segs(self, sec: Sec) -> Optional[List[Seg]]:
+        """
+        :param sec:
+            Sec object
+        :return:
+            list of inner segments of the section or None if the section is not in the index
+        """
+        sec_slice = self._sec_slices.get(id(sec))
+        if sec_slice is None:
+            return None
+        return self.segs[sec_slice[0]:sec_slice[1]]
+
+    def get_seg_ids(self, secs: List[Sec]) -> np.ndarray:
+        """
+        :param secs:
+            list of Sec objects from the index
+        :return:
+            indices (in segs) of all inner segments of the sections
+        """
+        ids = []
+        for sec in secs:
+            sec_slice = self._sec_slices.get(id(sec))
+            if sec_slice is None:
+                raise LookupError("Section %s is not a part of the segment index." % sec)
+            ids.append(np.arange(sec_slice[0], sec_slice[1]))
+        if len(ids) == 0:
+            return np.array([], dtype=int)
+        return np.concatenate(ids)
+
+    def __len__(self):
+        return len(self.segs)
+
+    def __repr__(self):
+        return "{}[{}]".format(self.__class__.__name__, len(self))
@@ -0,0 +1,102 @@
+from typing import List
+
+import numpy as np
+
+from neuronpp.core.cells.segment_index import SegmentIndex
+
+
+class SegmentTable:
+    def __init__(self, segment_index: SegmentIndex, soma_distances: np.ndarray):
+        """
+        Properties of all inner segments of the cell as numpy arrays, aligned with
+        segment_index.segs:
+            * sec_ids - index of the section (in segment_index.secs) of each segment
+            * x - location of each segment on its section
+            * area - area (in um2)
+            * diam - diameter (in um)
+            * L - length (in um)
+            * Ra - axial resistance of the section (in Ohm cm)
+            * cm - membrane capacitance (in uF/cm2)
+            * soma_distances - path distance (in um) from the soma (or other origin)
+            * mechs - dict of mechanism name -> bool array, True if the segment has the
+              mechanism (ions are not included)
+
+        Values are read from NEURON in a single pass over sections. After changes of diam, Ra,
+        cm or inserted mechanisms call refresh(). After changes of sections, their L or nseg
+        create a new table (eg. with cell.segment_table()).
+
+        :param segment_index:
+            SegmentIndex of the cell
+        :param soma_distances:
+            path distances of all segments from the soma (or other origin)
+        """
+        self.segment_index = segment_index
+        self.sec_ids = segment_index.sec_ids
+        self.x = segment_index.x
+        self.soma_distances = soma_distances
+        self.refresh()
+
+    def refresh(self):
+        """
+        Read area, diam, L, Ra, cm and mechanisms of all segments from NEURON.
+        """
+        secs = self.segment_index.secs
+        area = []
+        diam = []
+        cm = []
+        sec_lengths = np.zeros(len(secs), dtype=float)
+        sec_ras = np.zeros(len(secs), dtype=float)
+        nseg = np.zeros(len(secs), dtype=int)
+        sec_mechs = {}
+        for sec_i, sec in enumerate(secs):
+            hoc_sec = sec.hoc
+            sec_lengths[sec_i] = hoc_sec.L
+            sec_ras[sec_i] = hoc_sec.Ra
+            nseg[sec_i] = hoc_sec.nseg
+            for seg_i, hoc_seg in enumerate(hoc_sec):
+                area.append(hoc_seg.area())
+                diam.append(hoc_seg.diam)
+                cm.append(hoc_seg.cm)
+                # mechanisms are inserted to the whole section
+                if seg_i == 0:
+                    for mech in hoc_seg:
+                        if not mech.is_ion():
+                            sec_mechs.setdefault(mech.name(), []).append(sec_i)
+
+        self.area = np.array(area, dtype=float)
+        self.diam = np.array(diam, dtype=float)
+        self.cm = np.array(cm, dtype=float)
+        self.L = np.repeat(sec_lengths / np.maximum(nseg, 1), nseg)
+        self.Ra = np.repeat(sec_ras, nseg)
+
+        self.mechs = {}
+        for mech, sec_ids in sec_mechs.items():
+            has_mech = np.zeros(len(secs), dtype=bool)
+            has_mech[sec_ids] = True
+            self.mechs[mech] = has_mech[self.sec_ids]
+
+    @property
+    def mech_names(self) -> List[str]:
+        """
+        :return:
+            names of all mechanisms inserted to any segment
+        """
+        return list(self.mechs.keys())
+
+    def has_mechanism(self, name: str) -> np.ndarray:
+        """
+        :param name:
+            name of the mechanism
+        :return:
+            bool array, True if the segment has the mechanism
+        """
+        has_mech = self.mechs.get(name)
+        if has_mech is None:
+            return np.zeros(len(self), dtype=bool)
+        return has_mech
+
+    def __len__(self):
+        return len(self.sec_ids)
+
+    def __repr__(self):
+        return "{}[{}]".format(self.__class__.__name__, len(self))
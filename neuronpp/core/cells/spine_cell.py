@@ -1,4 +1,3 @@
-import random
 from typing import List, Union
 import numpy as np
 
@@ -139,7 +138,9 @@ class SpineCell(SectionCell):
             secs = [secs]
 
         if seed:
-            random.seed(seed)
+            rng = np.random.Generator(np.random.Philox(seed))
+        else:
+            rng = self._get_random_stream()
 
         spines = []
         heads = []
@@ -156,7 +157,7 @@ class SpineCell(SectionCell):
             spines.append(spine)
             heads.append(head)
             necks.append(neck)
-            self._connect_necks_rand_uniform(neck, secs)
+            self._connect_necks_rand_uniform(neck, secs, rng=rng)
             self._next_index += 1
 
         self.spines.extend(spines)
@@ -250,12 +251,14 @@ class SpineCell(SectionCell):
         seed = spine_params.pop("u_random", None)
 
         if seed is not None:
-            np.random.seed(seed)
+            rng = np.random.Generator(np.random.Philox(seed))
+        else:
+            rng = self._get_random_stream()
 
         all_target_locations = []
         for sec in secs:
             spine_number = get_spine_number(sec=sec, density=spine_density,
-                                            area_density=area_density)
+                                            area_density=area_density, rng=rng)
             E_pas, g_pas, ra, cm = establish_electric_properties(sec,
                                                                  spine_E_pas,
                                                                  spine_g_pas,
@@ -265,8 +268,7 @@ class SpineCell(SectionCell):
                 E_pas = None
                 g_pas = None
             if isinstance(seed, int):
-                target_locations = np.random.uniform(0., 1.,
-                                                     spine_number).tolist()
+                target_locations = rng.uniform(0., 1., spine_number).tolist()
             else:
                 target_locations = np.linspace(0., .99,
                                                spine_number).tolist()
@@ -323,16 +325,21 @@ class SpineCell(SectionCell):
                 dend.hoc.cm = new_val
 
     @staticmethod
-    def _connect_necks_rand_uniform(neck: Sec, sections: List[Sec]):
+    def _connect_necks_rand_uniform(neck: Sec, sections: List[Sec], rng=None):
         """
         Connect single neck to sections list with uniform random distribution
         :param neck:
         :param sections:
+        :param rng:
+            numpy Generator to draw from. Default is None, which means the global numpy
+            random state.
         """
+        if rng is None:
+            rng = np.random
         max_l = int(sum([s.hoc.L for s in sections]))
 
         i = 0
-        r = np.random.rand() * max_l
+        r = rng.random() * max_l
         for s in sections:
             s = s.hoc
             i += s.L
@@ -5,18 +5,23 @@ from typing import List, Union
 import numpy as np
 
 from neuronpp.core.cells.netcon_cell import NetConCell
+from neuronpp.core.cells.indexed_list import IndexedList
 from neuronpp.core.decorators import distparams
+from neuronpp.core.dists.distributions import Dist
 from neuronpp.core.hocwrappers.netcon import NetCon
+from neuronpp.core.hocwrappers.netstim import NetStim
 from neuronpp.core.hocwrappers.point_process import PointProcess
 from neuronpp.core.hocwrappers.sec import Sec
 from neuronpp.core.hocwrappers.seg import Seg
 from neuronpp.core.hocwrappers.synapses.single_synapse import SingleSynapse
+from neuronpp.core.hocwrappers.synapses.synapse_table import SynapseTable
+from neuronpp.core.hocwrappers.vecstim import VecStim
 
 
 class SynapticCell(NetConCell):
     def __init__(self, name=None, compile_paths=None):
         NetConCell.__init__(self, name, compile_paths=compile_paths)
-        self.syns = []
+        self.syns = IndexedList()
         self._syn_num = defaultdict(int)
 
     def filter_synapses(self, mod_name: str = None, obj_filter=None, name=None, source=None,
@@ -101,6 +106,25 @@ class SynapticCell(NetConCell):
                            source=source, point_process=point_process, parent=parent,
                            tag=tag, **kwargs)
 
+    def get_synapse_table(self, mod_name: str = None, tag: str = None) -> SynapseTable:
+        """
+        Returns columnar view of NetCons of the cell's synapses, which allows to read and write
+        weights of all NetCons at once. See SynapseTable for details.
+
+        The table does not follow later changes of synapses, so create a new table after adding
+        or removing synapses.
+
+        :param mod_name:
+            if provided - only synapses of the point process name will be taken
+        :param tag:
+            if provided - only synapses with the tag will be taken
+        :return:
+            SynapseTable object
+        """
+        syns = [s for s in self.syns if (mod_name is None or s.point_process_name == mod_name)
+                and (tag is None or s.tag == tag)]
+        return SynapseTable(syns)
+
     @distparams
     def add_synapse(self, source, mod_name: str, seg, netcon_weight=1, delay=1, threshold=10,
                     tag: str = None, **synaptic_params):
@@ -127,6 +151,119 @@ class SynapticCell(NetConCell):
         return self._add_raw_synapse(source=source, mod_name=mod_name, point_process=pp, netcon=nn,
                                      tag=tag)
 
+    def add_synapses_bulk(self, segs: List[Seg], mod_name: str, sources=None, weights=1,
+                          delays=1, thresholds=10, tag: str = None,
+                          **array_params) -> List[SingleSynapse]:
+        """
+        Add many synapses at once. Each synapse has a single Point Process and a single NetCon,
+        the same as synapses created with add_synapse().
+
+        Checks of mod_name, params and sources are made only once for all synapses, so it is much
+        faster than calling add_synapse() for each synapse.
+
+        All params (except mod_name and tag) can be a single value for all synapses, a Dist object
+        (values will be drawn for all synapses at once) or a list/array of values for each
+        synapse, aligned with segs.
+
+        :param segs:
+            list of Seg objects where to put point processes
+        :param mod_name:
+            The name of the Point Process
+        :param sources:
+            The source of stimulation for each synapse.
+            Can be only: hocwrappers.NetStim, hocwrappers.VecStim, Seg or None.
+            If None it will create NetConn with no source, which can be use as external event source
+        :param weights:
+            Weight of the connection
+        :param delays:
+            Delay of the synapse in ms
+        :param thresholds:
+            The threshold of the synapse in mV
+        :param tag:
+            String tag name added to all synapses
+        :param array_params:
+            Additional parameters of the synapse related to the mod mechanism
+        :return:
+            A list of added synapses aligned with segs
+        """
+        if mod_name is None:
+            raise AttributeError("To create a point_process you need to define mod_name param.")
+        if not hasattr(h, mod_name):
+            raise LookupError(
+                "There is no Point Process of name %s. "
+                "Maybe you forgot to compile or copy mod files?" % mod_name)
+        pp_obj = getattr(h, mod_name)
+
+        size = len(segs)
+        if size == 0:
+            return []
+        for seg in segs:
+            if not isinstance(seg, Seg):
+                raise TypeError(
+                    "Param 'segs' can contain only Seg objects, but provided %s" % seg.__class__)
+
+        rng = self._get_random_stream()
+        weights = self._get_bulk_values(weights, size=size, name="weights", rng=rng)
+        delays = self._get_bulk_values(delays, size=size, name="delays", rng=rng)
+        thresholds = self._get_bulk_values(thresholds, size=size, name="thresholds", rng=rng)
+        param_names = list(array_params.keys())
+        param_values = [self._get_bulk_values(v, size=size, name=k, rng=rng)
+                        for k, v in array_params.items()]
+
+        if isinstance(sources, (list, tuple, np.ndarray)):
+            if len(sources) != size:
+                raise ValueError("Param sources must have the same size as segs: %s, "
+                                 "but provided %s" % (size, len(sources)))
+        else:
+            sources = [sources] * size
+
+        # prepare NetCon's source args and name only once for each unique source
+        source_args = {}
+        for source in sources:
+            if id(source) in source_args:
+                continue
+            if source is None:
+                args = (None, {})
+            elif isinstance(source, (NetStim, VecStim)):
+                args = (source.hoc, {})
+            elif isinstance(source, Seg):
+                args = (source.hoc._ref_v, {"sec": source.hoc.sec})
+            else:
+                raise TypeError("Param 'source' can be NetStim, VecStim, Seg or None, "
+                                "but provided %s" % source.__class__)
+            source_args[id(source)] = args + (str(source),)
+
+        results = []
+        for i, (seg, source) in enumerate(zip(segs, sources)):
+            hoc_pp = pp_obj(seg.hoc)
+            if i == 0:
+                for key in param_names:
+                    if not hasattr(hoc_pp, key):
+                        raise LookupError("Point Process of type %s has no attribute of type %s. "
+                                          "Check if MOD file contains %s as a RANGE variable"
+                                          % (mod_name, key, key))
+            pp = self._append_pp(hoc_point_process=hoc_pp, mod_name=mod_name, segment=seg,
+                                 tag=tag)
+            for key, values in zip(param_names, param_values):
+                setattr(hoc_pp, key, values[i])
+
+            source_hoc, source_kwargs, source_name = source_args[id(source)]
+            hoc_nc = h.NetCon(source_hoc, hoc_pp, **source_kwargs)
+            hoc_nc.delay = delays[i]
+            hoc_nc.weight[0] = weights[i]
+            hoc_nc.threshold = thresholds[i]
+
+            nc_name = "%s->%s" % (source_name, pp)
+            nc = NetCon(hoc_nc, source=source, target=pp, parent=self, name=nc_name)
+            self.ncs.append(nc)
+            self._nc_num[nc_name] += 1
+
+            syn = self._add_raw_synapse(source=source, mod_name=mod_name, point_process=pp,
+                                        netcon=nc, tag=tag)
+            results.append(syn)
+
+        return results
+
     def add_random_uniform_synapses(self, number, source, mod_name: str, secs: List[Sec],
                                     netcon_weight=1, delay=1, threshold=10, tag: str = None,
                                     uniform_by="len", **synaptic_params):
@@ -171,10 +308,11 @@ class SynapticCell(NetConCell):
             A list of added synapses
         """
         results = []
+        rng = self._get_random_stream()
 
         if uniform_by == 'sec_loc':
-            locs = np.random.rand(number)
-            idxs = np.random.randint(low=0, high=len(secs), size=number)
+            locs = rng.random(number)
+            idxs = rng.integers(low=0, high=len(secs), size=number)
             for si, loc in zip(idxs, locs):
                 seg = secs[si](loc)
                 r = self.add_synapse(source=source, mod_name=mod_name, seg=seg,
@@ -183,7 +321,7 @@ class SynapticCell(NetConCell):
                 results.append(r)
 
         elif uniform_by == 'sec':
-            idxs = np.random.randint(low=0, high=len(secs), size=number)
+            idxs = rng.integers(low=0, high=len(secs), size=number)
             for si in idxs:
                 seg = secs[si](0.5)
                 r = self.add_synapse(source=source, mod_name=mod_name, seg=seg,
@@ -192,26 +330,25 @@ class SynapticCell(NetConCell):
                 results.append(r)
 
         elif uniform_by == 'len':
-            max_l = int(sum([s.hoc.L for s in secs]))
-            locations = np.random.rand(number)
+            sec_lens = np.array([s.hoc.L for s in secs])
+            cum_lens = np.cumsum(sec_lens)
+            max_l = int(np.sum(sec_lens))
+            locations = rng.random(number)
             locations *= max_l
 
-            for syn_loc in locations:
-                current_L = 0
-                for sec in secs:
-                    s = sec.hoc
-                    current_L += s.L
-
-                    # if synapse will be located in this section
-                    if current_L > syn_loc:
-                        section_loc = (syn_loc - current_L + s.L) / s.L
-
-                        seg = sec(section_loc)
-                        r = self.add_synapse(source=source, mod_name=mod_name, seg=seg,
-                                             netcon_weight=netcon_weight, delay=delay,
-                                             threshold=threshold, tag=tag, **synaptic_params)
-                        results.append(r)
-                        break
+            # index of the first section for which cumulative length > location
+            sec_ids = np.searchsorted(cum_lens, locations, side='right')
+            for syn_loc, si in zip(locations, sec_ids):
+                if si >= len(secs):
+                    continue
+                sec_l = sec_lens[si]
+                section_loc = (syn_loc - cum_lens[si] + sec_l) / sec_l
+
+                seg = secs[si](section_loc)
+                r = self.add_synapse(source=source, mod_name=mod_name, seg=seg,
+                                     netcon_weight=netcon_weight, delay=delay,
+                                     threshold=threshold, tag=tag, **synaptic_params)
+                results.append(r)
         else:
             raise ValueError("Wrong type of uniform_by. It can be: length, sec or sec_loc.")
 
@@ -257,32 +394,32 @@ class SynapticCell(NetConCell):
             A list of added synapses
         """
 
+        segment_index = self.segment_index
         if secs is None:
-            secs = self.secs
-        segs = [seg for sec in secs for seg in sec.segs if seg.area > 0]
-        dists_seg_ids = [(h.distance(centroid.hoc, seg.hoc), segi) for segi, seg in enumerate(segs)]
-        dists_seg_ids = sorted(dists_seg_ids, key=lambda d: d[0])
-        dists = [d[0] for d in dists_seg_ids]
+            seg_ids = np.arange(len(segment_index))
+        else:
+            seg_ids = segment_index.get_seg_ids(secs)
+        seg_ids = seg_ids[segment_index.areas[seg_ids] > 0]
 
-        locations = np.abs(np.random.normal(loc=0, scale=std, size=number*100))
-        locations = np.array([l for l in locations if min(dists) <= l <= max(dists)])[:number]
+        # distances of segments from the centroid, sorted ascending
+        dists = self.tree_index.get_distances_from(centroid)[seg_ids]
+        order = np.argsort(dists, kind='stable')
+        seg_ids = seg_ids[order]
+        dists = dists[order]
 
-        results = []
-        for l in locations:
-            seg = None
-            min_diff = np.inf
+        rng = self._get_random_stream()
+        locations = np.abs(rng.normal(loc=0, scale=std, size=number*100))
+        locations = locations[(dists[0] <= locations) & (locations <= dists[-1])][:number]
 
-            for dst, seg_i in dists_seg_ids:
-                diff = abs(l - dst)
-                if diff < min_diff:
-                    min_diff = diff
-                    seg = segs[seg_i]
-                if diff > min_diff:
-                    break
-
-            if seg is None:
-                raise ValueError("Couldn't file the nearest segment.")
+        # the nearest segment for each location (the first one in case of equal distances)
+        right = np.clip(np.searchsorted(dists, locations), 0, len(dists) - 1)
+        left = np.clip(right - 1, 0, len(dists) - 1)
+        nearest = np.where(locations - dists[left] <= dists[right] - locations, left, right)
+        nearest = np.searchsorted(dists, dists[nearest], side='left')
 
+        results = []
+        for seg_i in seg_ids[nearest].tolist():
+            seg = segment_index.segs[seg_i]
             r = self.add_synapse(source=source, mod_name=mod_name, seg=seg,
                                  netcon_weight=netcon_weight, delay=delay,
                                  threshold=threshold, tag=tag, **synaptic_params)
@@ -290,6 +427,23 @@ class SynapticCell(NetConCell):
 
         return results
 
+    @staticmethod
+    def _get_bulk_values(value, size: int, name: str, rng=None) -> list:
+        """
+        :param value:
+            single value, Dist object or list/array of size values
+        :return:
+            list of size values
+        """
+        if isinstance(value, Dist):
+            return value.sample(n=size, rng=rng).tolist()
+        if isinstance(value, (list, tuple, np.ndarray)):
+            if len(value) != size:
+                raise ValueError("Param %s must have the same size as segs: %s, but provided %s"
+                                 % (name, size, len(value)))
+            return list(value)
+        return [value] * size
+
     def _add_raw_synapse(self, source, mod_name, point_process: PointProcess, netcon: NetCon,
                          tag=None):
         """
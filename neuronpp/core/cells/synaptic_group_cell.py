@@ -2,6 +2,7 @@ from collections import defaultdict
 from typing import Optional, Iterable
 
 from neuronpp.core.cells.synaptic_cell import SynapticCell
+from neuronpp.core.cells.indexed_list import IndexedList
 from neuronpp.core.hocwrappers.synapses.single_synapse import SingleSynapse
 from neuronpp.core.hocwrappers.synapses.synaptic_group import SynapticGroup
 
@@ -14,7 +15,7 @@ class SynapticGroupCell(SynapticCell):
         :param compile_paths:
         """
         SynapticCell.__init__(self, name, compile_paths=compile_paths)
-        self.group_syns = []
+        self.group_syns = IndexedList()
         self._group_syn_num = defaultdict(int)
 
     def filter_synaptic_group(self, mod_name: str = None, name=None, parent=None, tag=None,
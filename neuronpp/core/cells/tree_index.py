@@ -0,0 +1,358 @@
+from typing import Union
+
+import numpy as np
+from nrn import Segment
+
+from neuronpp.core.hocwrappers.seg import Seg, get_lambda
+from neuronpp.core.cells.segment_index import SegmentIndex
+
+
+class TreeIndex:
+    def __init__(self, segment_index: SegmentIndex):
+        """
+        Section tree of the cell, computed once from NEURON topology, for path distance queries
+        without h.distance() calls.
+
+        Section arrays are aligned with segment_index.secs:
+            * parent_ids - index of the parent section, -1 for root sections (or sections which
+              parent is not in the index)
+            * parent_x - location on the parent section where the section is connected (the
+              center of the parent's segment, as in NEURON)
+            * orientation - end of the section connected to the parent (0 or 1), 0 for roots
+            * depths - number of sections on the path to the root
+
+        Segment arrays are aligned with segment_index.segs:
+            * root_distances - path distance (in um) of each segment from the root, which is the
+              0 end of the root section (as for h.distance())
+
+        Pairwise distances are computed from distances to the root and the lowest common
+        ancestor (LCA) of both sections, found with binary lifting, so all queries are numpy
+        array lookups. Points in different trees (not connected) have infinite distance.
+
+        The index is invalid after changes of the topology, L or nseg (cell.tree_index is
+        rebuilt automatically after changes made by the cell's methods). After changes of diam,
+        Ra or g_pas of pas mechanism call cell.invalidate_segment_index() to update electrotonic
+        distances.
+
+        :param segment_index:
+            SegmentIndex of the cell
+        """
+        self.segment_index = segment_index
+        secs = segment_index.secs
+        sec_num = len(secs)
+        self._sec_ids = {sec.hoc: i for i, sec in enumerate(secs)}
+
+        self.parent_ids = np.full(sec_num, -1, dtype=int)
+        self.parent_x = np.zeros(sec_num, dtype=float)
+        self.orientation = np.zeros(sec_num, dtype=float)
+        self.nseg = np.zeros(sec_num, dtype=int)
+        self._seg_starts = np.zeros(sec_num, dtype=int)
+        for i, sec in enumerate(secs):
+            hoc_sec = sec.hoc
+            self.nseg[i] = hoc_sec.nseg
+            self._seg_starts[i] = segment_index.get_seg_ids([sec])[0]
+            parent_seg = hoc_sec.parentseg()
+            if parent_seg is not None and parent_seg.sec in self._sec_ids:
+                self.parent_ids[i] = self._sec_ids[parent_seg.sec]
+                self.parent_x[i] = parent_seg.x
+                self.orientation[i] = hoc_sec.orientation()
+        self.parent_x = self._get_node_x(np.maximum(self.parent_ids, 0), self.parent_x)
+
+        # sections ordered from roots to leaves, so parents are always before children
+        children = [[] for _ in range(sec_num)]
+        for i, parent_i in enumerate(self.parent_ids.tolist()):
+            if parent_i >= 0:
+                children[parent_i].append(i)
+        self._order = []
+        stack = [i for i in range(sec_num) if self.parent_ids[i] < 0]
+        while stack:
+            i = stack.pop()
+            self._order.append(i)
+            stack.extend(children[i])
+
+        self.depths = np.zeros(sec_num, dtype=int)
+        self.root_ids = np.arange(sec_num)
+        for i in self._order:
+            parent_i = self.parent_ids[i]
+            if parent_i >= 0:
+                self.depths[i] = self.depths[parent_i] + 1
+                self.root_ids[i] = self.root_ids[parent_i]
+
+        # binary lifting table: _ancestors[k][i] is the 2^k-th ancestor of i (or root itself)
+        parents = np.where(self.parent_ids >= 0, self.parent_ids, np.arange(sec_num))
+        self._ancestors = [parents]
+        max_depth = int(self.depths.max()) if sec_num > 0 else 0
+        while (1 << len(self._ancestors)) <= max_depth:
+            self._ancestors.append(self._ancestors[-1][self._ancestors[-1]])
+
+        self._metrics = {}
+        self.root_distances = self._get_metric(electrotonic=False)[3]
+
+    @property
+    def electrotonic_root_distances(self) -> np.ndarray:
+        """
+        :return:
+            electrotonic distance (path length normalized by the lambda of each segment, see
+            Seg.get_lambda()) of each segment from the root. All segments must have pas
+            mechanism.
+        """
+        return self._get_metric(electrotonic=True)[3]
+
+    def get_sec_id(self, seg: Union[Seg, Segment]) -> int:
+        """
+        :param seg:
+            Seg or hoc segment
+        :return:
+            index of the section of the segment (in segment_index.secs)
+        """
+        if isinstance(seg, Seg):
+            seg = seg.hoc
+        sec_i = self._sec_ids.get(seg.sec)
+        if sec_i is None:
+            raise LookupError("Segment %s is not a part of the tree index." % seg)
+        return sec_i
+
+    def lca(self, sec_ids_a: np.ndarray, sec_ids_b: np.ndarray) -> np.ndarray:
+        """
+        :param sec_ids_a:
+            array of section indices
+        :param sec_ids_b:
+            array of section indices
+        :return:
+            array of indices of the lowest common ancestors of each pair of sections,
+            -1 if sections are in different trees
+        """
+        return self._lca(sec_ids_a, sec_ids_b)[0]
+
+    def get_distances(self, sec_ids_a: np.ndarray, x_a: np.ndarray, sec_ids_b: np.ndarray,
+                      x_b: np.ndarray, electrotonic=False) -> np.ndarray:
+        """
+        Pairwise path distances between points (sec_ids_a, x_a) and (sec_ids_b, x_b).
+        All arrays are broadcast against each other.
+
+        :param sec_ids_a:
+            section indices of the first points
+        :param x_a:
+            locations (between 0 and 1) of the first points
+        :param sec_ids_b:
+            section indices of the second points
+        :param x_b:
+            locations (between 0 and 1) of the second points
+        :param electrotonic:
+            if True returns electrotonic distances, otherwise distances in um
+        :return:
+            array of distances
+        """
+        sec_ids_a, x_a, sec_ids_b, x_b = np.broadcast_arrays(
+            np.asarray(sec_ids_a, dtype=int), np.asarray(x_a, dtype=float),
+            np.asarray(sec_ids_b, dtype=int), np.asarray(x_b, dtype=float))
+        sec_ids_a = sec_ids_a.ravel()
+        sec_ids_b = sec_ids_b.ravel()
+        shape = x_a.shape
+        # h.distance() measures to the center of the segment containing the point
+        x_a = self._get_node_x(sec_ids_a, x_a.ravel())
+        x_b = self._get_node_x(sec_ids_b, x_b.ravel())
+
+        lca, child_a, child_b = self._lca(sec_ids_a, sec_ids_b)
+        connected = lca >= 0
+        lca = np.where(connected, lca, 0)
+
+        # points on the LCA section where paths from a and b enter it
+        lca_x_a = np.where(child_a >= 0, self.parent_x[child_a], x_a)
+        lca_x_b = np.where(child_b >= 0, self.parent_x[child_b], x_b)
+
+        metric = self._get_metric(electrotonic)
+        dist_a = self._get_root_distance(sec_ids_a, x_a, metric)
+        dist_b = self._get_root_distance(sec_ids_b, x_b, metric)
+        lca_a = self._get_root_distance(lca, lca_x_a, metric)
+        lca_b = self._get_root_distance(lca, lca_x_b, metric)
+        along_lca = np.abs(self._get_position(lca, lca_x_a, metric) -
+                           self._get_position(lca, lca_x_b, metric))
+
+        distances = (dist_a - lca_a) + (dist_b - lca_b) + along_lca
+        return np.where(connected, distances, np.inf).reshape(shape)
+
+    def get_distance(self, seg_a: Union[Seg, Segment], seg_b: Union[Seg, Segment],
+                     electrotonic=False) -> float:
+        """
+        :param seg_a:
+            Seg or hoc segment
+        :param seg_b:
+            Seg or hoc segment
+        :param electrotonic:
+            if True returns electrotonic distance, otherwise distance in um
+        :return:
+            path distance between segments
+        """
+        x_a = seg_a.hoc.x if isinstance(seg_a, Seg) else seg_a.x
+        x_b = seg_b.hoc.x if isinstance(seg_b, Seg) else seg_b.x
+        return float(self.get_distances(self.get_sec_id(seg_a), x_a, self.get_sec_id(seg_b), x_b,
+                                        electrotonic=electrotonic))
+
+    def get_distances_from(self, origin: Union[Seg, Segment], electrotonic=False) -> np.ndarray:
+        """
+        :param origin:
+            Seg or hoc segment
+        :param electrotonic:
+            if True returns electrotonic distances, otherwise distances in um
+        :return:
+            array of path distances from the origin to all segments (aligned with
+            segment_index.segs)
+        """
+        x = origin.hoc.x if isinstance(origin, Seg) else origin.x
+        return self.get_distances(self.get_sec_id(origin), x, self.segment_index.sec_ids,
+                                  self.segment_index.x, electrotonic=electrotonic)
+
+    def get_end_distances_from(self, origin: Union[Seg, Segment],
+                               electrotonic=False) -> np.ndarray:
+        """
+        :param origin:
+            Seg or hoc segment
+        :param electrotonic:
+            if True returns electrotonic distances, otherwise distances in um
+        :return:
+            array of shape (len(secs), 2) with path distances from the origin to 0 and 1 ends of
+            each section
+        """
+        x = origin.hoc.x if isinstance(origin, Seg) else origin.x
+        sec_ids = np.arange(len(self.parent_ids))[:, np.newaxis]
+        return self.get_distances(self.get_sec_id(origin), x, sec_ids, np.array([[0.0, 1.0]]),
+                                  electrotonic=electrotonic)
+
+    def _lca(self, sec_ids_a, sec_ids_b):
+        """
+        :return:
+            tuple of arrays:
+              * LCA of each pair (-1 if sections are in different trees)
+              * child of the LCA on the path to a (-1 if a is the LCA)
+              * child of the LCA on the path to b (-1 if b is the LCA)
+        """
+        a = np.array(sec_ids_a, dtype=int, copy=True).ravel()
+        b = np.array(sec_ids_b, dtype=int, copy=True).ravel()
+        connected = self.root_ids[a] == self.root_ids[b]
+        depth_a = self.depths[a]
+        depth_b = self.depths[b]
+        lca_depth = np.minimum(depth_a, depth_b)
+
+        # lift both to the same depth, but keep them 1 level below the LCA if possible
+        a = self._lift(a, depth_a - lca_depth)
+        b = self._lift(b, depth_b - lca_depth)
+        for ancestors in reversed(self._ancestors):
+            ancestor_a = ancestors[a]
+            ancestor_b = ancestors[b]
+            differ = ancestor_a != ancestor_b
+            a = np.where(differ, ancestor_a, a)
+            b = np.where(differ, ancestor_b, b)
+
+        same = a == b
+        lca = np.where(same, a, self._ancestors[0][a])
+        lca_depth = self.depths[lca]
+
+        # children of the LCA on the path to the original sections
+        orig_a = np.asarray(sec_ids_a, dtype=int).ravel()
+        orig_b = np.asarray(sec_ids_b, dtype=int).ravel()
+        child_a = self._lift(orig_a, np.maximum(depth_a - lca_depth - 1, 0))
+        child_b = self._lift(orig_b, np.maximum(depth_b - lca_depth - 1, 0))
+        child_a = np.where(depth_a > lca_depth, child_a, -1)
+        child_b = np.where(depth_b > lca_depth, child_b, -1)
+
+        lca = np.where(connected, lca, -1)
+        return lca, child_a, child_b
+
+    def _lift(self, sec_ids, steps):
+        steps = np.asarray(steps, dtype=int)
+        for k, ancestors in enumerate(self._ancestors):
+            move = (steps >> k) & 1 == 1
+            sec_ids = np.where(move, ancestors[sec_ids], sec_ids)
+        return sec_ids
+
+    def _get_metric(self, electrotonic):
+        """
+        :return:
+            tuple of arrays:
+              * metric length of each segment (in um or electrotonic)
+              * distance from the 0 end of the section to the start of each segment
+              * root distance of the connected end of each section
+              * root distance of each segment
+        """
+        metric = self._metrics.get(electrotonic)
+        if metric is not None:
+            return metric
+
+        index = self.segment_index
+        seg_lengths = index.lengths
+        if electrotonic:
+            seg_lengths = seg_lengths / self._get_lambdas()
+        seg_starts = np.cumsum(seg_lengths) - seg_lengths
+        seg_starts -= np.repeat(seg_starts[self._seg_starts], self.nseg)
+
+        sec_dists = np.zeros(len(self.parent_ids), dtype=float)
+        metric = (seg_lengths, seg_starts, sec_dists)
+        for i in self._order:
+            parent_i = self.parent_ids[i]
+            if parent_i >= 0:
+                positions = self._get_position(np.array([parent_i, parent_i]),
+                                               np.array([self.parent_x[i],
+                                                         self.orientation[parent_i]]), metric)
+                sec_dists[i] = sec_dists[parent_i] + abs(positions[0] - positions[1])
+
+        seg_dists = self._get_root_distance(index.sec_ids, index.x, metric)
+        metric = (seg_lengths, seg_starts, sec_dists, seg_dists)
+        self._metrics[electrotonic] = metric
+        return metric
+
+    def _get_position(self, sec_ids, x, metric):
+        """
+        :return:
+            array of distances from the 0 end of the section to each point, in the metric
+        """
+        seg_lengths, seg_starts = metric[0], metric[1]
+        nseg = self.nseg[sec_ids]
+        scaled = x * nseg
+        seg_i = np.clip(np.floor(scaled).astype(int), 0, nseg - 1)
+        seg_ids = self._seg_starts[sec_ids] + seg_i
+        return seg_starts[seg_ids] + (scaled - seg_i) * seg_lengths[seg_ids]
+
+    def _get_node_x(self, sec_ids, x):
+        """
+        :return:
+            array of locations of the centers of segments containing each point, the 0 and 1
+            ends are left unchanged
+        """
+        nseg = self.nseg[sec_ids]
+        seg_i = np.clip(np.floor(x * nseg), 0, nseg - 1)
+        return np.where((x > 0) & (x < 1), (seg_i + 0.5) / nseg, x)
+
+    def _get_root_distance(self, sec_ids, x, metric):
+        """
+        :return:
+            array of root distances of each point, in the metric
+        """
+        return metric[2][sec_ids] + np.abs(self._get_position(sec_ids, x, metric) -
+                                           self._get_position(sec_ids, self.orientation[sec_ids],
+                                                              metric))
+
+    def _get_lambdas(self):
+        """
+        :return:
+            array of lambda (in um) of each segment, see Seg.get_lambda()
+        """
+        diams = []
+        ras = []
+        g_pas = []
+        for seg in self.segment_index.segs:
+            hoc_seg = seg.hoc
+            if not hasattr(hoc_seg, "pas"):
+                raise ValueError("Segment %s must have 'pas' mechanism in order to get "
+                                 "electrotonic distance" % hoc_seg)
+            diams.append(hoc_seg.diam)
+            ras.append(hoc_seg.sec.Ra)
+            g_pas.append(hoc_seg.pas.g)
+        return get_lambda(diam=np.array(diams, dtype=float), Ra=np.array(ras, dtype=float),
+                          g_pas=np.array(g_pas, dtype=float))
+
+    def __len__(self):
+        return len(self.parent_ids)
+
+    def __repr__(self):
+        return "{}[{}]".format(self.__class__.__name__, len(self))
@@ -20,7 +20,7 @@ def get_vecstim(ping_array):
     return stim, vec
 
 
-def get_spine_number(sec: Sec, density, area_density=False):
+def get_spine_number(sec: Sec, density, area_density=False, rng=None):
     """
     Calculate expected number of spines based on section dimensions and
     spine density. This function works for both linear density and surface
@@ -38,6 +38,8 @@ def get_spine_number(sec: Sec, density, area_density=False):
         if True density is treated as surface density. Otherwise density
         is linear density.
     :param area_density:
+    :param rng:
+        numpy Generator to draw from. Default is None, which means the global numpy random state.
     :return spine_number:
         integer
     """
@@ -50,7 +52,9 @@ def get_spine_number(sec: Sec, density, area_density=False):
     # if spine density is low (less than 1 per comp)
     # use random number to determine whether to add a spine
     if not spine_number:
-        rand = np.random.uniform()
+        if rng is None:
+            rng = np.random
+        rand = rng.uniform()
         if rand > spine_number:
             return 1
         return 0
@@ -103,3 +107,36 @@ def establish_electric_properties(section: Sec, spine_E_pas, spine_g_pas,
         cm = spine_cm
 
     return E_pas, g_pas, ra, cm
+
+
+def get_distribution_function(dist_type, s3=None, s4=None, s5=None, s6=None, s7=1.0):
+    """
+    Returns vectorized function of the distance, made from the parameters of the Hay 2011
+    L5PCTemplate.hoc proc distribute_channels():
+        * 'lin' - linear: s3 + dist * s4
+        * 'sigm' - sigmoidal: s3 + s4 / (1 + exp((dist - s5) / s6))
+        * 'exp' - exponential: s3 + s6 * exp(s4 * (dist - s5))
+        * 'abs' - absolute: s3 if s5 < dist < s6 else s4
+    Each value is multiplied by s7.
+
+    :param dist_type:
+        'lin', 'sigm', 'exp' or 'abs'
+    :return:
+        function which takes numpy array of distances and returns numpy array of values
+    """
+    if dist_type == 'lin':
+        def func(dist):
+            return (s3 + dist * s4) * s7
+    elif dist_type == 'sigm':
+        def func(dist):
+            return (s3 + s4 / (1 + np.exp((dist - s5) / s6))) * s7
+    elif dist_type == 'exp':
+        def func(dist):
+            return (s3 + s6 * np.exp(s4 * (dist - s5))) * s7
+    elif dist_type == 'abs':
+        def func(dist):
+            return np.where((s5 < dist) & (dist < s6), s3, s4) * s7
+    else:
+        raise ValueError("The only allowed dist_type are abs,lin,sigm,exp, but provided %s"
+                         % dist_type)
+    return func
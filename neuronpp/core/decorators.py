@@ -58,6 +58,9 @@ def distparams(_func=None, *, exclude: List[str] = None, include: List[str] = No
     pass the name of that param to the exclude list.
 
     It may only affect numerical types of params (int, float). The other types cannot be affected.
+
+    If the decorated method belongs to an object with _get_random_stream() method (eg. cell)
+    values are drawn from the object's random stream, otherwise from the global numpy random state.
     :param _func:
         function which have been decorated
     :param exclude:
@@ -79,13 +82,18 @@ def distparams(_func=None, *, exclude: List[str] = None, include: List[str] = No
             if include and not isinstance(include, list):
                 raise ValueError("Parameter 'include' in @distparam decorator must be list or None")
 
+            rng = None
             for key, value in kwargs.items():
                 if include and key in include:
                     pass
                 elif not include and exclude and key in exclude:
                     continue
                 if isinstance(value, Dist):
-                    kwargs[key] = get_rand(value=value)
+                    # draw from the random stream of the object (eg. cell) if it has any
+                    if rng is None and len(args) > 0 and \
+                            hasattr(args[0], "_get_random_stream"):
+                        rng = args[0]._get_random_stream()
+                    kwargs[key] = get_rand(value=value, rng=rng)
 
             return func(*args, **kwargs)
 
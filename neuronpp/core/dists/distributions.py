@@ -1,6 +1,10 @@
+import abc
+
 import numpy as np
 from typing import Optional
 
+from neuronpp.core.dists import random_streams
+
 # ----------------------------------------- DISTS -----------------------------------------
 
 
@@ -12,9 +16,48 @@ class Dist:
 
     @classmethod
     def set_seed(cls, seed):
+        """
+        Set seed of the global numpy random state and of all random streams (see
+        neuronpp.core.dists.random_streams), which are used by cells and connections.
+        """
         np.random.seed(seed)
+        random_streams.set_seed(seed)
         cls.seed = seed
 
+    def sample(self, n: Optional[int] = None, rng=None):
+        """
+        Draw n values from the distribution at once.
+
+        Values of TruncatedDist are absolute values of the drawn numbers. If dtype is int - values
+        are rounded to the nearest integer.
+
+        :param n:
+            number of values to draw. Default is None, which means a single value (not array)
+            will be returned
+        :param rng:
+            numpy Generator (eg. from random_streams) to draw from.
+            Default is None, which means the global numpy random state.
+        :return:
+            numpy array of n values or a single value if n is None
+        """
+        if rng is None:
+            rng = np.random
+
+        result = self._draw(size=n, rng=rng)
+        if isinstance(self, TruncatedDist):
+            result = np.abs(result)
+
+        if "int" in self.dtype.lower():
+            if n is None:
+                return int(round(result))
+            return np.round(result).astype(int)
+        if n is None:
+            return float(result)
+        return result
+
+    def _draw(self, size: Optional[int], rng):
+        raise TypeError("Not allowed value type for Dist: %s" % self)
+
 
 class TruncatedDist(Dist):
     pass
@@ -26,6 +69,9 @@ class UniformDist(Dist):
         self.low = low
         self.high = high
 
+    def _draw(self, size: Optional[int], rng):
+        return rng.uniform(low=self.low, high=self.high, size=size)
+
 
 class UniformTruncatedDist(UniformDist, TruncatedDist):
     def __init__(self, low=0, high=1, dtype="float"):
@@ -40,6 +86,9 @@ class NormalDist(Dist):
         self.mean = mean
         self.std = std
 
+    def _draw(self, size: Optional[int], rng):
+        return rng.normal(loc=self.mean, scale=self.std, size=size)
+
 
 class NormalTruncatedDist(NormalDist, TruncatedDist):
     def __init__(self, mean, std, dtype="float"):
@@ -53,6 +102,9 @@ class LogNormalDist(NormalDist):
     def __init__(self, mean, std, dtype="float"):
         NormalDist.__init__(self, mean=mean, std=std, dtype=dtype)
 
+    def _draw(self, size: Optional[int], rng):
+        return rng.lognormal(mean=self.mean, sigma=self.std, size=size)
+
 
 class LogNormalTruncatedDist(LogNormalDist, TruncatedDist):
     def __init__(self, mean, std, dtype="float"):
@@ -166,3 +218,110 @@ class LogNormalConnectionProba(NormalConnectionProba):
             standard deviation of the normal distribution
         """
         NormalConnectionProba.__init__(self, threshold=threshold, mean=mean, std=std)
+
+    def _draw(self, size: Optional[int], rng):
+        return rng.lognormal(mean=self.mean, sigma=self.std, size=size)
+
+
+class DistanceConnectionProba(ConnectionProba, abc.ABC):
+    def __init__(self, peak: float, max_distance: float):
+        """
+        Base class for probability of the occurrence of connection between 2 neurons, which
+        depends on the distance (in um) between the source and the soma of the target cell.
+
+        Contrary to other ConnectionProba the connection is made if a Uniform distribution number
+        < proba(distance), so the returned value is a real probability of connection.
+
+        Pairs of cells further than max_distance are never connected and they are not even
+        tested, so for large networks build time depends on the number of neighbours in
+        max_distance, not on the number of all pairs.
+
+        :param peak:
+            probability of connection for distance=0. Must be between 0 and 1.
+        :param max_distance:
+            maximal distance (in um) between the source and the target cell to make a connection
+        """
+        if not 0 <= peak <= 1:
+            raise ValueError("Param peak for connection probability must be between 0 and 1.")
+        if max_distance is None or max_distance < 0:
+            raise ValueError("Param max_distance must be >= 0.")
+        ConnectionProba.__init__(self, threshold=peak)
+        self.peak = peak
+        self.max_distance = max_distance
+
+    @abc.abstractmethod
+    def proba(self, distances: np.ndarray) -> np.ndarray:
+        """
+        :param distances:
+            numpy array of distances (in um) between sources and target cells
+        :return:
+            numpy array of connection probabilities for each distance
+        """
+
+
+class GaussianConnectionProba(DistanceConnectionProba):
+    def __init__(self, sigma: float, peak: float = 1.0, max_distance: Optional[float] = None):
+        """
+        Probability of connection decays with the distance d (in um) as:
+        peak * exp(-d^2 / (2 * sigma^2))
+
+        :param sigma:
+            standard deviation (in um) of the gaussian profile
+        :param peak:
+            probability of connection for distance=0. Must be between 0 and 1.
+        :param max_distance:
+            maximal distance (in um) between the source and the target cell.
+            Default is None, which means 3 * sigma.
+        """
+        if sigma <= 0:
+            raise ValueError("Param sigma must be > 0.")
+        if max_distance is None:
+            max_distance = 3 * sigma
+        DistanceConnectionProba.__init__(self, peak=peak, max_distance=max_distance)
+        self.sigma = sigma
+
+    def proba(self, distances: np.ndarray) -> np.ndarray:
+        return self.peak * np.exp(-np.square(distances) / (2 * self.sigma ** 2))
+
+
+class ExponentialConnectionProba(DistanceConnectionProba):
+    def __init__(self, length_constant: float, peak: float = 1.0,
+                 max_distance: Optional[float] = None):
+        """
+        Probability of connection decays with the distance d (in um) as:
+        peak * exp(-d / length_constant)
+
+        :param length_constant:
+            distance (in um) at which the probability drops to peak/e
+        :param peak:
+            probability of connection for distance=0. Must be between 0 and 1.
+        :param max_distance:
+            maximal distance (in um) between the source and the target cell.
+            Default is None, which means 5 * length_constant.
+        """
+        if length_constant <= 0:
+            raise ValueError("Param length_constant must be > 0.")
+        if max_distance is None:
+            max_distance = 5 * length_constant
+        DistanceConnectionProba.__init__(self, peak=peak, max_distance=max_distance)
+        self.length_constant = length_constant
+
+    def proba(self, distances: np.ndarray) -> np.ndarray:
+        return self.peak * np.exp(-np.asarray(distances) / self.length_constant)
+
+
+class CutoffConnectionProba(DistanceConnectionProba):
+    def __init__(self, max_distance: float, peak: float = 1.0):
+        """
+        Probability of connection is constant (peak) for distance <= max_distance (in um) and 0
+        for further cells.
+
+        :param max_distance:
+            maximal distance (in um) between the source and the target cell
+        :param peak:
+            probability of connection for distance <= max_distance. Must be between 0 and 1.
+        """
+        DistanceConnectionProba.__init__(self, peak=peak, max_distance=max_distance)
+
+    def proba(self, distances: np.ndarray) -> np.ndarray:
+        return np.full(np.shape(distances), self.peak, dtype=float)
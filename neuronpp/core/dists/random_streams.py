@@ -0,0 +1,170 @@
+"""
+Counter-based random streams.
+
+Each stream is a numpy Generator with Philox bit generator, where:
+  * the Philox key is made of the seed (set by Dist.set_seed()) and the stream namespace
+    (eg. connections, cells)
+  * the Philox counter is made of up to 3 integer keys which identify the stream inside the
+    namespace (eg. connector id, source index, target index)
+
+So random numbers drawn from the stream depend only on the seed and the keys of the stream, not
+on the order of building. It allows to build cells or connections in any order (or only part of
+them, eg. on a single MPI rank) and get the same result as during a serial build.
+"""
+import zlib
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+CONNECTION_STREAM = 1
+CELL_STREAM = 2
+POPULATION_STREAM = 3
+
+_UINT32_MASK = 2 ** 32 - 1
+_UINT64_MASK = 2 ** 64 - 1
+
+# seed set by Dist.set_seed()
+_seed = None
+# seed used if Dist.set_seed() was not called. It is drawn once per process
+_default_seed = None
+
+# number of streams already taken with next_stream() for each key
+_stream_counters = defaultdict(int)
+# number of cells created with each name outside of stream_scope()
+_name_counters = defaultdict(int)
+_scope_keys = []
+
+
+def name_key(name: str) -> int:
+    """
+    :param name:
+        any string, eg. name of the population
+    :return:
+        32-bit integer key created from the name
+    """
+    if name is None:
+        name = ""
+    return zlib.crc32(name.encode())
+
+
+def pack_keys(high: int, low: int) -> int:
+    """
+    Pack 2 x 32-bit keys into a single 64-bit key
+    """
+    return ((int(high) & _UINT32_MASK) << 32) | (int(low) & _UINT32_MASK)
+
+
+def get_seed() -> int:
+    """
+    :return:
+        seed of streams. It is Dist.seed if set by Dist.set_seed(), otherwise a random seed drawn
+        once per process.
+    """
+    global _default_seed
+    if _seed is not None:
+        return _seed
+    if _default_seed is None:
+        _default_seed = int(np.random.SeedSequence().entropy) & _UINT64_MASK
+    return _default_seed
+
+
+def get_stream(namespace: int, *keys: int) -> np.random.Generator:
+    """
+    Returns a new Generator for the stream defined by namespace and keys. Each call with the same
+    seed, namespace and keys returns a Generator which produces the same numbers.
+
+    :param namespace:
+        namespace of the stream, eg. CONNECTION_STREAM
+    :param keys:
+        up to 3 non-negative integers (each up to 64-bit) identifying the stream in the namespace
+    :return:
+        numpy Generator with Philox bit generator
+    """
+    if len(keys) > 3:
+        raise ValueError("Random stream can be identified by up to 3 keys, but provided %s"
+                         % len(keys))
+    # build uint64 array explicitly - python ints >= 2**63 would be otherwise converted to float
+    counter = np.array([0] + [int(k) & _UINT64_MASK for k in keys] + [0] * (3 - len(keys)),
+                       dtype=np.uint64)
+    key = get_seed() | (int(namespace) << 64)
+    return np.random.Generator(np.random.Philox(key=key, counter=counter))
+
+
+def next_stream(namespace: int, *keys: int) -> np.random.Generator:
+    """
+    Returns a new Generator for the next stream of the object identified by namespace and up to
+    2 keys. Each call returns a different stream, while the sequence of streams is always the same
+    after Dist.set_seed().
+
+    It is useful for objects (eg. cells) which draw random numbers in many independent calls.
+
+    :param namespace:
+        namespace of the stream, eg. CELL_STREAM
+    :param keys:
+        up to 2 non-negative integers identifying the object in the namespace
+    :return:
+        numpy Generator with Philox bit generator
+    """
+    if len(keys) > 2:
+        raise ValueError("Object's random stream can be identified by up to 2 keys, "
+                         "but provided %s" % len(keys))
+    counter_key = (namespace,) + tuple(keys)
+    call_num = _stream_counters[counter_key]
+    _stream_counters[counter_key] += 1
+
+    keys = tuple(keys) + (0,) * (2 - len(keys))
+    return get_stream(namespace, *keys, call_num)
+
+
+def set_seed(seed: int):
+    """
+    Set seed of all streams and reset the sequence of streams returned by next_stream() and
+    numbering of cells' keys. It is called by Dist.set_seed().
+
+    :param seed:
+        non-negative integer
+    """
+    global _seed
+    _seed = int(seed) & _UINT64_MASK
+    _stream_counters.clear()
+    _name_counters.clear()
+
+
+def get_cell_key(name: str) -> tuple:
+    """
+    Returns 2 keys for the random stream of the newly created cell.
+
+    Inside stream_scope() (eg. while Population creates its cells) it is the key of the scope.
+    Otherwise it is the key of the cell name and the number of cells with this name created
+    before (since the last Dist.set_seed()).
+
+    :param name:
+        name of the cell
+    :return:
+        tuple of 2 integer keys
+    """
+    if _scope_keys:
+        return _scope_keys[-1]
+    key = name_key(name)
+    num = _name_counters[key]
+    _name_counters[key] += 1
+    return key, num
+
+
+@contextmanager
+def stream_scope(high: int, low: int):
+    """
+    Cells created inside the scope will have random stream keys (high, low) instead of keys
+    based on their names.
+
+    :param high:
+        32-bit integer key, eg. name_key() of the population
+    :param low:
+        32-bit integer key, eg. index of the cell in the population
+    """
+    _scope_keys.append((int(high) & _UINT32_MASK, int(low) & _UINT32_MASK))
+    try:
+        yield
+    finally:
+        _scope_keys.pop()
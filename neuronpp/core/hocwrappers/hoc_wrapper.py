@@ -4,6 +4,9 @@ from neuronpp.core.hocwrappers.wrapper import Wrapper
 
 
 class HocWrapper(Wrapper):
+    # _indexed_lists - weak references to IndexedLists which indexed this object
+    __slots__ = ("parent", "name", "hoc", "_indexed_lists")
+
     def __init__(self, hoc_obj, parent: Optional, name: str):
         """
         HocWrapper is a wrapper for a single HOC object.
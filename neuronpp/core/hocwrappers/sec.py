@@ -1,3 +1,5 @@
+import weakref
+
 import nrn
 import numpy as np
 from numpy import pi
@@ -5,12 +7,15 @@ from typing import Optional
 
 from neuronpp.core.hocwrappers.seg import Seg
 from neuronpp.core.cells.core_cell import CoreCell
+from neuronpp.core.cells.indexed_list import IndexedList
 from neuronpp.core.decorators import non_removable_fields
 from neuronpp.core.hocwrappers.hoc_wrapper import HocWrapper
 
 
 @non_removable_fields("cell")
 class Sec(HocWrapper):
+    __slots__ = ("cell", "_hoc_segs", "_seg_refs", "_seg_locs")
+
     def __init__(self, obj: nrn.Section, cell: CoreCell, name: str):
         """
         Create wrapper for the Section object from HOC.
@@ -20,6 +25,11 @@ class Sec(HocWrapper):
 
         Removal is not intented to remove any children of this section.
 
+        Seg wrappers (segs and sec(loc) for locations of segments) are reused as long as they
+        are referenced anywhere (eg. by synapses or the cell's segment index) and until nseg of
+        the section changes. They are held by weak references, so the section doesn't keep its
+        segments (which keep the section) alive.
+
         :param obj:
             HOC's Section object
         :param cell:
@@ -29,6 +39,9 @@ class Sec(HocWrapper):
         """
 
         self.cell = cell
+        self._hoc_segs = None
+        self._seg_refs = None
+        self._seg_locs = None
         HocWrapper.__init__(self, hoc_obj=obj, parent=None, name=name)
 
     @property
@@ -38,8 +51,7 @@ class Sec(HocWrapper):
         """
         parent_seg = self.hoc.parentseg()
         if parent_seg:
-            hoc_sec = parent_seg.sec
-            return Sec(hoc_sec, cell=self.cell, name=hoc_sec.name())
+            return self._get_wrapper(parent_seg.sec)
         else:
             return None
 
@@ -50,8 +62,7 @@ class Sec(HocWrapper):
         """
         childs = []
         for hoc_sec in self.hoc.children():
-            sec = Sec(hoc_sec, cell=self.cell, name=hoc_sec.name())
-            childs.append(sec)
+            childs.append(self._get_wrapper(hoc_sec))
 
         return childs
 
@@ -63,7 +74,8 @@ class Sec(HocWrapper):
         The area computed as L * diam * pi maybe wrong if section consists of 3d points,
         that is why we summed up the area of all segments of the section
         """
-        return np.sum([s.area for s in self.segs])
+        # 0 and 1 ends have no area
+        return np.sum([hoc_seg.area() for hoc_seg in self.hoc])
 
     @property
     def Ra(self) -> float:
@@ -108,8 +120,51 @@ class Sec(HocWrapper):
         Returns all Segments wrapper in Seg object
         :return:
         """
-        return [Seg(obj=hoc_seg, parent=self) for hoc_seg in self.hoc.allseg()]
+        return list(self._get_segs())
 
     def __call__(self, loc) -> Seg:
-        hoc_seg = self.hoc(loc)
-        return Seg(obj=hoc_seg, parent=self)
+        self._update_segs()
+        seg_i = self._seg_locs.get(loc)
+        if seg_i is not None:
+            return self._get_seg(seg_i)
+        return Seg(obj=self.hoc(loc), parent=self)
+
+    def _get_segs(self):
+        """
+        :return:
+            list of Seg wrappers of all segments (including 0 and 1 ends), existing wrappers
+            are reused
+        """
+        self._update_segs()
+        return [self._get_seg(i) for i in range(len(self._hoc_segs))]
+
+    def _get_seg(self, i):
+        ref = self._seg_refs[i]
+        seg = None if ref is None else ref()
+        if seg is None:
+            seg = Seg(obj=self._hoc_segs[i], parent=self)
+            self._seg_refs[i] = weakref.ref(seg)
+        return seg
+
+    def _update_segs(self):
+        """
+        Reset hoc segments and Seg wrappers of the section if nseg has changed.
+        """
+        hoc_segs = self._hoc_segs
+        if hoc_segs is None or len(hoc_segs) != self.hoc.nseg + 2:
+            hoc_segs = list(self.hoc.allseg())
+            self._hoc_segs = hoc_segs
+            self._seg_refs = [None] * len(hoc_segs)
+            self._seg_locs = {hoc_seg.x: i for i, hoc_seg in enumerate(hoc_segs)}
+
+    def _get_wrapper(self, hoc_sec: nrn.Section):
+        """
+        :return:
+            Sec wrapper of the hoc section from the cell if it exists there, otherwise a new Sec
+        """
+        secs = getattr(self.cell, "secs", None)
+        if isinstance(secs, IndexedList):
+            for sec in secs.lookup("hoc", hoc_sec.name()):
+                if sec.hoc == hoc_sec:
+                    return sec
+        return Sec(hoc_sec, cell=self.cell, name=hoc_sec.name())
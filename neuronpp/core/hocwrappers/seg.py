@@ -1,5 +1,6 @@
 import nrn
 import numpy as np
+from neuron import h
 
 from neuronpp.core.hocwrappers.hoc_wrapper import HocWrapper
 
@@ -33,11 +34,26 @@ def get_lambda(diam, Ra, Rm=None, g_pas=None, tau_m=None, cm=1):
 
 
 class Seg(HocWrapper):
+    __slots__ = ("_name", "__weakref__")
+    # segments are not kept in IndexedLists
+    __setattr__ = object.__setattr__
+
     def __init__(self, obj: nrn.Segment, parent):
-        # force change all comas to dots
-        # for native systems where coma is utilize as decimal the name is inconsistent with x loc
-        name = str(obj).replace(",", ".")
-        HocWrapper.__init__(self, hoc_obj=obj, parent=parent, name=name)
+        # the name is created from the hoc segment on the first access
+        HocWrapper.__init__(self, hoc_obj=obj, parent=parent, name=None)
+
+    @property
+    def name(self) -> str:
+        if self._name is None:
+            # force change all comas to dots
+            # for native systems where coma is utilize as decimal the name is inconsistent with
+            # x loc
+            self._name = str(self.hoc).replace(",", ".")
+        return self._name
+
+    @name.setter
+    def name(self, name: str):
+        self._name = name
 
     def has_mechanism(self, name):
         """
@@ -72,12 +88,12 @@ class Seg(HocWrapper):
 
     @property
     def L(self) -> float:
-        # because NEURON's segment has always 1 and 0 locations with area=0 and L=0
-        # we discard them from the count
+        # NEURON's 0 and 1 locations have area=0 and L=0
         if self.area == 0:
             raise ValueError("Segment with area 0 have no length")
         else:
-            return self.parent.hoc.L / (len(self.parent.segs) - 2)
+            hoc_sec = self.hoc.sec
+            return hoc_sec.L / hoc_sec.nseg
 
     @property
     def diam(self) -> float:
@@ -91,6 +107,28 @@ class Seg(HocWrapper):
     def x(self) -> float:
         return self.hoc.x
 
+    @property
+    def position(self) -> np.ndarray:
+        """
+        3D position of the segment (in um) interpolated along the section's 3D points.
+        If the section has no 3D points - h.define_shape() will be called first.
+
+        :return:
+            numpy array of [x, y, z]
+        """
+        sec = self.parent.hoc
+        if sec.n3d() == 0:
+            h.define_shape()
+
+        n3d = sec.n3d()
+        points = np.array([[sec.x3d(i), sec.y3d(i), sec.z3d(i)] for i in range(n3d)])
+        arc = np.array([sec.arc3d(i) for i in range(n3d)])
+        if arc[-1] == 0:
+            return points[0]
+
+        arc /= arc[-1]
+        return np.array([np.interp(self.x, arc, points[:, i]) for i in range(3)])
+
     @property
     def electrotonic_L(self):
         """
@@ -34,8 +34,7 @@ class Spine(SecGroup):
     def parent(self):
         parent_seg = self.neck.hoc.parentseg()
         if parent_seg:
-            hoc_sec = parent_seg.sec
-            return Sec(hoc_sec, cell=self.cell, name=hoc_sec.name())
+            return self.neck._get_wrapper(parent_seg.sec)
         else:
             return None
 
@@ -0,0 +1,156 @@
+from typing import List, Union
+
+import numpy as np
+
+from neuronpp.core.hocwrappers.synapses.single_synapse import SingleSynapse
+from neuronpp.core.hocwrappers.synapses.synaptic_group import SynapticGroup
+
+
+class SynapseTable:
+    def __init__(self, syns: List[Union[SingleSynapse, SynapticGroup]]):
+        """
+        Columnar (struct of arrays) view of NetCons of the provided synapses.
+
+        Each element (row) is a single NetCon. All arrays have the same length and are aligned
+        with each other and with the netcons list:
+            * syn_ids - index of the single synapse (in synapses) of each NetCon
+            * cell_ids - index of the target cell (in cells)
+            * target_seg_ids - index of the target segment (in target_segs)
+            * source_ids - index of the source (in sources), -1 means no source (None)
+            * mod_codes - index of the point process name (in mod_names)
+            * weights, delays, thresholds - values of NetCons while creating the table
+
+        Synaptic groups are flattened to their single synapses.
+
+        Use get_weights() and set_weights() to read or write weights of all NetCons at once.
+        The table does not follow changes of synapses, create a new table if you add or remove
+        synapses or NetCons.
+
+        :param syns:
+            list of SingleSynapse or SynapticGroup objects
+        """
+        self.synapses = []
+        self.netcons = []
+        self.cells = []
+        self.target_segs = []
+        self.sources = []
+        self.mod_names = []
+
+        for syn in syns:
+            if isinstance(syn, SynapticGroup):
+                for syn_list in syn.values():
+                    self.synapses.extend(syn_list)
+            else:
+                self.synapses.append(syn)
+
+        cell_ids = {}
+        seg_ids = {}
+        source_ids = {}
+        mod_codes = {}
+        columns = []
+        for syn_i, syn in enumerate(self.synapses):
+            pp = syn.point_process
+            cell_i = self._get_id(cell_ids, self.cells, key=id(pp.cell), obj=pp.cell)
+            target = syn.parent
+            seg_i = self._get_id(seg_ids, self.target_segs, key=(target.parent.hoc, target.hoc.x),
+                                 obj=target)
+            mod_code = self._get_id(mod_codes, self.mod_names, key=syn.point_process_name,
+                                    obj=syn.point_process_name)
+
+            for nc in syn.netcons:
+                if nc.source is None:
+                    source_i = -1
+                else:
+                    source_i = self._get_id(source_ids, self.sources, key=id(nc.source),
+                                            obj=nc.source)
+                hoc_nc = nc.hoc
+                self.netcons.append(nc)
+                columns.append((syn_i, cell_i, seg_i, source_i, mod_code, hoc_nc.weight[0],
+                                hoc_nc.delay, hoc_nc.threshold))
+
+        # keep hoc NetCons to avoid wrapper's attribute lookup while reading/writing values
+        self._hoc_netcons = [nc.hoc for nc in self.netcons]
+
+        columns = np.array(columns, dtype=float).reshape(-1, 8)
+        self.syn_ids = columns[:, 0].astype(int)
+        self.cell_ids = columns[:, 1].astype(int)
+        self.target_seg_ids = columns[:, 2].astype(int)
+        self.source_ids = columns[:, 3].astype(int)
+        self.mod_codes = columns[:, 4].astype(int)
+        self.weights = columns[:, 5].copy()
+        self.delays = columns[:, 6].copy()
+        self.thresholds = columns[:, 7].copy()
+
+    def get_weights(self) -> np.ndarray:
+        """
+        Read current weights of all NetCons from NEURON. It also updates the weights array
+        of the table.
+
+        :return:
+            numpy array of weights aligned with netcons
+        """
+        self.weights = np.fromiter((nc.weight[0] for nc in self._hoc_netcons), dtype=float,
+                                   count=len(self._hoc_netcons))
+        return self.weights.copy()
+
+    def set_weights(self, weights: Union[float, np.ndarray]):
+        """
+        Write weights of all NetCons to NEURON.
+
+        :param weights:
+            single value for all NetCons or array of weights aligned with netcons
+        """
+        weights = np.broadcast_to(np.asarray(weights, dtype=float), (len(self),))
+        for nc, weight in zip(self._hoc_netcons, weights.tolist()):
+            nc.weight[0] = weight
+        self.weights = weights.copy()
+
+    def get_delays(self) -> np.ndarray:
+        """
+        Read current delays (in ms) of all NetCons from NEURON. It also updates the delays array
+        of the table.
+
+        :return:
+            numpy array of delays aligned with netcons
+        """
+        self.delays = np.fromiter((nc.delay for nc in self._hoc_netcons), dtype=float,
+                                  count=len(self._hoc_netcons))
+        return self.delays.copy()
+
+    def set_delays(self, delays: Union[float, np.ndarray]):
+        """
+        Write delays (in ms) of all NetCons to NEURON.
+
+        :param delays:
+            single value for all NetCons or array of delays aligned with netcons
+        """
+        delays = np.broadcast_to(np.asarray(delays, dtype=float), (len(self),))
+        for nc, delay in zip(self._hoc_netcons, delays.tolist()):
+            nc.delay = delay
+        self.delays = delays.copy()
+
+    def mod_mask(self, mod_name: str) -> np.ndarray:
+        """
+        :param mod_name:
+            name of the point process
+        :return:
+            boolean numpy array, True for NetCons which target point process is of mod_name
+        """
+        if mod_name not in self.mod_names:
+            return np.zeros(len(self), dtype=bool)
+        return self.mod_codes == self.mod_names.index(mod_name)
+
+    @staticmethod
+    def _get_id(ids: dict, objs: list, key, obj) -> int:
+        i = ids.get(key)
+        if i is None:
+            i = len(objs)
+            ids[key] = i
+            objs.append(obj)
+        return i
+
+    def __len__(self):
+        return len(self.netcons)
+
+    def __repr__(self):
+        return "{}[{}]".format(self.__class__.__name__, len(self))
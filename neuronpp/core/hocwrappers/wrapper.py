@@ -1,9 +1,13 @@
+from neuronpp.core.cells.indexed_list import IndexedList
 from neuronpp.core.decorators import non_removable_fields
 from neuronpp.core.neuron_removable import NeuronRemovable
 
 
 @non_removable_fields("parent")
 class Wrapper(NeuronRemovable):
+    # fields are defined by subclasses, so that Wrapper can be mixed with dict
+    __slots__ = ()
+
     def __init__(self, parent, name):
         try:
             self.parent = parent
@@ -11,5 +15,18 @@ class Wrapper(NeuronRemovable):
             pass
         self.name = name
 
+    def __setattr__(self, key, value):
+        object.__setattr__(self, key, value)
+        if key not in IndexedList.INDEXED_FIELDS:
+            return
+        # invalidate indexes of IndexedLists containing this object (eg. cell.secs) on change of
+        # the indexed field (eg. name)
+        indexed_lists = getattr(self, "_indexed_lists", None)
+        if indexed_lists:
+            for ref in indexed_lists:
+                indexed_list = ref()
+                if indexed_list is not None:
+                    indexed_list.invalidate_field(key)
+
     def __repr__(self):
         return "{}[{}]".format(self.__class__.__name__, self.name)
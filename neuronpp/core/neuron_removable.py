@@ -6,6 +6,8 @@ NON_REMOVABLE_FIELD_NAME = "_non_removable_fields"
 
 
 class NeuronRemovable:
+    __slots__ = ()
+
     def remove_immediate_from_neuron(self):
         """
         WARNING: Object removal from NEURON is an experimental feature. While using, bear in mind
@@ -63,7 +65,15 @@ class NeuronRemovable:
                 elif len(noremove) > 0 and not isinstance(noremove[0], str):
                     raise AttributeError("%s can be None or List[str]." % NON_REMOVABLE_FIELD_NAME)
 
-        for k, v in self.__dict__.items():
+        slots = self._get_slots()
+        fields = list(getattr(self, "__dict__", {}).items())
+        for k, slot in slots:
+            try:
+                fields.append((k, slot.__get__(self)))
+            except AttributeError:
+                continue
+
+        for k, v in fields:
             if noremove and k in noremove:
                 continue
 
@@ -77,7 +87,16 @@ class NeuronRemovable:
             except ReferenceError as e:
                 if "can't access a deleted section" == str(e):
                     continue
-        self.__dict__ = {}
+            except AttributeError:
+                # slot shadowed by a read-only property in a subclass
+                continue
+        if hasattr(self, "__dict__"):
+            self.__dict__ = {}
+        for k, slot in slots:
+            try:
+                slot.__delete__(self)
+            except AttributeError:
+                continue
 
         # TODO check: not sure but this part is probably never used
         if isinstance(self, dict):
@@ -92,6 +111,25 @@ class NeuronRemovable:
                 v = None
             self = {}
 
+    @classmethod
+    def _get_slots(cls):
+        """
+        :return:
+            list of (name, descriptor) of all __slots__ fields of the class and its bases
+        """
+        slots = cls.__dict__.get("_slot_descriptors")
+        if slots is None:
+            slots = []
+            for c in cls.__mro__:
+                names = c.__dict__.get("__slots__", ())
+                if isinstance(names, str):
+                    names = [names]
+                for name in names:
+                    if name not in ("__dict__", "__weakref__"):
+                        slots.append((name, c.__dict__[name]))
+            cls._slot_descriptors = slots
+        return slots
+
     @staticmethod
     def _del_val(v):
         if hasattr(v, "remove_from_neuron"):
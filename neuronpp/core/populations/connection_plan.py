@@ -0,0 +1,36 @@
+import numpy as np
+
+
+class ConnectionPlan:
+    def __init__(self, source_ids: np.ndarray, target_cell_ids: np.ndarray,
+                 target_seg_ids: np.ndarray):
+        """
+        Flat description of all connections which the Connector will create. Each element
+        (row) of the plan is a single target segment which receives synapse(s) from a single
+        source.
+
+        All arrays have the same length and are aligned with each other.
+
+        :param source_ids:
+            index of the source in the Connector's sources list. -1 means no source (None)
+        :param target_cell_ids:
+            index of the target cell in the order of the Connector's target cells
+        :param target_seg_ids:
+            index of the target segment in the list of target segments of the target cell
+        """
+        self.source_ids = np.asarray(source_ids, dtype=int)
+        self.target_cell_ids = np.asarray(target_cell_ids, dtype=int)
+        self.target_seg_ids = np.asarray(target_seg_ids, dtype=int)
+
+        if not (self.source_ids.size == self.target_cell_ids.size == self.target_seg_ids.size):
+            raise ValueError("All arrays of the ConnectionPlan must have the same size.")
+
+    def __len__(self):
+        return self.source_ids.size
+
+    def __iter__(self):
+        return zip(self.source_ids.tolist(), self.target_cell_ids.tolist(),
+                   self.target_seg_ids.tolist())
+
+    def __repr__(self):
+        return "{}[{}]".format(self.__class__.__name__, len(self))
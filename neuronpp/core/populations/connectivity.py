@@ -0,0 +1,142 @@
+from typing import Optional
+
+import numpy as np
+
+from neuronpp.core.populations.connection_plan import ConnectionPlan
+
+
+class Connectivity(ConnectionPlan):
+    def __init__(self, source_ids: np.ndarray, target_cell_ids: np.ndarray,
+                 target_seg_ids: Optional[np.ndarray] = None,
+                 weights: Optional[np.ndarray] = None, delays: Optional[np.ndarray] = None,
+                 shape: Optional[tuple] = None):
+        """
+        Connectivity realized by the Connector (or requested to realize by
+        Connector.set_connectivity()).
+
+        Each element (row) is a single target segment which receives synapse(s) from a single
+        source. All arrays have the same length and are aligned with each other.
+
+        :param source_ids:
+            index of the source in the Connector's sources list. -1 means no source (None)
+        :param target_cell_ids:
+            index of the target cell in the order of the Connector's target cells
+        :param target_seg_ids:
+            index of the target segment in the list of target segments of the target cell.
+            Default is None, which means target segments are not defined and will be drawn with
+            the Connector's seg_dist while building.
+        :param weights:
+            weight of NetCon(s) connecting the source with the target segment.
+            NaN or None means the weight from SynAdder.add_netcon() params will be used.
+        :param delays:
+            delay (in ms) of NetCon(s) connecting the source with the target segment.
+            NaN or None means the delay from SynAdder.add_netcon() params will be used.
+        :param shape:
+            tuple of (source_num, target_cell_num). Default is None, meaning the shape will be
+            inferred from the max indices.
+        """
+        source_ids = np.asarray(source_ids, dtype=int)
+        size = source_ids.size
+
+        self.has_target_segs = target_seg_ids is not None
+        if target_seg_ids is None:
+            target_seg_ids = np.zeros(size, dtype=int)
+
+        ConnectionPlan.__init__(self, source_ids=source_ids, target_cell_ids=target_cell_ids,
+                                target_seg_ids=target_seg_ids)
+
+        self.weights = self._prepare_values(weights, size, name="weights")
+        self.delays = self._prepare_values(delays, size, name="delays")
+
+        if shape is None:
+            shape = (int(self.source_ids.max(initial=-1)) + 1,
+                     int(self.target_cell_ids.max(initial=-1)) + 1)
+        self.shape = tuple(shape)
+
+    @staticmethod
+    def from_sparse(matrix, target_seg_ids: Optional[np.ndarray] = None,
+                    delays: Optional[np.ndarray] = None) -> 'Connectivity':
+        """
+        Create Connectivity from scipy.sparse matrix of shape (source_num, target_cell_num),
+        where each stored element is a single connection and its value is the weight of the
+        connection.
+
+        Explicitly stored zeros and duplicated entries are treated as separated connections.
+
+        :param matrix:
+            scipy.sparse matrix (any format)
+        :param target_seg_ids:
+            array of target segment indices aligned with elements of matrix.tocoo().
+            Default is None, which means target segments will be drawn with the Connector's
+            seg_dist while building.
+        :param delays:
+            array of delays aligned with elements of matrix.tocoo(). Default is None, which means
+            the delay from SynAdder.add_netcon() params will be used.
+        :return:
+            Connectivity object
+        """
+        from scipy import sparse
+
+        if not sparse.issparse(matrix):
+            raise TypeError("Param matrix must be a scipy.sparse matrix, but provided %s"
+                            % matrix.__class__)
+        coo = matrix.tocoo()
+        return Connectivity(source_ids=coo.row, target_cell_ids=coo.col,
+                            target_seg_ids=target_seg_ids, weights=coo.data, delays=delays,
+                            shape=coo.shape)
+
+    def to_coo(self, value: str = "weight") -> 'scipy.sparse.coo_matrix':
+        """
+        Returns connectivity as scipy.sparse COO matrix of shape (source_num, target_cell_num).
+
+        Multiple connections between the same source and target cell are stored as duplicated
+        entries (they are summed up if you convert the matrix to CSR).
+
+        :param value:
+            value of each matrix element:
+            'weight' - weight of the connection
+            'delay' - delay of the connection
+            'seg' - index of the target segment
+        :return:
+            scipy.sparse.coo_matrix
+        """
+        if np.any(self.source_ids < 0):
+            raise ValueError("Connectivity without sources (source=None) can't be represented "
+                             "as a source x target matrix.")
+        if value == "weight":
+            data = self.weights
+        elif value == "delay":
+            data = self.delays
+        elif value == "seg":
+            data = self.target_seg_ids
+        else:
+            raise ValueError("Param value can be only: 'weight', 'delay' or 'seg', but provided "
+                             "%s" % value)
+
+        from scipy import sparse
+
+        return sparse.coo_matrix((data, (self.source_ids, self.target_cell_ids)),
+                                 shape=self.shape)
+
+    def to_csr(self, value: str = "weight") -> 'scipy.sparse.csr_matrix':
+        """
+        Returns connectivity as scipy.sparse CSR matrix of shape (source_num, target_cell_num).
+
+        Multiple connections between the same source and target cell are summed up.
+
+        :param value:
+            'weight', 'delay' or 'seg'. See to_coo() for details.
+        :return:
+            scipy.sparse.csr_matrix
+        """
+        return self.to_coo(value=value).tocsr()
+
+    @staticmethod
+    def _prepare_values(values, size, name):
+        if values is None:
+            return np.full(size, np.nan)
+        values = np.asarray(values, dtype=float)
+        if values.size != size:
+            raise ValueError("Param %s must have the same size as the number of connections: %s, "
+                             "but provided %s" % (name, size, values.size))
+        return values
@@ -6,6 +6,7 @@ from neuronpp.core.cells.core_cell import CoreCell
 from neuronpp.core.hocwrappers.netstim import NetStim
 from neuronpp.core.hocwrappers.vecstim import VecStim
 from neuronpp.core.populations.syn_adder import SynAdder
+from neuronpp.core.populations.connectivity import Connectivity
 from neuronpp.core.hocwrappers.synapses.synapse import Synapse
 from neuronpp.core.populations.params.conn_params import ConnParams
 from neuronpp.core.dists.distributions import Dist, NormalTruncatedSegDist
@@ -16,7 +17,7 @@ class Connector:
     def __init__(self, population_ref, rule: str = "all",
                  cell_connection_proba: Union[float, Dist] = 1.0,
                  seg_dist: Union[NormalTruncatedSegDist, str] = "uniform",
-                 syn_num_per_cell_source: Union[int, Dist] = 1):
+                 syn_num_per_cell_source: Union[int, Dist] = 1, conn_num: Optional[int] = None):
         """
         Connector object required to build new connections for Population.
 
@@ -29,6 +30,9 @@ class Connector:
 
         :param population_ref:
             setup automatically while creating with population.connect()
+        :param rule:
+            'all', 'one', 'fixed_indegree', 'fixed_outdegree' or 'fixed_total'.
+            See Population.connect() for details.
         :param cell_connection_proba:
             default is 1.0
             can be a single float between 0 to 1 (defining probability of connection), it will
@@ -57,6 +61,10 @@ class Connector:
         :param syn_num_per_cell_source:
             default is 1
             number of synapse per single source object
+        :param conn_num:
+            default is None
+            number of connections for rules: 'fixed_indegree', 'fixed_outdegree' and
+            'fixed_total'
         """
         self._population_ref = population_ref
 
@@ -68,9 +76,14 @@ class Connector:
         self._sources = None
         self._target = None
         self._synaptic_func = None
+        self._connectivity = None
+
+        # Connectivity realized by build()
+        self.connectivity = None
 
         self._conn_params = ConnParams(rule=rule, cell_connection_proba=cell_connection_proba, seg_dist=seg_dist,
-                                       syn_num_per_cell_source=syn_num_per_cell_source)
+                                       syn_num_per_cell_source=syn_num_per_cell_source,
+                                       conn_num=conn_num)
 
     def set_source(self, source: Optional[Union[List[Union[Seg, VecStim, NetStim]], Seg, VecStim,
                                                 NetStim]]):
@@ -96,6 +109,37 @@ class Connector:
         self._target = check_and_prepare_target(target)
         return self
 
+    def set_connectivity(self, connectivity, target_seg_ids=None, delays=None):
+        """
+        Instantiate exactly the provided connectivity instead of drawing connections with
+        the connection rule, cell_connection_proba and syn_num_per_cell_source.
+
+        Source indices refer to the list passed to set_source(), target cell indices refer to
+        the order of cells passed to set_target().
+
+        If target segments are not defined - they will be drawn with seg_dist.
+        If weights or delays are defined - they will override weight and delay of all NetCons
+        which use the Connector's source (NetCons with custom_source are not affected).
+
+        :param connectivity:
+            Connectivity object (eg. from other_connector.connectivity) or scipy.sparse matrix
+            of shape (source_num, target_cell_num) where each stored element is a single
+            connection and its value is the weight of the connection.
+        :param target_seg_ids:
+            used only if connectivity is a scipy.sparse matrix.
+            array of target segment indices aligned with elements of matrix.tocoo().
+        :param delays:
+            used only if connectivity is a scipy.sparse matrix.
+            array of delays aligned with elements of matrix.tocoo().
+        :return:
+            self object (builder paradigm)
+        """
+        if not isinstance(connectivity, Connectivity):
+            connectivity = Connectivity.from_sparse(connectivity, target_seg_ids=target_seg_ids,
+                                                    delays=delays)
+        self._connectivity = connectivity
+        return self
+
     def set_tag(self, tag):
         """
         Add tag to all synapses created by this Connector
@@ -175,6 +219,9 @@ class Connector:
         Build this Connector object.
         Connector object can be build only once.
 
+        After build the realized connectivity is available as connector.connectivity
+        (Connectivity object) and is also appended to the population.connectivities list.
+
         :return:
             Population object which is the owner of this Connector (builder paradigm)
         """
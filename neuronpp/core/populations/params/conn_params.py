@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Union, Optional
 
 from neuronpp.core.dists.distributions import Dist, NormalTruncatedSegDist
 
@@ -7,12 +7,13 @@ class ConnParams:
     def __init__(self, rule: str = "all",
                  cell_connection_proba: Union[float, Dist] = 1.0,
                  seg_dist: Union[NormalTruncatedSegDist, str] = "uniform",
-                 syn_num_per_cell_source: Union[int, Dist] = 1):
+                 syn_num_per_cell_source: Union[int, Dist] = 1, conn_num: Optional[int] = None):
         """
         :param rule:
-            'all' or 'one'
+            'all', 'one', 'fixed_indegree', 'fixed_outdegree' or 'fixed_total'
         :param cell_connection_proba:
-            probability of connecting source and target
+            probability of connecting source and target. It can be a float, ConnectionProba or
+            DistanceConnectionProba (probability depends on the source-target distance)
         :param seg_dist:
             distribution of single connection between provided target segments.
 
@@ -39,8 +40,19 @@ class ConnParams:
 
         :param syn_num_per_cell_source:
             how many synapses single source should have
+        :param conn_num:
+            number of connections for rules: 'fixed_indegree' (per target cell),
+            'fixed_outdegree' (per source) and 'fixed_total' (for all cells)
         """
+        if rule in ['fixed_indegree', 'fixed_outdegree', 'fixed_total']:
+            if not isinstance(conn_num, int) or conn_num < 0:
+                raise ValueError("For rule '%s' param conn_num must be int >= 0, but provided %s"
+                                 % (rule, conn_num))
+            if cell_connection_proba != 1:
+                raise ValueError("For rule '%s' param cell_connection_proba must be 1, since the "
+                                 "number of connections is defined by conn_num." % rule)
         self.rule = rule
+        self.conn_num = conn_num
         self.cell_connection_proba = cell_connection_proba
         if isinstance(seg_dist, str) and seg_dist not in ['all', 'uniform'] and \
                 not isinstance(seg_dist, NormalTruncatedSegDist):
@@ -1,17 +1,23 @@
-from typing import Union, TypeVar, List, Iterable, Callable
+from typing import Union, TypeVar, List, Callable, Tuple, Optional
 
 import numpy as np
 
 from neuronpp.cells.cell import Cell
+from neuronpp.core.cells.cell_template import CellTemplate
 from neuronpp.core.decorators import distparams
+from neuronpp.core.dists import random_streams
 from neuronpp.core.dists.distributions import Dist, UniformConnectionProba, NormalConnectionProba, \
     NormalTruncatedSegDist, LogNormalConnectionProba, UniformDist, NormalTruncatedDist, \
-    LogNormalTruncatedDist, UniformTruncatedDist
+    LogNormalTruncatedDist, UniformTruncatedDist, DistanceConnectionProba
 from neuronpp.core.hocwrappers.seg import Seg
 from neuronpp.core.hocwrappers.synapses.synapse import Synapse
+from neuronpp.core.hocwrappers.synapses.synapse_table import SynapseTable
 from neuronpp.core.neuron_removable import NeuronRemovable
 from neuronpp.core.populations.connector import Connector
+from neuronpp.core.populations.connection_plan import ConnectionPlan
+from neuronpp.core.populations.connectivity import Connectivity
 from neuronpp.utils.record import Record
+from neuronpp.utils.spike_record import SpikeRecord
 
 T_Cell = TypeVar('T_Cell', bound=Cell)
 
@@ -22,6 +28,9 @@ class Population(NeuronRemovable):
         self.cells = []
         self.syns = []
         self.recs = {}
+        self.spike_rec = None
+        # Connectivity realized by each built Connector
+        self.connectivities = []
 
         self.cell_counter = 0
 
@@ -43,7 +52,10 @@ class Population(NeuronRemovable):
             raise ValueError("Cell number cannot be < 0.")
 
         for i in range(num):
-            cell = cell_function()
+            # random stream of the cell depends on the population and the cell's index
+            with random_streams.stream_scope(random_streams.name_key(self.name),
+                                             self.cell_counter):
+                cell = cell_function()
             cell.population = self
             if cell.name is None or len(cell.name.strip()) == 0:
                 cell.name = "cell"
@@ -51,12 +63,75 @@ class Population(NeuronRemovable):
             self.cell_counter += 1
             self.cells.append(cell)
 
+    @distparams(include=["num"])
+    def add_clones(self, template: Cell, num: int,
+                   cell_function: Optional[Callable[[], T_Cell]] = None):
+        """
+        Add copies of the built template cell. Sections, geometry and density mechanisms (with
+        their per-segment parameters) are captured from the template only once (see
+        CellTemplate) and each copy is created from them, without re-running setup code of the
+        template (loading morphology, inserting mechanisms and setting parameters).
+
+        Point processes, synapses, NetCons and spines of the template are not copied.
+        The template itself is not added to the population.
+
+        :param template:
+            built cell to copy
+        :param num:
+            number of cells to create
+        :param cell_function:
+            Callable function without arguments, which returns a new empty cell (without sections)
+            of the required type, eg. lambda: Hay2011Cell("cell"). Default is None, which means
+            a new Cell object with the name of the template.
+        """
+        cell_template = CellTemplate(template)
+        self.add_cells(num=num, cell_function=lambda: cell_template.instantiate_cell(
+            name=template.name if cell_function is None else None, cell_function=cell_function))
+
+    def _get_random_stream(self):
+        """
+        Returns a numpy Generator of the next random stream of this population (used by
+        @distparams).
+        """
+        return random_streams.next_stream(random_streams.POPULATION_STREAM,
+                                          random_streams.name_key(self.name))
+
     @distparams(include=["loc"])
     def record(self, sec_name="soma", loc=0.5, variable='v'):
         d = [cell.filter_secs(sec_name, as_list=True)[0](loc) for cell in self.cells]
         rec = Record(d, variables=variable)
         self.recs[variable] = rec
 
+    @distparams(include=["loc"])
+    def record_spikes(self, sec_name="soma", loc=0.5, threshold=10) -> SpikeRecord:
+        """
+        Record spikes of all cells in the population with a single SpikeRecord (one pair of
+        Vectors for spike times and gids). Spike detectors are created for cells which don't
+        have them.
+
+        :param sec_name:
+            name of the section for spike detectors
+        :param loc:
+            location on the section for spike detectors
+        :param threshold:
+            mV threshold of spike detectors
+        :return:
+            SpikeRecord object
+        """
+        if self.spike_rec is not None:
+            raise RuntimeError("Spikes of the population %s are recorded already." % self.name)
+        self.spike_rec = SpikeRecord(self.cells, sec_name=sec_name, loc=loc,
+                                     threshold=threshold)
+        return self.spike_rec
+
+    def get_synapse_table(self) -> SynapseTable:
+        """
+        :return:
+            SynapseTable of all synapses created by Connectors of the population. Cell ids of the
+            table are indices of the table's cells list, not the population's cells.
+        """
+        return SynapseTable(self.syns)
+
     def plot(self, animate=False, **kwargs):
         """
         Plots each recorded variable for each neurons in the population.
@@ -84,7 +159,8 @@ class Population(NeuronRemovable):
                 seg_dist: Union[NormalTruncatedSegDist, str] = "uniform",
                 syn_num_per_cell_source: Union[int, UniformDist,
                                                NormalTruncatedDist,
-                                               LogNormalTruncatedDist] = 1) -> Connector:
+                                               LogNormalTruncatedDist] = 1,
+                conn_num: Optional[int] = None) -> Connector:
         """
         Returns Connector object.
 
@@ -97,6 +173,13 @@ class Population(NeuronRemovable):
             default is 'all'
             'all' - all-to-all connections
             'one' - one-to-one connections
+            'fixed_indegree' - each target cell receives exactly conn_num connections from
+                different sources
+            'fixed_outdegree' - each source makes exactly conn_num connections to different
+                target cells
+            'fixed_total' - exactly conn_num different (source, target cell) pairs are connected
+
+            For the fixed rules cell_connection_proba must be 1.
 
             if you make connector.set_source(None) the rule won't be utilized at all.
         :param cell_connection_proba:
@@ -105,6 +188,11 @@ class Population(NeuronRemovable):
             assume UniformProba.
             It can also be an instance of Dist class which defines specific distribution with an
             expected value.
+
+            It can also be an instance of DistanceConnectionProba (GaussianConnectionProba,
+            ExponentialConnectionProba or CutoffConnectionProba), which defines probability
+            decaying with the distance between the source segment and the soma of the target
+            cell. In this case only rule 'all' is allowed and all sources must be segments.
         :param seg_dist:
             default is "uniform"
             distribution of target location between [0, 1] to create a single connection from
@@ -129,17 +217,25 @@ class Population(NeuronRemovable):
             default is 1
             number of synapse per single source object.
             Allowed types: int, UniformDist, NormalTruncatedDist, LogNormalTruncatedDist
+        :param conn_num:
+            default is None
+            number of connections for rules: 'fixed_indegree', 'fixed_outdegree' and
+            'fixed_total'. Required only for those rules.
         :return:
             Connector object
         """
         return Connector(population_ref=self, rule=rule,
                          cell_connection_proba=cell_connection_proba,
-                         seg_dist=seg_dist, syn_num_per_cell_source=syn_num_per_cell_source)
+                         seg_dist=seg_dist, syn_num_per_cell_source=syn_num_per_cell_source,
+                         conn_num=conn_num)
 
     def remove_immediate_from_neuron(self):
         for r in self.recs.values():
             r.remove_immediate_from_neuron()
         self.recs = {}
+        if self.spike_rec is not None:
+            self.spike_rec.remove_immediate_from_neuron()
+            self.spike_rec = None
 
         for s in self.syns:
             s.remove_immediate_from_neuron()
@@ -165,24 +261,26 @@ class Population(NeuronRemovable):
             raise LookupError(
                 "Population %s has no cells, cannot make connections. Add cells first." % self.name)
 
-        result_syns = self._make_conn(conn_params.rule, target, conn)
+        result_syns, connectivity = self._make_conn(conn_params.rule, target, conn)
         self.syns.extend(result_syns)
+
+        conn.connectivity = connectivity
+        self.connectivities.append(connectivity)
         return result_syns
 
     def _make_conn(self, source_rule: str, target_segs: List[Seg],
-                   connector) -> List[List[Synapse]]:
+                   connector) -> Tuple[List[Synapse], Connectivity]:
         """
-        TODO refactoring required:
-          * method is too extensive
-          * rethink connection rule provision because currently there is:
-            * source_rule as string - defines rule for source -to-> target connection
-            * connector.conn_params.cell_proba - defines distribution for cell connection
-            (yes or no)
-            * connector.conn_params.seg_dist - defines distribution for target selection
-              (while cell is selected to connect)
-
         Creates connection based on provided source_rule, cells' target segments and connection rule
 
+        All random decisions (which source-target pairs are connected, how many synapses each
+        connection has and which target segments receive them) are made in advance by
+        _plan_conn() as numpy arrays. This method only walks the accepted connections and creates
+        NEURON objects for them.
+
+        If the connector has connectivity defined by set_connectivity() - the connectivity is
+        used instead of the plan.
+
         :param source_rule:
             string which defines connection rule for source
 
@@ -193,139 +291,609 @@ class Population(NeuronRemovable):
         :param connector:
             Connector object containing rules for connection
         :return:
-            list of added synapses
+            tuple of (list of added synapses, realized Connectivity)
         """
-        result = []
         conn_params = connector._conn_params
-        sources = np.random.choice(connector._sources, size=len(connector._sources), replace=False)
-        cell_targets = self._group_segs_by_cell(target_segs)
-
-        target_cell_num = len(cell_targets.keys())
-        # iter all target cells' segments
-        for cell_target_i, (cell_target_name, target_segs) in enumerate(cell_targets.items()):
-
-            if connector._sources is None or connector._sources[0] is None:
-                current_sources = [None]
-            elif source_rule == 'all':
-                current_sources = np.random.choice(sources, size=len(sources), replace=False)
-            elif source_rule == 'one':
-                if target_cell_num != len(sources):
-                    raise ValueError("For rule 'one' the target and the source len need to be of "
-                                     "the same size.")
-                current_sources = [sources[cell_target_i]]
+        cell_targets = list(self._group_segs_by_cell(target_segs).values())
+
+        if connector._sources is None or connector._sources[0] is None:
+            source_num = 0
+        else:
+            source_num = len(connector._sources)
+
+        seg_nums = [len(segs) for segs in cell_targets]
+        # random streams are identified by the population, the number of the connector in the
+        # population and keys of target cells
+        stream_id = random_streams.pack_keys(random_streams.name_key(self.name),
+                                             len(self.connectivities))
+        target_keys = [random_streams.pack_keys(*segs[0].parent.cell._stream_key)
+                       for segs in cell_targets]
+        if connector._connectivity is None:
+            source_positions = None
+            target_positions = None
+            if isinstance(conn_params.cell_connection_proba, DistanceConnectionProba) and \
+                    source_num > 0:
+                source_positions = self._get_source_positions(connector._sources)
+                target_positions = self._get_target_positions(cell_targets)
+
+            plan = self._plan_conn(source_rule=source_rule, source_num=source_num,
+                                   seg_nums=seg_nums, conn_params=conn_params,
+                                   source_positions=source_positions,
+                                   target_positions=target_positions, stream_id=stream_id,
+                                   target_keys=target_keys)
+            weights = np.full(len(plan), np.nan)
+            delays = np.full(len(plan), np.nan)
+        else:
+            plan = self._prepare_connectivity(connector._connectivity, source_num=source_num,
+                                              seg_nums=seg_nums, seg_dist=conn_params.seg_dist,
+                                              stream_id=stream_id, target_keys=target_keys)
+            weights = plan.weights
+            delays = plan.delays
+
+        if any(mech._spine_params for mech in connector._syn_adders):
+            result, realized_weights, realized_delays = \
+                self._make_syns_per_site(plan, cell_targets, connector, weights, delays)
+        else:
+            result, realized_weights, realized_delays = \
+                self._make_syns_bulk(plan, cell_targets, connector, weights, delays)
+
+        connectivity = Connectivity(source_ids=plan.source_ids,
+                                    target_cell_ids=plan.target_cell_ids,
+                                    target_seg_ids=plan.target_seg_ids,
+                                    weights=realized_weights, delays=realized_delays,
+                                    shape=(source_num, len(cell_targets)))
+        return result, connectivity
+
+    @staticmethod
+    def _make_syns_per_site(plan: ConnectionPlan, cell_targets: List[List[Seg]], connector,
+                            weights: np.ndarray, delays: np.ndarray):
+        """
+        Creates synapses for each connection of the plan separately with cell.add_synapse().
+        It is required if synapses are put on spines, since each target segment receives a new
+        spine.
+
+        :return:
+            tuple of (list of added synapses, realized weights, realized delays)
+        """
+        result = []
+        realized_weights = np.full(len(plan), np.nan)
+        realized_delays = np.full(len(plan), np.nan)
+
+        for plan_i, (source_i, cell_target_i, seg_i) in enumerate(plan):
+            source = None if source_i < 0 else connector._sources[source_i]
+            target_segment = cell_targets[cell_target_i][seg_i]
+
+            cell = target_segment.parent.cell
+            syns = []
+            # iter over all point processes provided
+            # each target_segment will receive all provided point processes
+            for mech in connector._syn_adders:
+                spine_params = mech._spine_params
+
+                if spine_params:
+                    spine = cell.add_spines(segs=target_segment,
+                                            head_nseg=spine_params.head_nseg,
+                                            neck_nseg=spine_params.neck_nseg)[0]
+                    target_segment = spine.head(1.0)
+
+                # iter over all netcons - for each netcon create a new connection
+                # eg. single point process can have netconn from the real source
+                # and from the outside stimuli (netcon with source=None)
+                for netcon_params in mech._netcon_params:
+                    # if netcon has custom source, different than the default connector
+                    weight = netcon_params.weight
+                    delay = netcon_params.delay
+                    is_custom_source = hasattr(netcon_params, "custom_source")
+                    if is_custom_source:
+                        current_source = netcon_params.custom_source
+                    else:
+                        current_source = source
+                        if not np.isnan(weights[plan_i]):
+                            weight = weights[plan_i]
+                        if not np.isnan(delays[plan_i]):
+                            delay = delays[plan_i]
+
+                    syn = cell.add_synapse(source=current_source, seg=target_segment,
+                                           mod_name=mech.point_process_name,
+                                           tag=connector._tag,
+                                           delay=delay,
+                                           netcon_weight=weight,
+                                           threshold=netcon_params.threshold,
+                                           **mech._point_process_params)
+                    syns.append(syn)
+
+                    # record the first NetCon which uses the Connector's source
+                    if not is_custom_source and np.isnan(realized_weights[plan_i]):
+                        nc = syn.netcons[0]
+                        realized_weights[plan_i] = nc.get_weight()
+                        realized_delays[plan_i] = nc.hoc.delay
+
+            # perform a custom function on created synapses if required for each
+            # target_segment
+            # This requirement need to be directly define by the user
+            if connector._synaptic_func:
+                connector._synaptic_func(syns)
+
+            # group synapses if required for each target_segment
+            # eg. for multi-netcons synapses (like ACh+Da+hebbian synapse)
+            # This requirement need to be directly define by the user
+            if connector._group_syns:
+                syns = cell.group_synapses(name=connector._synaptic_group_name,
+                                           tag=connector._tag, synapses=syns)
+
+            if isinstance(syns, list):
+                result.extend(syns)
             else:
-                raise ValueError("The only allowed rule is all or one, "
+                result.append(syns)
+
+        return result, realized_weights, realized_delays
+
+    @staticmethod
+    def _make_syns_bulk(plan: ConnectionPlan, cell_targets: List[List[Seg]], connector,
+                        weights: np.ndarray, delays: np.ndarray):
+        """
+        Creates synapses of all connections of each target cell at once with
+        cell.add_synapses_bulk() - a single call for each point process and netcon of the
+        Connector's SynAdders.
+
+        :return:
+            tuple of (list of added synapses, realized weights, realized delays)
+        """
+        realized_weights = np.full(len(plan), np.nan)
+        realized_delays = np.full(len(plan), np.nan)
+        plan_syns = [[] for _ in range(len(plan))]
+
+        # group rows of the plan by target cell
+        order = np.argsort(plan.target_cell_ids, kind="stable")
+        cell_ids, starts = np.unique(plan.target_cell_ids[order], return_index=True)
+        ends = np.append(starts[1:], order.size)
+
+        for cell_target_i, start, end in zip(cell_ids, starts, ends):
+            rows = order[start:end]
+            cell_segs = cell_targets[cell_target_i]
+            cell = cell_segs[0].parent.cell
+            segs = [cell_segs[i] for i in plan.target_seg_ids[rows].tolist()]
+            sources = [None if i < 0 else connector._sources[i]
+                       for i in plan.source_ids[rows].tolist()]
+
+            is_recorded = False
+            for mech in connector._syn_adders:
+                for netcon_params in mech._netcon_params:
+                    is_custom_source = hasattr(netcon_params, "custom_source")
+                    if is_custom_source:
+                        current_sources = netcon_params.custom_source
+                        weight = netcon_params.weight
+                        delay = netcon_params.delay
+                    else:
+                        current_sources = sources
+                        weight = Population._merge_values(weights[rows], netcon_params.weight,
+                                                          cell)
+                        delay = Population._merge_values(delays[rows], netcon_params.delay,
+                                                         cell)
+
+                    syns = cell.add_synapses_bulk(segs=segs, mod_name=mech.point_process_name,
+                                                  sources=current_sources, weights=weight,
+                                                  delays=delay,
+                                                  thresholds=netcon_params.threshold,
+                                                  tag=connector._tag,
+                                                  **mech._point_process_params)
+                    for row, syn in zip(rows.tolist(), syns):
+                        plan_syns[row].append(syn)
+
+                    # record the first NetCon which uses the Connector's source
+                    if not is_custom_source and not is_recorded:
+                        ncs = [syn.netcons[0].hoc for syn in syns]
+                        realized_weights[rows] = [nc.weight[0] for nc in ncs]
+                        realized_delays[rows] = [nc.delay for nc in ncs]
+                        is_recorded = True
+
+        result = []
+        for plan_i, syns in enumerate(plan_syns):
+            if connector._synaptic_func:
+                connector._synaptic_func(syns)
+
+            if connector._group_syns and syns:
+                cell = syns[0].point_process.cell
+                syns = cell.group_synapses(name=connector._synaptic_group_name,
+                                           tag=connector._tag, synapses=syns)
+
+            if isinstance(syns, list):
+                result.extend(syns)
+            else:
+                result.append(syns)
+
+        return result, realized_weights, realized_delays
+
+    @staticmethod
+    def _merge_values(values: np.ndarray, default, cell):
+        """
+        :param values:
+            array of values of connections, where NaN means the default value should be used
+        :param default:
+            single value or Dist object
+        :param cell:
+            target cell, which random stream is used to draw default values from Dist
+        :return:
+            default if all values are NaN, otherwise array of values with NaNs filled by default
+        """
+        mask = np.isnan(values)
+        if mask.all():
+            return default
+        values = values.copy()
+        if isinstance(default, Dist):
+            values[mask] = default.sample(n=int(mask.sum()), rng=cell._get_random_stream())
+        else:
+            values[mask] = default
+        return values
+
+    def _prepare_connectivity(self, connectivity: Connectivity, source_num: int,
+                              seg_nums: List[int], seg_dist, stream_id: int = 0,
+                              target_keys: Optional[List[int]] = None) -> Connectivity:
+        """
+        Validate connectivity provided by Connector.set_connectivity() against the Connector's
+        sources and targets. If the connectivity has no target segments defined - they will be
+        drawn with seg_dist.
+
+        :param connectivity:
+            Connectivity object
+        :param source_num:
+            number of sources. 0 means there is no source (source is None)
+        :param seg_nums:
+            number of potential target segments for each target cell
+        :param seg_dist:
+            distribution of target segments used if connectivity has no target segments defined
+        :param stream_id:
+            64-bit id of the Connector's random streams
+        :param target_keys:
+            64-bit keys of random streams of each target cell.
+            Default is None, which means indices of target cells.
+        :return:
+            Connectivity object with target segments defined
+        """
+        seg_nums = np.asarray(seg_nums, dtype=int)
+        source_ids = connectivity.source_ids
+        target_cell_ids = connectivity.target_cell_ids
+
+        if np.any(source_ids >= source_num) or np.any(source_ids < -1) or \
+                (source_num > 0 and np.any(source_ids < 0)):
+            raise IndexError("Connectivity source indices must point to the Connector's sources. "
+                             "The Connector has %s sources." % source_num)
+        if np.any(target_cell_ids >= seg_nums.size) or np.any(target_cell_ids < 0):
+            raise IndexError("Connectivity target cell indices must point to the Connector's "
+                             "target cells. The Connector has %s target cells." % seg_nums.size)
+
+        if connectivity.has_target_segs:
+            target_seg_ids = connectivity.target_seg_ids
+            if np.any(target_seg_ids >= seg_nums[target_cell_ids]) or np.any(target_seg_ids < 0):
+                raise IndexError("Connectivity target segment indices must point to the target "
+                                 "segments of each target cell.")
+        elif seg_dist == 'all':
+            raise ValueError("Connectivity without target segments can't be built with "
+                             "seg_dist='all'. Define target_seg_ids or change seg_dist.")
+        else:
+            if target_keys is None:
+                target_keys = range(seg_nums.size)
+            target_seg_ids = np.empty(target_cell_ids.size, dtype=int)
+            for cell_i in np.unique(target_cell_ids):
+                rows = target_cell_ids == cell_i
+                rng = self._get_conn_stream(stream_id, target=target_keys[cell_i])
+                target_seg_ids[rows] = self._draw_target_seg_ids(
+                    np.full(np.count_nonzero(rows), seg_nums[cell_i]), seg_dist=seg_dist, rng=rng)
+
+        return Connectivity(source_ids=source_ids, target_cell_ids=target_cell_ids,
+                            target_seg_ids=target_seg_ids, weights=connectivity.weights,
+                            delays=connectivity.delays, shape=connectivity.shape)
+
+    def _plan_conn(self, source_rule: str, source_num: int, seg_nums: List[int],
+                   conn_params, source_positions: Optional[np.ndarray] = None,
+                   target_positions: Optional[np.ndarray] = None, stream_id: int = 0,
+                   target_keys: Optional[List[int]] = None) -> ConnectionPlan:
+        """
+        Draws all random decisions of the connection as numpy arrays:
+          * which (source, target cell) pairs are connected, based on the source_rule and
+            conn_params.cell_connection_proba
+          * how many synapses each connection has, based on conn_params.syn_num_per_cell_source
+          * which target segment(s) each synapse is placed on, based on conn_params.seg_dist
+
+        Random values of each target cell are drawn from its own random stream, defined by
+        stream_id and the target cell's key. So the plan for a target cell doesn't depend on other
+        target cells and the order of building.
+
+        :param source_rule:
+            "all" - means all to all connection between each source and each target
+            "one" - means one to one connection between one source and one target
+            "fixed_indegree", "fixed_outdegree", "fixed_total" - means exactly
+                conn_params.conn_num connections per target cell, per source or in total
+        :param source_num:
+            number of sources. 0 means there is no source (source is None) and the rule is not
+            utilized, each target cell has a single potential connection without the source.
+        :param seg_nums:
+            number of potential target segments for each target cell
+        :param conn_params:
+            ConnParams object of the Connector
+        :param source_positions:
+            array of shape (source_num, 3) with positions of sources (in um). Required only if
+            conn_params.cell_connection_proba is DistanceConnectionProba
+        :param target_positions:
+            array of shape (target_cell_num, 3) with positions of target cells (in um). Required
+            only if conn_params.cell_connection_proba is DistanceConnectionProba
+        :param stream_id:
+            64-bit id of the Connector's random streams
+        :param target_keys:
+            64-bit keys of random streams of each target cell.
+            Default is None, which means indices of target cells.
+        :return:
+            ConnectionPlan object
+        """
+        seg_nums = np.asarray(seg_nums, dtype=int)
+        target_cell_num = seg_nums.size
+        conn_proba = conn_params.cell_connection_proba
+        if isinstance(conn_proba, DistanceConnectionProba) and source_num == 0:
+            raise ValueError("DistanceConnectionProba requires sources with positions (Seg "
+                             "sources), but the connection has no source.")
+        if target_keys is None:
+            target_keys = range(target_cell_num)
+        target_rngs = [self._get_conn_stream(stream_id, target=k) for k in target_keys]
+
+        # potential (source, target cell) pairs sorted by target cell
+        pair_distances = None
+        if source_num == 0:
+            pair_sources = np.full(target_cell_num, -1, dtype=int)
+            pair_targets = np.arange(target_cell_num)
+        elif isinstance(conn_proba, DistanceConnectionProba):
+            if source_rule != 'all':
+                raise ValueError("DistanceConnectionProba can be used only with rule 'all', "
                                  "but provided %s" % source_rule)
+            pair_sources, pair_targets, pair_distances = self._find_spatial_pairs(
+                source_positions=source_positions, target_positions=target_positions,
+                max_distance=conn_proba.max_distance)
+        elif source_rule == 'all':
+            pair_sources = np.array([rng.permutation(source_num) for rng in target_rngs],
+                                    dtype=int).reshape(-1)
+            pair_targets = np.repeat(np.arange(target_cell_num), source_num)
+        elif source_rule == 'one':
+            if target_cell_num != source_num:
+                raise ValueError("For rule 'one' the target and the source len need to be of "
+                                 "the same size.")
+            pair_sources = self._get_conn_stream(stream_id).permutation(source_num)
+            pair_targets = np.arange(target_cell_num)
+        elif source_rule in ['fixed_indegree', 'fixed_outdegree', 'fixed_total']:
+            if source_rule == 'fixed_indegree':
+                rngs = target_rngs
+            elif source_rule == 'fixed_outdegree':
+                rngs = [self._get_conn_stream(stream_id, source=i) for i in range(source_num)]
+            else:
+                rngs = [self._get_conn_stream(stream_id)]
+            pair_sources, pair_targets = self._draw_fixed_pairs(
+                source_rule, source_num=source_num, target_cell_num=target_cell_num,
+                conn_num=conn_params.conn_num, rngs=rngs)
+        else:
+            raise ValueError("The only allowed rule is all, one, fixed_indegree, "
+                             "fixed_outdegree or fixed_total, but provided %s" % source_rule)
+
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(pair_targets,
+                                                            minlength=target_cell_num))])
+        target_sources = []
+        target_segs = []
+        for cell_i, rng in enumerate(target_rngs):
+            sources = pair_sources[bounds[cell_i]:bounds[cell_i + 1]]
+
+            # decide which pairs are connected
+            if pair_distances is not None:
+                distances = pair_distances[bounds[cell_i]:bounds[cell_i + 1]]
+                is_conn = rng.uniform(size=sources.size) < conn_proba.proba(distances)
+            else:
+                is_conn = self._draw_cell_connections(conn_proba, size=sources.size, rng=rng)
 
-            # iter all sources (for all rule) or one source (for one rule)
-            for source in current_sources:
-                if not self._is_make_cell_connection(conn_params.cell_connection_proba):
-                    continue
-
-                # if NormalTruncatedSegDist has no mean defined - choose some with random uniform
-                # dist between 0 and 1. It is used to cluster randomly synapses around this mean
-                # point and with std spread.
-                # If it is different distribution than NormalTruncatedSegDist:
-                # seg_dist_normal_mean is None
-                seg_dist_normal_mean = None
-                if isinstance(conn_params.seg_dist, NormalTruncatedSegDist) and \
-                        conn_params.seg_dist.mean is None:
-                    seg_dist_normal_mean = np.random.uniform(size=1)[0]
-
-                # create syn_num_per_source number of synapses per single source
-                syn_num = self._get_syn_num_per_cell_source(conn_params.syn_num_per_cell_source)
-                for synapse_i in range(syn_num):
-
-                    # based on seg_dist - decide with what target_segment(s) we want to make
-                    # connection
-                    target_segments = self._get_curr_target_segs(target_segs,
-                                                                 seg_dist=conn_params.seg_dist,
-                                                                 normal_mean=seg_dist_normal_mean)
-
-                    for target_segment in target_segments:
-                        cell = target_segment.parent.cell
-                        syns = []
-                        # iter over all point processes provided
-                        # each target_segment will receive all provided point processes
-                        for mech in connector._syn_adders:
-                            spine_params = mech._spine_params
-
-                            if spine_params:
-                                spine = cell.add_spines(segs=target_segment,
-                                                        head_nseg=spine_params.head_nseg,
-                                                        neck_nseg=spine_params.neck_nseg)[0]
-                                target_segment = spine.head(1.0)
-
-                            # iter over all netcons - for each netcon create a new connection
-                            # eg. single point process can have netconn from the real source
-                            # and from the outside stimuli (netcon with source=None)
-                            for netcon_params in mech._netcon_params:
-                                # if netcon has custom source, different than the default connector
-                                if hasattr(netcon_params, "custom_source"):
-                                    current_source = netcon_params.custom_source
-                                else:
-                                    current_source = source
-
-                                syn = cell.add_synapse(source=current_source, seg=target_segment,
-                                                       mod_name=mech.point_process_name,
-                                                       tag=connector._tag,
-                                                       delay=netcon_params.delay,
-                                                       netcon_weight=netcon_params.weight,
-                                                       threshold=netcon_params.threshold,
-                                                       **mech._point_process_params)
-                                syns.append(syn)
-
-                        # perform a custom function on created synapses if required for each
-                        # target_segment
-                        # This requirement need to be directly define by the user
-                        if connector._synaptic_func:
-                            connector._synaptic_func(syns)
-
-                        # group synapses if required for each target_segment
-                        # eg. for multi-netcons synapses (like ACh+Da+hebbian synapse)
-                        # This requirement need to be directly define by the user
-                        if connector._group_syns:
-                            syns = cell.group_synapses(name=connector._synaptic_group_name,
-                                                       tag=connector._tag, synapses=syns)
-
-                        if isinstance(syns, list):
-                            result.extend(syns)
-                        else:
-                            result.append(syns)
+            sources, segs = self._plan_target_cell(sources[is_conn], seg_num=seg_nums[cell_i],
+                                                   conn_params=conn_params, rng=rng)
+            target_sources.append(sources)
+            target_segs.append(segs)
 
-        return result
+        target_cells = np.repeat(np.arange(target_cell_num), [s.size for s in target_sources])
+        return ConnectionPlan(source_ids=np.concatenate([[]] + target_sources),
+                              target_cell_ids=target_cells,
+                              target_seg_ids=np.concatenate([[]] + target_segs))
+
+    def _plan_target_cell(self, conn_sources: np.ndarray, seg_num: int, conn_params,
+                          rng: np.random.Generator):
+        """
+        Draws the number of synapses of each connection of a single target cell and the target
+        segment of each synapse.
+
+        :param conn_sources:
+            array of source ids connected to the target cell
+        :param seg_num:
+            number of potential target segments of the target cell
+        :param conn_params:
+            ConnParams object of the Connector
+        :param rng:
+            numpy Generator of the target cell
+        :return:
+            tuple of numpy arrays (source ids, target segment ids) - one element for each synapse
+        """
+        conn_num = conn_sources.size
+
+        # if NormalTruncatedSegDist has no mean defined - choose some with random uniform
+        # dist between 0 and 1 for each connection. It is used to cluster randomly synapses
+        # around this mean point and with std spread.
+        seg_dist = conn_params.seg_dist
+        seg_dist_normal_means = None
+        if isinstance(seg_dist, NormalTruncatedSegDist) and seg_dist.mean is None:
+            seg_dist_normal_means = rng.uniform(size=conn_num)
+
+        # create syn_num_per_source number of synapses per single connection
+        syn_nums = self._draw_syn_nums_per_cell_source(conn_params.syn_num_per_cell_source,
+                                                        size=conn_num, rng=rng)
+        syn_sources = np.repeat(conn_sources, syn_nums)
+        if seg_dist_normal_means is not None:
+            seg_dist_normal_means = np.repeat(seg_dist_normal_means, syn_nums)
+
+        # based on seg_dist - decide with what target_segment(s) each synapse make connection
+        if seg_dist == 'all':
+            sources = np.repeat(syn_sources, seg_num)
+            segs = np.tile(np.arange(seg_num), syn_sources.size)
+        else:
+            sources = syn_sources
+            segs = self._draw_target_seg_ids(np.full(syn_sources.size, seg_num),
+                                             seg_dist=seg_dist,
+                                             normal_means=seg_dist_normal_means, rng=rng)
+        return sources, segs
+
+    @staticmethod
+    def _get_conn_stream(stream_id: int, source: Optional[int] = None,
+                         target: Optional[int] = None) -> np.random.Generator:
+        """
+        Returns numpy Generator of the Connector's random stream.
+
+        :param stream_id:
+            64-bit id of the Connector's random streams
+        :param source:
+            index of the source for streams of a single source. Default is None.
+        :param target:
+            key of the target cell for streams of a single target cell. Default is None.
+        :return:
+            numpy Generator
+        """
+        source_key = 0 if source is None else source + 1
+        target_key = 0 if target is None else target + 1
+        return random_streams.get_stream(random_streams.CONNECTION_STREAM, stream_id,
+                                         source_key, target_key)
+
+    @staticmethod
+    def _draw_fixed_pairs(source_rule: str, source_num: int, target_cell_num: int,
+                          conn_num: int, rngs: List[np.random.Generator]):
+        """
+        Draws exactly conn_num partners for each target cell ('fixed_indegree'), for each source
+        ('fixed_outdegree') or for the whole connection ('fixed_total'). Partners are drawn
+        without replacement, so there is at most one connection per (source, target cell) pair.
+
+        :param source_rule:
+            'fixed_indegree', 'fixed_outdegree' or 'fixed_total'
+        :param source_num:
+            number of sources
+        :param target_cell_num:
+            number of target cells
+        :param conn_num:
+            number of connections
+        :param rngs:
+            list of numpy Generators: one for each target cell ('fixed_indegree'), one for each
+            source ('fixed_outdegree') or a single one ('fixed_total')
+        :return:
+            tuple of numpy arrays (source ids, target cell ids) sorted by target cell
+        """
+        if source_rule == 'fixed_indegree':
+            partner_num, cell_num = source_num, target_cell_num
+        elif source_rule == 'fixed_outdegree':
+            partner_num, cell_num = target_cell_num, source_num
+        else:
+            partner_num, cell_num = source_num * target_cell_num, 1
+
+        if conn_num > partner_num:
+            raise ValueError("For rule '%s' conn_num can't be larger than the number of potential "
+                             "partners: %s, but provided %s" % (source_rule, partner_num, conn_num))
+
+        partners = np.empty((cell_num, conn_num), dtype=int)
+        for i in range(cell_num):
+            partners[i] = rngs[i].choice(partner_num, size=conn_num, replace=False)
+        cells = np.repeat(np.arange(cell_num), conn_num)
+        partners = partners.ravel()
+
+        if source_rule == 'fixed_indegree':
+            sources, targets = partners, cells
+        elif source_rule == 'fixed_outdegree':
+            sources, targets = cells, partners
+        else:
+            sources, targets = np.divmod(partners, target_cell_num)
+
+        order = np.lexsort((sources, targets))
+        return sources[order], targets[order]
+
+    @staticmethod
+    def _find_spatial_pairs(source_positions: np.ndarray, target_positions: np.ndarray,
+                            max_distance: float):
+        """
+        Find all (source, target cell) pairs which are not further than max_distance from each
+        other. It uses KD-trees, so it doesn't test all source_num * target_cell_num pairs.
+
+        :param source_positions:
+            array of shape (source_num, 3) with positions of sources (in um)
+        :param target_positions:
+            array of shape (target_cell_num, 3) with positions of target cells (in um)
+        :param max_distance:
+            maximal distance (in um) between the source and the target cell
+        :return:
+            tuple of numpy arrays (source ids, target cell ids, distances) sorted by target cell
+            and source
+        """
+        if source_positions is None or target_positions is None:
+            raise ValueError("Positions of sources and target cells are required for "
+                             "DistanceConnectionProba.")
+        from scipy.spatial import cKDTree
+
+        source_tree = cKDTree(np.asarray(source_positions, dtype=float))
+        target_tree = cKDTree(np.asarray(target_positions, dtype=float))
+
+        pairs = target_tree.sparse_distance_matrix(source_tree, max_distance=max_distance,
+                                                   output_type='ndarray')
+        order = np.lexsort((pairs['j'], pairs['i']))
+        pairs = pairs[order]
+        return pairs['j'].astype(int), pairs['i'].astype(int), pairs['v']
+
+    @staticmethod
+    def _get_source_positions(sources) -> np.ndarray:
+        """
+        :param sources:
+            list of Connector's sources. All of them must be Seg objects.
+        :return:
+            array of shape (source_num, 3) with positions of sources (in um)
+        """
+        if not all([isinstance(s, Seg) for s in sources]):
+            raise TypeError("DistanceConnectionProba requires all sources to be of type Seg, "
+                            "since other sources (eg. NetStim, VecStim) have no position.")
+        return np.array([s.position for s in sources])
+
+    @staticmethod
+    def _get_target_positions(cell_targets: List[List[Seg]]) -> np.ndarray:
+        """
+        :param cell_targets:
+            list of target segments for each target cell
+        :return:
+            array of shape (target_cell_num, 3) with positions of target cells' soma (in um).
+            If the target cell has no soma - position of the middle of its first section is
+            returned.
+        """
+        result = []
+        for segs in cell_targets:
+            cell = segs[0].parent.cell
+            secs = cell.filter_secs("soma", as_list=True)
+            if len(secs) == 0:
+                secs = cell.secs
+            result.append(secs[0](0.5).position)
+        return np.array(result)
 
     @staticmethod
     def _group_segs_by_cell(segs: List[Seg]):
         result = {}
         for t in segs:
-            c = t.parent.cell
-            if c.name not in result:
-                result[c.name] = []
-            result[c.name].append(t)
+            c = id(t.parent.cell)
+            if c not in result:
+                result[c] = []
+            result[c].append(t)
         return result
 
     @staticmethod
-    def _get_curr_target_segs(potential_target_segments, seg_dist, normal_mean=None):
+    def _draw_target_seg_ids(seg_nums: np.ndarray, seg_dist, normal_means=None,
+                             rng=None) -> np.ndarray:
         """
-        TODO It requires refactoring in the future
-          * returning all potential_target_segments or only one from that list - seems to be a
-          bad practice
-          * passing mean as a param only for NormalTruncatedSegDist distribution - seems to be a
-          bad practice
-
-        Returns a list of target section to connect.
+        Returns an array of target segment indices, one for each synapse. Each index points to
+        one of the potential target segments of the synapse's target cell.
 
-        It returns a list of single element: target section if seg_dist is "uniform" or NormalDist
-        It returns a list of all targets provided in the potential_target_segments if seg_dist is
-        "all"
-
-        :param potential_target_segments:
+        :param seg_nums:
+            number of potential target segments for each synapse
         :param seg_dist:
             distribution of single connection between provided target segments.
 
-            "all" - str: means all provided segments will be taken.
-
             "uniform" - str: means all segs are equally probable
                         Uniform distribution for segment choosing. Uniform means that all
                         provided segments have equal probability.
@@ -344,44 +912,44 @@ class Population(NeuronRemovable):
                         :param std:
                             Provided in um.
                             standard deviation of the cluster of distribution.
+        :param normal_means:
+            array of means for each synapse, used only if seg_dist is NormalTruncatedSegDist
+            without the mean defined
+        :param rng:
+            numpy Generator to draw from. Default is None, which means the global numpy
+            random state.
         :return:
-            target section list based on the provided distribution type
+            numpy array of target segment indices
         """
-        if not isinstance(potential_target_segments, Iterable):
-            potential_target_segments = [potential_target_segments]
-
-        if seg_dist == 'all':
-            return np.array(potential_target_segments)
-        elif seg_dist == 'uniform':
-            return np.random.choice(potential_target_segments, 1)
+        if rng is None:
+            rng = np.random
+        size = seg_nums.size
+        if seg_dist == 'uniform':
+            return (rng.uniform(size=size) * seg_nums).astype(int)
         elif isinstance(seg_dist, (LogNormalTruncatedDist, NormalTruncatedSegDist)):
-            if normal_mean is None:
-                normal_mean = seg_dist.mean
+            if normal_means is None:
+                normal_means = seg_dist.mean
 
             if isinstance(seg_dist, NormalTruncatedDist):
-                value = np.random.normal(loc=normal_mean, scale=seg_dist.std)
+                values = rng.normal(loc=normal_means, scale=seg_dist.std, size=size)
             else:
-                value = np.random.lognormal(mean=normal_mean, sigma=seg_dist.std)
-            value = np.abs(value)
+                values = rng.lognormal(mean=normal_means, sigma=seg_dist.std, size=size)
+            values = np.abs(values)
 
-            if value > 1:
-                value = 1 - value % 1
-            if len(potential_target_segments) == 1:
-                index = 0
-            else:
-                index = int(round((len(potential_target_segments) - 1) * value))
-            return np.array([potential_target_segments[index]])
+            values = np.where(values > 1, 1 - values % 1, values)
+            return np.round((seg_nums - 1) * values).astype(int)
         else:
             raise TypeError("Param seg_dist can be only str: 'all', 'uniform' or "
                             "object: NormalTruncatedSegDist, but provided: %s" % seg_dist.__class__)
 
     @staticmethod
-    def _is_make_cell_connection(conn_proba: Union[float, int, UniformConnectionProba,
-                                                   NormalConnectionProba,
-                                                   LogNormalConnectionProba]):
+    def _draw_cell_connections(conn_proba: Union[float, int, UniformConnectionProba,
+                                                 NormalConnectionProba,
+                                                 LogNormalConnectionProba],
+                               size: int, rng=None) -> np.ndarray:
         """
-        Determine if there should be a connection between single tuple of (source and target) based
-        on conn_proba type and conn_proba.expected value.
+        Determine if there should be a connection between each of size tuples of (source and
+        target) based on conn_proba type and conn_proba.expected value.
 
         :param conn_proba:
             can be a single number from 0 to 1 defining probability of connection.
@@ -390,41 +958,40 @@ class Population(NeuronRemovable):
             It can also be an instance of UniformConnectionProba, NormalConnectionProba,
             LogNormalConnectionProba class which defines specific distribution with
             an expected value
+        :param size:
+            number of potential connections
+        :param rng:
+            numpy Generator to draw from. Default is None, which means the global numpy
+            random state.
         :return:
+            boolean numpy array of size elements
         """
         if conn_proba == 1:
-            return True
+            return np.ones(size, dtype=bool)
         elif isinstance(conn_proba, (float, int)):
             conn_proba = UniformConnectionProba(threshold=conn_proba)
 
-        if isinstance(conn_proba, UniformConnectionProba):
-            result = np.random.uniform(size=1)[0]
-        elif isinstance(conn_proba, NormalConnectionProba):
-            result = np.abs(np.random.normal(loc=conn_proba.mean, scale=conn_proba.std))
-        elif isinstance(conn_proba, LogNormalConnectionProba):
-            result = np.abs(np.random.lognormal(mean=conn_proba.mean, sigma=conn_proba.std))
-        else:
+        if not isinstance(conn_proba, (UniformConnectionProba, NormalConnectionProba,
+                                       LogNormalConnectionProba)):
             raise TypeError("Not allowed ConnectionProba. Allowed types are: int, float, "
                             "UniformConnectionProba, NormalConnectionProba, "
                             "LogNormalConnectionProba.")
 
-        return result > conn_proba.expected
+        return conn_proba.sample(n=size, rng=rng) > conn_proba.expected
 
     @staticmethod
-    def _get_syn_num_per_cell_source(value: Union[int, UniformDist, NormalTruncatedDist,
-                                                  LogNormalTruncatedDist]):
+    def _draw_syn_nums_per_cell_source(value: Union[int, UniformDist, NormalTruncatedDist,
+                                                    LogNormalTruncatedDist],
+                                       size: int, rng=None) -> np.ndarray:
         if isinstance(value, int):
             if value < 0:
                 raise ValueError("syn_num_per_cell_source cannot be < 0.")
-            result = value
-        elif isinstance(value, UniformTruncatedDist):
-            result = np.random.uniform(low=value.low, high=value.high)
-        elif isinstance(value, NormalTruncatedDist):
-            result = np.random.normal(loc=value.mean, scale=value.std)
-        elif isinstance(value, LogNormalTruncatedDist):
-            result = np.random.lognormal(mean=value.mean, sigma=value.std)
+            result = np.full(size, value)
+        elif isinstance(value, (UniformTruncatedDist, NormalTruncatedDist,
+                                LogNormalTruncatedDist)):
+            result = value.sample(n=size, rng=rng)
         else:
             raise TypeError("syn_num_per_cell_source can be of type: int, UniformTruncatedDist, "
                             "NormalTruncatedDist or LogNormalTruncatedDist.")
 
-        return int(np.abs(np.round(result)))
+        return np.abs(np.round(result)).astype(int)
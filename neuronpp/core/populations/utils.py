@@ -42,11 +42,11 @@ def check_and_prepare_target(targ: Union[List[Sec], List[Seg], List[CoreCell], S
         if all([isinstance(s, Sec) for s in targ]):
             target_ok = True
             # remove 0 and 1 ends
-            targ = [seg for sec in targ for seg in sec.segs[1:-1]]
+            targ = get_inner_segs(targ)
         elif all([isinstance(c, SectionCell) for c in targ]):
             target_ok = True
-            # remove 0 and 1 ends
-            targ = [seg for c in targ for sec in c.secs for seg in sec.segs[1:-1]]
+            # segment index contains only inner segments
+            targ = [seg for c in targ for seg in c.segment_index.segs]
     else:
         if targ is None:
             target_ok = True
@@ -56,12 +56,38 @@ def check_and_prepare_target(targ: Union[List[Sec], List[Seg], List[CoreCell], S
         elif isinstance(targ, Sec):
             target_ok = True
             # remove 0 and 1 ends
-            targ = [seg for seg in targ.segs[1:-1]]
+            targ = get_inner_segs([targ])
         elif isinstance(targ, SectionCell):
             target_ok = True
-            # remove 0 and 1 ends
-            targ = [seg for sec in targ.secs for seg in sec.segs[1:-1]]
+            # segment index contains only inner segments
+            targ = list(targ.segment_index.segs)
 
     if not target_ok:
         raise TypeError("Target can be an instance or list of: Sec or Cell.")
     return targ
+
+
+def get_inner_segs(secs: List[Sec]) -> List[Seg]:
+    """
+    Returns inner segments (without 0 and 1 ends) of all provided sections.
+    Segments are taken from the SegmentIndex of the section's cell if possible, so the same Seg
+    objects are reused.
+
+    :param secs:
+        list of Sec objects
+    :return:
+        list of Seg objects
+    """
+    indexes = {}
+    result = []
+    for sec in secs:
+        segs = None
+        cell = sec.cell
+        if isinstance(cell, SectionCell):
+            if id(cell) not in indexes:
+                indexes[id(cell)] = cell.segment_index
+            segs = indexes[id(cell)].get_sec_segs(sec)
+        if segs is None:
+            segs = sec.segs[1:-1]
+        result.extend(segs)
+    return result
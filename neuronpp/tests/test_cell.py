@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 import time
 import unittest
 import numpy as np
@@ -6,7 +8,9 @@ from neuron import h
 import multiprocessing
 
 from neuronpp.cells.cell import Cell
-from neuronpp.utils.compile_mod import compile_mods, get_mod_compiled_target_path
+from neuronpp.core.cells.morphology_cache import clear_morphology_cache, get_morphology
+from neuronpp.utils.compile_mod import compile_mods, get_mod_compiled_target_path, CompileMOD, \
+    compile_mods_cached, file_lock
 
 
 class TestCellAddSectionDefault(unittest.TestCase):
@@ -172,6 +176,109 @@ class TestFiltering(unittest.TestCase):
 
         self.assertEqual(0, len(list(h.allsec())))
 
+
+class TestIndexedFilter(unittest.TestCase):
+    def setUp(self):
+        self.cell = Cell("cell")
+        self.soma = self.cell.add_sec("soma", nseg=1)
+        for i in range(12):
+            dend = self.cell.add_sec("dend[%s]" % i, nseg=1)
+            self.cell.connect_secs(child=dend, parent=self.soma)
+
+    def tearDown(self):
+        self.soma = None
+        self.cell.remove_immediate_from_neuron()
+        self.assertEqual(0, len(list(h.allsec())))
+
+    def assert_same_as_scan(self, **kwargs):
+        expected = self.cell.filter(list(self.cell.secs), as_list=True, **kwargs)
+        self.assertEqual(expected, self.cell.filter_secs(as_list=True, **kwargs))
+
+    def test_patterns_as_scan(self):
+        self.assert_same_as_scan(name="dend[1]")
+        self.assert_same_as_scan(name="dend[1],soma")
+        self.assert_same_as_scan(name="regex:dend\\[1[0-9]\\]")
+        self.assert_same_as_scan(name="dend", parent="soma")
+        self.assert_same_as_scan(name=lambda n: n.endswith("]"))
+        self.assertEqual(3, len(self.cell.filter_secs("dend[1")))
+
+    def test_consistent_after_add_and_remove(self):
+        self.assertEqual(12, len(self.cell.filter_secs("dend")))
+        self.cell.add_sec("dend[12]", nseg=1)
+        self.assertEqual(13, len(self.cell.filter_secs("dend")))
+        self.assertEqual(4, len(self.cell.filter_secs("dend[1")))
+
+        self.cell.remove_secs(name="dend[1")
+        self.assertEqual(9, len(self.cell.filter_secs("dend")))
+        self.assert_same_as_scan(name="dend[2],dend[3]")
+
+    def test_consistent_after_rename(self):
+        self.assertEqual(12, len(self.cell.filter_secs("dend")))
+        self.assertEqual(1, len(self.cell.secs.lookup("name", self.soma.name)))
+
+        self.cell.filter_secs("dend[0]").name = "axon"
+        self.soma.name = "root"
+        self.assertEqual(11, len(self.cell.filter_secs("dend")))
+        self.assertEqual(1, len(self.cell.filter_secs("axon", as_list=True)))
+        self.assertEqual(1, len(self.cell.secs.lookup("name", "root")))
+        self.assert_same_as_scan(name="dend")
+
+    def test_exact_name_is_unique(self):
+        self.assertEqual(1, len(self.cell.secs.lookup("name", self.soma.name)))
+        # names of loaded sections are without the cell's prefix
+        axon = h.Section(name="axon")
+        self.cell.load_cell_from_existing_neuron([axon])
+        self.assertEqual(1, len(self.cell.secs.lookup("name", "axon")))
+        with self.assertRaises(LookupError):
+            self.cell.load_cell_from_existing_neuron([axon])
+        axon = None
+
+
+class TestSegmentIndex(unittest.TestCase):
+    def setUp(self):
+        self.cell = Cell("cell")
+        self.soma = self.cell.add_sec("soma", diam=10, l=10, nseg=1)
+        self.dend = self.cell.add_sec("dend", diam=1, l=100, nseg=4)
+        self.cell.connect_secs(child=self.dend, parent=self.soma)
+
+    def tearDown(self):
+        self.soma = None
+        self.dend = None
+        self.cell.remove_immediate_from_neuron()
+        self.assertEqual(0, len(list(h.allsec())))
+
+    def test_index_arrays(self):
+        index = self.cell.segment_index
+        self.assertEqual(5, len(index))
+        self.assertEqual([0, 1, 1, 1, 1], index.sec_ids.tolist())
+        self.assertTrue(np.allclose([0.5, 0.125, 0.375, 0.625, 0.875], index.x))
+        self.assertTrue(np.allclose([10, 25, 25, 25, 25], index.lengths))
+        self.assertTrue(np.allclose([10, 35, 60, 85, 110], index.list_cum_lengths))
+        self.assertTrue(np.allclose([s.area for s in index.segs], index.areas))
+        self.assertEqual([s.hoc for s in self.dend.segs[1:-1]],
+                         [s.hoc for s in index.get_sec_segs(self.dend)])
+
+    def test_index_is_cached(self):
+        self.assertIs(self.cell.segment_index, self.cell.segment_index)
+
+    def test_index_invalidation(self):
+        index = self.cell.segment_index
+        self.dend.hoc.nseg = 2
+        self.assertIsNot(index, self.cell.segment_index)
+        self.assertEqual(3, len(self.cell.segment_index))
+
+        index = self.cell.segment_index
+        self.cell.invalidate_segment_index()
+        self.assertIsNot(index, self.cell.segment_index)
+
+    def test_index_after_sec_removal(self):
+        self.assertEqual(5, len(self.cell.segment_index))
+        self.dend = None
+        self.cell.remove_secs("dend")
+        self.assertEqual(1, len(self.cell.segment_index))
+        self.assertEqual(1, len(list(h.allsec())))
+
+
 def run_subprocess(func, *params):
     # Create a process that targets 'func' and passes 'params' to it
     process = multiprocessing.Process(target=func, args=params)
@@ -179,6 +286,325 @@ def run_subprocess(func, *params):
     process.join()  # Optionally, you can set a timeout if needed, like process.join(timeout=10)
     return process
 
+def compile_cached(source_path, cache_dir, queue):
+    queue.put(compile_mods_cached(source_path, cache_dir=cache_dir))
+
+
+class TestMorphologyCache(unittest.TestCase):
+    def setUp(self):
+        path = os.path.dirname(os.path.abspath(__file__))
+        self.filepath = os.path.join(path, "..", "commons/morphologies/swc/c91662.swc")
+        clear_morphology_cache()
+
+    def tearDown(self):
+        clear_morphology_cache()
+
+    @staticmethod
+    def get_geometry(cell):
+        h.define_shape()
+        geometry = []
+        for sec in cell.secs:
+            parent = sec.hoc.parentseg()
+            parent = None if parent is None else (parent.sec.name().split('.')[-1], parent.x)
+            geometry.append((sec.name, sec.hoc.nseg, sec.hoc.L, sec.hoc.orientation(), parent,
+                             [(seg.diam, seg.area()) for seg in sec.hoc]))
+        return geometry
+
+    def test_cached_morphology(self):
+        cell1 = Cell("cell1")
+        cell1.load_morpho(filepath=self.filepath, use_cache=False)
+        cell2 = Cell("cell2")
+        cell2.load_morpho(filepath=self.filepath)
+        self.assertIsNotNone(get_morphology(self.filepath))
+        cell3 = Cell("cell3")
+        cell3.load_morpho(filepath=self.filepath)
+
+        expected = self.get_geometry(cell1)
+        self.assertEqual(194, len(expected))
+        self.assertEqual(expected, self.get_geometry(cell2))
+        self.assertEqual(expected, self.get_geometry(cell3))
+        self.assertEqual({'soma', 'axon', 'dend', 'apic'},
+                         set(get_morphology(self.filepath).sec_types))
+
+        for cell in [cell1, cell2, cell3]:
+            cell.remove_immediate_from_neuron()
+        self.assertEqual(0, len(list(h.allsec())))
+
+    def test_npz_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cell1 = Cell("cell1")
+            cell1.load_morpho(filepath=self.filepath, cache_dir=cache_dir)
+            self.assertEqual(1, len([f for f in os.listdir(cache_dir) if f.endswith(".npz")]))
+
+            # new run - only the npz file is available
+            clear_morphology_cache()
+            self.assertIsNone(get_morphology(self.filepath))
+            self.assertIsNotNone(get_morphology(self.filepath, cache_dir=cache_dir))
+            cell2 = Cell("cell2")
+            cell2.load_morpho(filepath=self.filepath, cache_dir=cache_dir)
+
+            self.assertEqual(self.get_geometry(cell1), self.get_geometry(cell2))
+            cell1.remove_immediate_from_neuron()
+            cell2.remove_immediate_from_neuron()
+
+
+class TestSegmentTable(unittest.TestCase):
+    def setUp(self):
+        self.cell = Cell("cell")
+        self.soma = self.cell.add_sec("soma", diam=10, l=10, nseg=1, ra=100)
+        self.dend = self.cell.add_sec("dend", diam=1, l=100, nseg=4, ra=200)
+        self.cell.connect_secs(child=self.dend, parent=self.soma)
+        self.cell.insert("pas", sec=self.dend)
+
+    def tearDown(self):
+        self.soma = None
+        self.dend = None
+        self.cell.remove_immediate_from_neuron()
+        self.assertEqual(0, len(list(h.allsec())))
+
+    def test_table_arrays(self):
+        table = self.cell.segment_table()
+        segs = self.cell.segment_index.segs
+        self.assertEqual(5, len(table))
+        self.assertEqual([0, 1, 1, 1, 1], table.sec_ids.tolist())
+        self.assertTrue(np.allclose([s.area for s in segs], table.area))
+        self.assertTrue(np.allclose([s.diam for s in segs], table.diam))
+        self.assertTrue(np.allclose([s.L for s in segs], table.L))
+        self.assertTrue(np.allclose([100, 200, 200, 200, 200], table.Ra))
+        self.assertTrue(np.allclose([h.distance(self.soma.hoc(0.5), s.hoc) for s in segs],
+                                    table.soma_distances))
+        self.assertEqual([False, True, True, True, True], table.has_mechanism("pas").tolist())
+        self.assertFalse(table.has_mechanism("hh").any())
+
+    def test_refresh(self):
+        table = self.cell.segment_table()
+        self.dend.hoc.diam = 2
+        self.cell.insert("hh", sec=self.soma)
+        table.refresh()
+        self.assertTrue(np.allclose([10, 2, 2, 2, 2], table.diam))
+        self.assertEqual([True, False, False, False, False], table.has_mechanism("hh").tolist())
+
+    def test_seg_length(self):
+        self.assertEqual(25, self.dend(0.5).L)
+        self.assertAlmostEqual(self.dend.hoc(0.5).area() * 4, self.dend.area)
+
+
+class TestTreeIndex(unittest.TestCase):
+    def setUp(self):
+        self.cell = Cell("cell")
+        self.soma = self.cell.add_sec("soma", diam=10, l=10, nseg=1)
+        self.dend1 = self.cell.add_sec("dend1", diam=2, l=100, nseg=5)
+        self.dend2 = self.cell.add_sec("dend2", diam=1, l=50, nseg=3)
+        self.dend3 = self.cell.add_sec("dend3", diam=1, l=30, nseg=2)
+        self.cell.connect_secs(child=self.dend1, parent=self.soma, child_loc=0.0, parent_loc=1.0)
+        # dend2 is connected to the middle of dend1 by its 1 end
+        self.cell.connect_secs(child=self.dend2, parent=self.dend1, child_loc=1.0, parent_loc=0.5)
+        self.cell.connect_secs(child=self.dend3, parent=self.dend1, child_loc=0.0, parent_loc=1.0)
+        self.cell.insert("pas")
+
+    def tearDown(self):
+        self.soma = None
+        self.dend1 = None
+        self.dend2 = None
+        self.dend3 = None
+        self.cell.remove_immediate_from_neuron()
+        self.assertEqual(0, len(list(h.allsec())))
+
+    def test_topology(self):
+        tree = self.cell.tree_index
+        self.assertEqual([-1, 0, 1, 1], tree.parent_ids.tolist())
+        self.assertEqual([0, 1, 2, 2], tree.depths.tolist())
+        self.assertEqual([0, 1, 1, 3], tree.lca(np.array([0, 2, 2, 3]),
+                                                np.array([3, 3, 1, 3])).tolist())
+
+    def test_distances_as_h_distance(self):
+        tree = self.cell.tree_index
+        segs = [seg.hoc for seg in self.cell.segment_index.segs]
+        expected = [[h.distance(a, b) for b in segs] for a in segs]
+        index = self.cell.segment_index
+        distances = tree.get_distances(index.sec_ids[:, np.newaxis], index.x[:, np.newaxis],
+                                       index.sec_ids[np.newaxis, :], index.x[np.newaxis, :])
+        self.assertTrue(np.allclose(expected, distances))
+
+        h.distance(0, self.soma.hoc(0))
+        self.assertTrue(np.allclose([h.distance(seg) for seg in segs], tree.root_distances))
+
+        soma = self.soma(0.5)
+        self.assertAlmostEqual(h.distance(soma.hoc, self.dend2.hoc(0)),
+                               tree.get_distance(soma, self.dend2.hoc(0)))
+        self.assertTrue(np.allclose([h.distance(soma.hoc, seg) for seg in segs],
+                                    tree.get_distances_from(soma)))
+
+    def test_distances_between_segment_centers(self):
+        # h.distance() measures to the center of the segment containing the point
+        self.cell.connect_secs(child=self.dend2, parent=self.dend3, child_loc=1.0,
+                               parent_loc=0.5)
+        tree = self.cell.tree_index
+        points = [sec.hoc(x) for sec in [self.soma, self.dend1, self.dend2, self.dend3]
+                  for x in [0, 0.1, 0.25, 0.5, 0.9, 1]]
+        for a in points:
+            for b in points:
+                self.assertAlmostEqual(h.distance(a, b), tree.get_distance(a, b))
+
+    def test_electrotonic_distance(self):
+        tree = self.cell.tree_index
+        index = self.cell.segment_index
+        lambdas = np.array([seg.get_lambda() for seg in index.segs])
+        electrotonic_lengths = index.lengths / lambdas
+
+        # from the soma center to the center of the first segment of dend1
+        expected = electrotonic_lengths[0] / 2 + electrotonic_lengths[1] / 2
+        self.assertAlmostEqual(expected, tree.get_distance(self.soma(0.5), index.segs[1],
+                                                           electrotonic=True))
+        self.assertAlmostEqual(expected, tree.electrotonic_root_distances[1] -
+                               tree.electrotonic_root_distances[0])
+
+    def test_disconnected(self):
+        sec = self.cell.add_sec("separate", diam=1, l=10, nseg=1)
+        tree = self.cell.tree_index
+        self.assertEqual(np.inf, tree.get_distance(self.soma(0.5), sec(0.5)))
+        sec = None
+
+    def test_rebuild_after_connect(self):
+        tree = self.cell.tree_index
+        self.assertIs(tree, self.cell.tree_index)
+        self.cell.connect_secs(child=self.dend3, parent=self.soma, child_loc=0.0, parent_loc=1.0)
+        self.assertIsNot(tree, self.cell.tree_index)
+        # half of the soma and a quarter of dend3 (center of its first segment)
+        self.assertAlmostEqual(12.5, self.cell.tree_index.get_distance(self.soma(0.5),
+                                                                       self.dend3(0.25)))
+
+
+class TestDistributeMechanismParam(unittest.TestCase):
+    def setUp(self):
+        self.cell = Cell("cell")
+        self.soma = self.cell.add_sec("soma", diam=10, l=10, nseg=1)
+        self.dend1 = self.cell.add_sec("dend1", diam=1, l=100, nseg=5)
+        self.dend2 = self.cell.add_sec("dend2", diam=1, l=50, nseg=3)
+        # dend1 is connected by its 0 end and dend2 by its 1 end
+        self.cell.connect_secs(child=self.dend1, parent=self.soma, child_loc=0.0,
+                               parent_loc=1.0)
+        self.cell.connect_secs(child=self.dend2, parent=self.dend1, child_loc=1.0,
+                               parent_loc=1.0)
+        self.cell.insert("hh")
+
+    def tearDown(self):
+        self.soma = None
+        self.dend1 = None
+        self.dend2 = None
+        self.cell.remove_immediate_from_neuron()
+
+    def get_expected(self, secs, origin, func):
+        return [func(h.distance(origin, seg)) for sec in secs for seg in sec.hoc]
+
+    def get_values(self, secs):
+        return [seg.gnabar_hh for sec in secs for seg in sec.hoc]
+
+    def test_callable(self):
+        secs = [self.dend1, self.dend2]
+        values = self.cell.distribute_mechanism_param("hh", "gnabar", lambda d: 0.1 + d / 1000,
+                                                      secs=secs)
+        expected = self.get_expected(secs, self.soma.hoc(0.5), lambda d: 0.1 + d / 1000)
+        self.assertTrue(np.allclose(expected, values))
+        self.assertTrue(np.allclose(expected, self.get_values(secs)))
+
+    def test_origin_inside_sec(self):
+        origin = self.dend1(0.5)
+        values = self.cell.distribute_mechanism_param("hh", "gnabar", lambda d: d,
+                                                      secs="dend", origin=origin)
+        expected = self.get_expected([self.dend1, self.dend2], origin.hoc, lambda d: d)
+        self.assertTrue(np.allclose(expected, values))
+
+    def test_string_func_normalized(self):
+        self.cell.distribute_mechanism_param("hh", "gnabar", "lin", secs="dend", normalize=True,
+                                             s3=1, s4=2, s7=0.1)
+        max_dist = h.distance(self.soma.hoc(0.5), self.dend2.hoc(0))
+        self.assertEqual(155, max_dist)
+        expected = self.get_expected([self.dend1, self.dend2], self.soma.hoc(0.5),
+                                     lambda d: (1 + d / max_dist * 2) * 0.1)
+        self.assertTrue(np.allclose(expected, self.get_values([self.dend1, self.dend2])))
+
+    def test_abs(self):
+        self.cell.distribute_mechanism_param("hh", "gnabar", "abs", secs="dend",
+                                             s3=1, s4=0.01, s5=50, s6=120, s7=1)
+        expected = self.get_expected([self.dend1, self.dend2], self.soma.hoc(0.5),
+                                     lambda d: 1 if 50 < d < 120 else 0.01)
+        self.assertEqual(expected, self.get_values([self.dend1, self.dend2]))
+
+    def test_distances_after_length_change(self):
+        func = lambda d: d / 1000
+        self.cell.distribute_mechanism_param("hh", "gnabar", func, secs=[self.dend2])
+        self.dend1.hoc.L = 200
+        self.cell.distribute_mechanism_param("hh", "gnabar", func, secs=[self.dend2])
+        expected = self.get_expected([self.dend2], self.soma.hoc(0.5), func)
+        self.assertTrue(np.allclose(expected, self.get_values([self.dend2])))
+
+    def test_wrong_origin(self):
+        with self.assertRaises(LookupError):
+            self.cell.distribute_mechanism_param("hh", "gnabar", lambda d: d, origin="dend")
+
+    def test_func_params_with_callable(self):
+        with self.assertRaises(TypeError):
+            self.cell.distribute_mechanism_param("hh", "gnabar", lambda d: d, s3=1)
+
+
+class TestCellClone(unittest.TestCase):
+    def setUp(self):
+        path = os.path.dirname(os.path.abspath(__file__))
+        filepath = os.path.join(path, "..", "commons/morphologies/swc/my.swc")
+        self.cell = Cell("cell")
+        self.cell.load_morpho(filepath=filepath)
+        soma = self.cell.add_sec("soma2", diam=10, l=10, nseg=3)
+        self.cell.connect_secs(child=soma, parent=self.cell.secs[0])
+        self.cell.insert("pas")
+        self.cell.insert("hh")
+        for sec in self.cell.secs:
+            sec.hoc.Ra = 150
+            for i, seg in enumerate(sec.hoc):
+                seg.gnabar_hh = 0.1 + 0.01 * i
+                seg.diam = 1 + i
+
+    def tearDown(self):
+        self.cell.remove_immediate_from_neuron()
+        self.assertEqual(0, len(list(h.allsec())))
+
+    @staticmethod
+    def get_state(cell):
+        state = []
+        for sec in cell.secs:
+            parent = sec.hoc.parentseg()
+            parent = None if parent is None else (parent.sec.name().split('.')[-1], parent.x)
+            for seg in sec.hoc:
+                state.append((sec.hoc.name().split('.')[-1], parent, sec.hoc.Ra, seg.x, seg.diam,
+                              seg.area(), seg.cm, seg.g_pas, seg.e_pas, seg.gnabar_hh,
+                              seg.gkbar_hh, seg.ena, seg.ek))
+        return state
+
+    def test_clone(self):
+        clone = self.cell.clone(name="clone")
+        self.assertEqual("clone", clone.name)
+        self.assertIsInstance(clone, Cell)
+        self.assertEqual([s.name for s in self.cell.filter_secs("dend", as_list=True)],
+                         [s.name for s in clone.filter_secs("dend", as_list=True)])
+        self.assertEqual(self.get_state(self.cell), self.get_state(clone))
+        self.assertEqual(["Cell[clone].soma2"], [s.name for s in clone.filter_secs("soma2",
+                                                                                    as_list=True)])
+        clone.remove_immediate_from_neuron()
+
+    def test_clone_with_cell_function(self):
+        clone = self.cell.clone(cell_function=lambda: Cell("custom"))
+        self.assertEqual("custom", clone.name)
+        self.assertEqual(self.get_state(self.cell), self.get_state(clone))
+        clone.remove_immediate_from_neuron()
+
+    def test_clone_not_empty_cell(self):
+        cell = Cell("not_empty")
+        cell.add_sec("soma")
+        with self.assertRaises(ValueError):
+            self.cell.clone(cell_function=lambda: cell)
+        cell.remove_immediate_from_neuron()
+
+
 class TestMODCompile(unittest.TestCase):
 
     def test_mod_override(self):
@@ -218,6 +644,103 @@ class TestMODCompile(unittest.TestCase):
         # Check if the file modification time has changed
         self.assertEqual(first_mod_time, second_mod_time)
 
+    def test_mod_cache(self):
+        path = os.path.dirname(os.path.abspath(__file__))
+        source_path = os.path.join(path, "..", "commons/mods/combe2018")
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            # compile first
+            target_path1 = compile_mods(source_path, cache_dir=cache_dir)
+            self.assertTrue(CompileMOD().is_compiled(target_path1))
+            lib_path = os.path.join(target_path1, "x86_64", "libnrnmech.so")
+            first_lib_time = os.path.getmtime(lib_path)
+
+            # second compile should reuse the cached library
+            target_path2 = compile_mods(source_path, override=True, cache_dir=cache_dir)
+            self.assertEqual(target_path1, target_path2)
+            self.assertEqual(first_lib_time, os.path.getmtime(lib_path))
+
+    def test_mod_cache_concurrent(self):
+        path = os.path.dirname(os.path.abspath(__file__))
+        source_path = os.path.join(path, "..", "commons/mods/combe2018")
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            queue = multiprocessing.Queue()
+            processes = [multiprocessing.Process(target=compile_cached,
+                                                 args=(source_path, cache_dir, queue))
+                         for _ in range(3)]
+            for p in processes:
+                p.start()
+            for p in processes:
+                p.join()
+
+            target_paths = [queue.get() for _ in processes]
+            self.assertEqual(1, len(set(target_paths)))
+            self.assertTrue(CompileMOD().is_compiled(target_paths[0]))
+            # no temporary folders and lock files left, only the compiled folder
+            self.assertEqual(1, len(os.listdir(cache_dir)))
+
+    def test_mod_incremental(self):
+        path = os.path.dirname(os.path.abspath(__file__))
+        source_path = os.path.join(path, "..", "commons/mods/combe2018")
+
+        with tempfile.TemporaryDirectory() as target_path:
+            comp = CompileMOD()
+            comp.compile(source_paths=source_path, target_path=target_path, jobs=2,
+                         incremental=True)
+            obj_path = os.path.join(target_path, "x86_64", "cad.o")
+            first_obj_time = os.path.getmtime(obj_path)
+
+            time.sleep(1)
+
+            # unchanged MOD files are not compiled again
+            comp.compile(source_paths=source_path, target_path=target_path, jobs=2,
+                         incremental=True)
+            self.assertTrue(comp.is_compiled(target_path))
+            self.assertEqual(first_obj_time, os.path.getmtime(obj_path))
+            self.assertNotIn(".make_jobs", os.listdir(target_path))
+
+    def test_mod_incremental_older_source(self):
+        path = os.path.dirname(os.path.abspath(__file__))
+        mods_path = os.path.join(path, "..", "commons/mods/combe2018")
+
+        with tempfile.TemporaryDirectory() as source_path, \
+                tempfile.TemporaryDirectory() as target_path:
+            for filename in os.listdir(mods_path):
+                if filename.endswith(".mod"):
+                    shutil.copy(os.path.join(mods_path, filename), source_path)
+            comp = CompileMOD()
+            comp.compile(source_paths=source_path, target_path=target_path, incremental=True)
+            obj_path = os.path.join(target_path, "x86_64", "cad.o")
+            first_obj_time = os.path.getmtime(obj_path)
+
+            # changed MOD file older than the compiled one (eg. after git checkout)
+            mod_path = os.path.join(source_path, "cad.mod")
+            with open(mod_path, "a") as f:
+                f.write("\n: changed\n")
+            os.utime(mod_path, (0, 0))
+
+            comp.compile(source_paths=source_path, target_path=target_path, incremental=True)
+            self.assertNotEqual(first_obj_time, os.path.getmtime(obj_path))
+
+    def test_shared_lock(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "mods0")
+            # the shared lock is taken on the lock file, so the exclusive lock must wait for it
+            with file_lock(path, shared=True):
+                self.assertTrue(os.path.isfile("%s.lock" % path))
+
+    def test_mod_hash(self):
+        path = os.path.dirname(os.path.abspath(__file__))
+        source_path1 = os.path.join(path, "..", "commons/mods/combe2018")
+        source_path2 = os.path.join(path, "..", "commons/mods/hay2011")
+
+        hash1 = CompileMOD().get_hash(source_path1)
+        self.assertEqual(hash1, CompileMOD().get_hash(source_path1))
+        self.assertNotEqual(hash1, CompileMOD().get_hash(source_path2))
+        self.assertNotEqual(hash1, CompileMOD().get_hash([source_path1, source_path2]))
+        self.assertNotEqual(hash1, CompileMOD(flags="-loadflags -lm").get_hash(source_path1))
+
 
 
 if __name__ == '__main__':
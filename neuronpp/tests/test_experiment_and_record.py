@@ -11,6 +11,12 @@ from neuronpp.utils.experiment import Experiment
 path = os.path.dirname(os.path.abspath(__file__))
 
 
+def trapezoidal_mean(time, values):
+    if time.size == 1:
+        return values[0]
+    return np.sum((values[1:] + values[:-1]) / 2 * np.diff(time)) / (time[-1] - time[0])
+
+
 class TestExperimentAndRecord(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -34,6 +40,10 @@ class TestExperimentAndRecord(unittest.TestCase):
 
         # Prepare plots
         cls.rec = Record([soma(0.5), dend(0.5)], variables='v')
+        ring_rec = Record(soma(0.5), variables='v', max_samples=500)
+        fixed_rec = Record(soma(0.5), variables='v', dt_record=1)
+        max_rec = Record(soma(0.5), variables='v', dt_record=1, decimation="max")
+        mean_rec = Record(soma(0.5), variables='v', dt_record=1, decimation="mean")
 
         # Run
         sim = Simulation(init_v=-70, warmup=20, with_neuron_gui=False, constant_timestep=True)
@@ -42,11 +52,21 @@ class TestExperimentAndRecord(unittest.TestCase):
         # test access to numpy array by default variable name (first selected)
         cls.v_soma = cls.rec.as_numpy(segment_name=soma(.5).name)
         cls.v_apic = cls.rec.as_numpy(variable='v', segment_name=dend(.5).name)
+        cls.v_all = cls.rec.as_numpy()
+        cls.v_soma_ring = ring_rec.as_numpy(segment_name=soma(.5).name)
+        cls.ring_vec_size = ring_rec.time.size()
+        cls.v_soma_fixed = fixed_rec.as_numpy(segment_name=soma(.5).name)
+        cls.v_soma_max = max_rec.as_numpy(segment_name=soma(.5).name)
+        cls.v_soma_mean = mean_rec.as_numpy(segment_name=soma(.5).name)
 
         syn.remove_immediate_from_neuron()
         soma.remove_immediate_from_neuron()
         dend.remove_immediate_from_neuron()
         cls.rec.remove_immediate_from_neuron()
+        ring_rec.remove_immediate_from_neuron()
+        fixed_rec.remove_immediate_from_neuron()
+        max_rec.remove_immediate_from_neuron()
+        mean_rec.remove_immediate_from_neuron()
         experiment.remove_immediate_from_neuron()
         cell.remove_immediate_from_neuron()
         sim.remove_immediate_from_neuron()
@@ -59,6 +79,117 @@ class TestExperimentAndRecord(unittest.TestCase):
     def test_record_size(self):
         self.assertEqual(4011, self.v_soma.size)
 
+    def test_record_2d(self):
+        self.assertEqual((2, 4011), self.v_all.shape)
+        self.assertTrue(np.array_equal(self.v_soma.records, self.v_all.records[0]))
+        self.assertTrue(np.array_equal(self.v_apic.records, self.v_all.records[1]))
+
+    def test_record_shares_time(self):
+        # time is copied once per run, not on each as_numpy() call
+        self.assertIs(self.v_soma.time, self.v_all.time)
+        self.assertFalse(self.v_all.time.flags.writeable)
+
+    def test_record_2d_by_time(self):
+        rec_filtered, time_filtered = self.v_all.get_records_by_time(from_ms=50, to_ms=80,
+                                                                     with_time_vector=True)
+        rec_soma = self.v_soma.get_records_by_time(from_ms=50, to_ms=80)
+        self.assertEqual((2, time_filtered.size), rec_filtered.shape)
+        self.assertTrue(np.array_equal(rec_soma, rec_filtered[0]))
+
+    def test_ring_buffer_record(self):
+        self.assertEqual(500, self.v_soma_ring.size)
+        self.assertLess(self.ring_vec_size, 1000)
+        self.assertTrue(np.array_equal(self.v_soma.records[-500:], self.v_soma_ring.records))
+        self.assertTrue(np.array_equal(self.v_soma.time[-500:], self.v_soma_ring.time))
+
+    def test_ring_buffer_wrong_size(self):
+        with self.assertRaises(ValueError):
+            Record([], max_samples=0)
+
+    def test_fixed_interval_record(self):
+        self.assertEqual(121, self.v_soma_fixed.size)
+        self.assertTrue(np.allclose(1, np.diff(self.v_soma_fixed.time)))
+
+        # warmup (first 20 ms) is computed with dt=2 ms
+        after_warmup = self.v_soma_fixed.time >= 20
+        indices = np.searchsorted(self.v_soma.time, self.v_soma_fixed.time[after_warmup] - 1e-6)
+        self.assertTrue(np.allclose(self.v_soma.records[indices],
+                                    self.v_soma_fixed.records[after_warmup]))
+
+    def test_decimated_record(self):
+        # 10 windows of warmup (dt=2 ms) and 100 windows of the run
+        self.assertEqual(110, self.v_soma_max.size)
+        self.assertAlmostEqual(119, self.v_soma_max.time[-1])
+        self.assertTrue(np.array_equal(self.v_soma_max.time, self.v_soma_mean.time))
+
+        windows = np.floor(self.v_soma.time + 1e-6)
+        for t, v_max, v_mean in zip(self.v_soma_max.time, self.v_soma_max.records,
+                                    self.v_soma_mean.records):
+            v = self.v_soma.records[windows == t]
+            self.assertEqual(np.max(v), v_max)
+            self.assertAlmostEqual(trapezoidal_mean(self.v_soma.time[windows == t], v), v_mean)
+
+    def test_decimated_mean_variable_timestep(self):
+        cell = Cell(name="cell")
+        soma = cell.add_sec("soma", diam=10, l=10, nseg=1)
+        cell.insert("hh")
+        iclamp = h.IClamp(soma.hoc(0.5))
+        iclamp.delay, iclamp.dur, iclamp.amp = 2, 10, 0.3
+        rec = Record(soma(0.5), variables='v')
+        mean_rec = Record(soma(0.5), variables='v', dt_record=1, decimation="mean")
+
+        sim = Simulation(init_v=-65, warmup=0, constant_timestep=False)
+        sim.run(runtime=20)
+        v_mean = mean_rec.as_numpy()
+        v = rec.as_numpy()
+        windows = np.floor(v.time + 1e-6)
+        # steps are uneven, so the mean is weighted by their duration
+        self.assertGreater(np.ptp(np.diff(v.time)), 0.01)
+        for t, value in zip(v_mean.time, v_mean.records):
+            in_window = windows == t
+            self.assertAlmostEqual(trapezoidal_mean(v.time[in_window], v.records[in_window]),
+                                   value)
+
+        iclamp = None
+        rec.remove_immediate_from_neuron()
+        mean_rec.remove_immediate_from_neuron()
+        sim.remove_immediate_from_neuron()
+        soma.remove_immediate_from_neuron()
+        cell.remove_immediate_from_neuron()
+
+    def test_decimated_record_pending_window(self):
+        cell = Cell(name="cell")
+        soma = cell.add_sec("soma", diam=10, l=10, nseg=1)
+        cell.insert("hh")
+        rec = Record(soma(0.5), variables='v')
+        max_rec = Record(soma(0.5), variables='v', dt_record=1, decimation="max")
+
+        sim = Simulation(init_v=-65, warmup=0, constant_timestep=True)
+        sim.run(runtime=10.5)
+        # the last window of the run is incomplete, but it is returned
+        v_max = max_rec.as_numpy()
+        self.assertEqual(11, v_max.size)
+        v = rec.as_numpy()
+        self.assertEqual(np.max(v.records[v.time >= 10 - 1e-6]), v_max.records[-1])
+
+        # the next run completes the pending window, so its value is replaced
+        sim.run(runtime=9.5)
+        v_max = max_rec.as_numpy()
+        self.assertEqual(20, v_max.size)
+        v = rec.as_numpy()
+        windows = np.floor(v.time + 1e-6)
+        self.assertEqual(np.max(v.records[windows == 10]), v_max.records[10])
+
+        rec.remove_immediate_from_neuron()
+        max_rec.remove_immediate_from_neuron()
+        sim.remove_immediate_from_neuron()
+        soma.remove_immediate_from_neuron()
+        cell.remove_immediate_from_neuron()
+
+    def test_decimation_without_dt_record(self):
+        with self.assertRaises(ValueError):
+            Record([], decimation="max")
+
     def test_record_to_time(self):
         rec_filtered = self.v_soma.get_records_to_time(ms=50)
         to_time = [(t, r) for t, r in zip(self.v_soma.time, self.v_soma.records) if t < 50]
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+import unittest
+
+HEAVY_MODULES = ["matplotlib", "pandas", "pyvis", "pynput", "Xlib", "scipy", "distutils"]
+
+
+def run_python(code):
+    return subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+
+class TestLazyImports(unittest.TestCase):
+    """
+    Plotting, graph, keyboard listener and scipy dependencies should be imported only when
+    those features are used, so a headless worker which builds cells and runs a simulation
+    doesn't pay their import time.
+    """
+
+    def assert_not_imported(self, imports):
+        code = "import sys\n%s\nprint('imported:' + ','.join(m for m in %s if m in sys.modules))" \
+               % (imports, HEAVY_MODULES)
+        imported = run_python(code).stdout.strip().splitlines()[-1]
+        self.assertEqual("imported:", imported)
+
+    def test_cell(self):
+        self.assert_not_imported("from neuronpp.cells.cell import Cell")
+
+    def test_population(self):
+        self.assert_not_imported("from neuronpp.core.populations.population import Population")
+
+    def test_simulation_and_record(self):
+        self.assert_not_imported("from neuronpp.utils.simulation import Simulation\n"
+                                 "from neuronpp.utils.record import Record")
+
+    def test_utils(self):
+        self.assert_not_imported("import neuronpp.utils.utils\n"
+                                 "import neuronpp.utils.synaptic_debugger")
+
+
+if __name__ == '__main__':
+    unittest.main()
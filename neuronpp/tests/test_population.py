@@ -6,8 +6,14 @@ from neuron import h
 
 from neuronpp.cells.cell import Cell
 from neuronpp.core.cells.netstim_cell import NetStimCell
-from neuronpp.core.dists.distributions import Dist, NormalTruncatedDist, NormalDist
+from neuronpp.core.dists.distributions import Dist, NormalTruncatedDist, NormalDist, \
+    UniformTruncatedDist, CutoffConnectionProba, GaussianConnectionProba, \
+    ExponentialConnectionProba, DistanceConnectionProba
 from neuronpp.core.populations.population import Population
+from neuronpp.core.populations.params.conn_params import ConnParams
+from neuronpp.core.populations.connectivity import Connectivity
+from neuronpp.utils.record import Record
+from neuronpp.utils.simulation import Simulation
 
 path = os.path.dirname(os.path.abspath(__file__))
 
@@ -104,6 +110,139 @@ class TestStandardPopulation(unittest.TestCase):
         self.assertEqual(0.02, np.round(std, 2))
 
 
+class TestAddClones(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        morpho_path = os.path.join(path, "..", "commons/morphologies/swc/my.swc")
+        cls.template = Cell(name="cell")
+        cls.template.load_morpho(filepath=morpho_path)
+        cls.template.insert("pas")
+        cls.template.insert("hh")
+        for i, seg in enumerate(cls.template.filter_secs("dend").hoc):
+            seg.gnabar_hh = 0.1 + 0.01 * i
+
+        cls.pop = Population("pop_0")
+        cls.pop.add_clones(template=cls.template, num=3)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pop.remove_immediate_from_neuron()
+        cls.template.remove_immediate_from_neuron()
+
+        l = len(list(h.allsec()))
+        if len(list(h.allsec())) != 0:
+            raise RuntimeError("Not all section have been removed after teardown. "
+                               "Sections left: %s" % l)
+
+    def test_names(self):
+        self.assertEqual(["pop_0[cell][0]", "pop_0[cell][1]", "pop_0[cell][2]"],
+                         [c.name for c in self.pop.cells])
+        for cell in self.pop.cells:
+            self.assertEqual(self.pop, cell.population)
+
+    def test_mechanisms(self):
+        expected = [seg.gnabar_hh for seg in self.template.filter_secs("dend").hoc]
+        for cell in self.pop.cells:
+            self.assertEqual(len(self.template.secs), len(cell.secs))
+            self.assertEqual(expected, [seg.gnabar_hh for seg in cell.filter_secs("dend").hoc])
+            self.assertEqual(self.template.filter_secs("dend").hoc.L,
+                             cell.filter_secs("dend").hoc.L)
+
+    def test_template_not_in_population(self):
+        self.assertNotIn(self.template, self.pop.cells)
+
+
+class TestRecordSpikes(unittest.TestCase):
+    def setUp(self):
+        def cell_template():
+            cell = Cell(name="cell")
+            cell.add_sec("soma", diam=10, l=10, nseg=1)
+            cell.insert("hh")
+            return cell
+
+        self.pop = Population("pop_0")
+        self.pop.add_cells(num=4, cell_function=cell_template)
+
+        # cell 0 doesn't spike, cell i spikes at about i+1 ms
+        self.iclamps = []
+        for i, cell in enumerate(self.pop.cells):
+            iclamp = h.IClamp(cell.filter_secs("soma").hoc(0.5))
+            iclamp.delay = i
+            iclamp.dur = 30
+            iclamp.amp = 0.3 if i > 0 else 0
+            self.iclamps.append(iclamp)
+
+    def tearDown(self):
+        self.iclamps = None
+        self.pop.remove_immediate_from_neuron()
+
+        l = len(list(h.allsec()))
+        if len(list(h.allsec())) != 0:
+            raise RuntimeError("Not all section have been removed after teardown. "
+                               "Sections left: %s" % l)
+
+    def _run(self):
+        sim = Simulation(init_v=-65, warmup=0)
+        sim.run(runtime=25)
+        sim.remove_immediate_from_neuron()
+
+    def test_record_spikes(self):
+        spike_rec = self.pop.record_spikes(threshold=0)
+        somas = [cell.filter_secs("soma") for cell in self.pop.cells]
+        v_rec = Record([soma(0.5) for soma in somas], variables="v")
+        self._run()
+
+        time, cell_ids = spike_rec.as_numpy()
+        self.assertEqual([1, 2, 3], cell_ids.tolist())
+        self.assertTrue(np.all(np.diff(time) > 0))
+
+        # expected spikes are upward crossings of the threshold by the soma v
+        v = v_rec.as_numpy()
+        crossings = (v.records[:, :-1] < 0) & (v.records[:, 1:] >= 0)
+        spikes = spike_rec.spikes_per_cell()
+        self.assertEqual(4, len(spikes))
+        for cell_spikes, cell_crossings in zip(spikes, crossings):
+            expected = v.time[1:][cell_crossings]
+            self.assertEqual(expected.size, cell_spikes.size)
+            self.assertTrue(np.allclose(expected, cell_spikes, atol=h.dt))
+        v_rec.remove_immediate_from_neuron()
+
+    def test_cell_spikes_after_removal(self):
+        spike_rec = self.pop.record_spikes(threshold=0)
+        self._run()
+        expected = [c.spikes() for c in self.pop.cells]
+
+        spike_rec.remove_immediate_from_neuron()
+        self.pop.spike_rec = None
+        self._run()
+        for cell, spikes in zip(self.pop.cells, expected):
+            self.assertTrue(np.array_equal(spikes, cell.spikes()))
+
+    def test_spike_record_removal(self):
+        spike_rec = self.pop.record_spikes(threshold=0)
+        gids = spike_rec.gids.tolist()
+        time = spike_rec.time
+        spike_rec.remove_immediate_from_neuron()
+        self.pop.spike_rec = None
+        self._run()
+        # Vectors of the removed SpikeRecord are unregistered from spike detectors
+        self.assertEqual(0, time.size())
+
+        # cells reuse their gids when recorded again
+        spike_rec = self.pop.record_spikes()
+        self.assertEqual(gids, spike_rec.gids.tolist())
+
+        # gids are released by NEURON with the cells
+        pc = h.ParallelContext()
+        self.pop.remove_immediate_from_neuron()
+        self.assertFalse(any(pc.gid_exists(gid) for gid in gids))
+
+    def test_record_spikes_twice(self):
+        self.pop.record_spikes()
+        with self.assertRaises(RuntimeError):
+            self.pop.record_spikes()
+
+
 class TestConnectorAndSynAdder(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -198,6 +337,302 @@ class TestConnectorAndSynAdder(unittest.TestCase):
         self.assertEqual(10.5, np.average(exp2syn_weighs))
 
 
+class TestConnectionPlan(unittest.TestCase):
+    def setUp(self):
+        self.pop = Population("pop_plan")
+
+    def test_all_to_all_plan(self):
+        conn_params = ConnParams(rule="all", cell_connection_proba=1.0, seg_dist="uniform",
+                                 syn_num_per_cell_source=2)
+        plan = self.pop._plan_conn(source_rule="all", source_num=4, seg_nums=[3, 5, 7],
+                                   conn_params=conn_params)
+        self.assertEqual(4 * 3 * 2, len(plan))
+        for cell_i, seg_num in enumerate([3, 5, 7]):
+            seg_ids = plan.target_seg_ids[plan.target_cell_ids == cell_i]
+            self.assertTrue(np.all(seg_ids < seg_num))
+            sources = plan.source_ids[plan.target_cell_ids == cell_i]
+            self.assertEqual([0, 1, 2, 3], sorted(set(sources.tolist())))
+
+    def test_one_to_one_plan(self):
+        conn_params = ConnParams(rule="one", cell_connection_proba=1.0, seg_dist="uniform")
+        plan = self.pop._plan_conn(source_rule="one", source_num=3, seg_nums=[1, 1, 1],
+                                   conn_params=conn_params)
+        self.assertEqual([0, 1, 2], sorted(plan.source_ids.tolist()))
+        self.assertEqual([0, 1, 2], plan.target_cell_ids.tolist())
+
+    def test_all_segs_plan(self):
+        conn_params = ConnParams(rule="all", cell_connection_proba=1.0, seg_dist="all")
+        plan = self.pop._plan_conn(source_rule="all", source_num=0, seg_nums=[2, 3],
+                                   conn_params=conn_params)
+        self.assertEqual([-1] * 5, plan.source_ids.tolist())
+        self.assertEqual([0, 0, 1, 1, 1], plan.target_cell_ids.tolist())
+        self.assertEqual([0, 1, 0, 1, 2], plan.target_seg_ids.tolist())
+
+    def test_cutoff_distance_plan(self):
+        positions = np.array([[0, 0, 0], [10, 0, 0], [20, 0, 0], [100, 0, 0]])
+        conn_params = ConnParams(rule="all",
+                                 cell_connection_proba=CutoffConnectionProba(max_distance=15))
+        plan = self.pop._plan_conn(source_rule="all", source_num=4, seg_nums=[1, 1, 1, 1],
+                                   conn_params=conn_params, source_positions=positions,
+                                   target_positions=positions)
+        pairs = list(zip(plan.source_ids.tolist(), plan.target_cell_ids.tolist()))
+        self.assertEqual([(0, 0), (1, 0), (0, 1), (1, 1), (2, 1), (1, 2), (2, 2), (3, 3)],
+                         pairs)
+
+    def test_gaussian_distance_plan(self):
+        Dist.set_seed(13)
+        source_positions = np.zeros((1000, 3))
+        target_positions = np.array([[0, 0, 0], [50, 0, 0], [1000, 0, 0]])
+        conn_proba = GaussianConnectionProba(sigma=50, peak=0.8)
+        conn_params = ConnParams(rule="all", cell_connection_proba=conn_proba)
+        plan = self.pop._plan_conn(source_rule="all", source_num=1000, seg_nums=[1, 1, 1],
+                                   conn_params=conn_params, source_positions=source_positions,
+                                   target_positions=target_positions)
+        in_degrees = np.bincount(plan.target_cell_ids, minlength=3)
+        self.assertAlmostEqual(800, in_degrees[0], delta=800 * 0.1)
+        self.assertAlmostEqual(800 * np.exp(-0.5), in_degrees[1], delta=800 * np.exp(-0.5) * 0.1)
+        self.assertEqual(0, in_degrees[2])
+
+    def test_distance_proba_wrong_rule(self):
+        conn_params = ConnParams(rule="one",
+                                 cell_connection_proba=ExponentialConnectionProba(10))
+        with self.assertRaises(ValueError):
+            self.pop._plan_conn(source_rule="one", source_num=2, seg_nums=[1, 1],
+                                conn_params=conn_params, source_positions=np.zeros((2, 3)),
+                                target_positions=np.zeros((2, 3)))
+
+    def test_distance_proba_without_source(self):
+        conn_params = ConnParams(cell_connection_proba=ExponentialConnectionProba(10))
+        with self.assertRaises(ValueError):
+            self.pop._plan_conn(source_rule="all", source_num=0, seg_nums=[1, 1],
+                                conn_params=conn_params, target_positions=np.zeros((2, 3)))
+
+    def test_distance_proba_base_class(self):
+        with self.assertRaises(TypeError):
+            DistanceConnectionProba(peak=1, max_distance=10)
+
+    def test_fixed_indegree_plan(self):
+        conn_params = ConnParams(rule="fixed_indegree", conn_num=3)
+        plan = self.pop._plan_conn(source_rule="fixed_indegree", source_num=10,
+                                   seg_nums=[1] * 20, conn_params=conn_params)
+        self.assertEqual([3] * 20, np.bincount(plan.target_cell_ids).tolist())
+        for cell_i in range(20):
+            sources = plan.source_ids[plan.target_cell_ids == cell_i]
+            self.assertEqual(3, np.unique(sources).size)
+
+    def test_fixed_outdegree_plan(self):
+        conn_params = ConnParams(rule="fixed_outdegree", conn_num=4)
+        plan = self.pop._plan_conn(source_rule="fixed_outdegree", source_num=10,
+                                   seg_nums=[1] * 5, conn_params=conn_params)
+        self.assertEqual([4] * 10, np.bincount(plan.source_ids).tolist())
+        pairs = set(zip(plan.source_ids.tolist(), plan.target_cell_ids.tolist()))
+        self.assertEqual(40, len(pairs))
+
+    def test_fixed_total_plan(self):
+        conn_params = ConnParams(rule="fixed_total", conn_num=50)
+        plan = self.pop._plan_conn(source_rule="fixed_total", source_num=10,
+                                   seg_nums=[1] * 8, conn_params=conn_params)
+        pairs = set(zip(plan.source_ids.tolist(), plan.target_cell_ids.tolist()))
+        self.assertEqual(50, len(plan))
+        self.assertEqual(50, len(pairs))
+        self.assertTrue(np.all(plan.source_ids < 10))
+        self.assertTrue(np.all(plan.target_cell_ids < 8))
+
+    def test_fixed_rule_wrong_params(self):
+        with self.assertRaises(ValueError):
+            ConnParams(rule="fixed_indegree")
+        with self.assertRaises(ValueError):
+            ConnParams(rule="fixed_indegree", conn_num=2, cell_connection_proba=0.5)
+        conn_params = ConnParams(rule="fixed_indegree", conn_num=11)
+        with self.assertRaises(ValueError):
+            self.pop._plan_conn(source_rule="fixed_indegree", source_num=10, seg_nums=[1],
+                                conn_params=conn_params)
+
+    def test_wrong_rule(self):
+        conn_params = ConnParams(rule="wrong")
+        with self.assertRaises(ValueError):
+            self.pop._plan_conn(source_rule="wrong", source_num=2, seg_nums=[1, 1],
+                                conn_params=conn_params)
+
+
+class TestConnectivity(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        def cell_template():
+            cell = Cell(name="cell")
+            cell.add_sec("soma", diam=10, l=10, nseg=1)
+            cell.add_sec("dend", diam=1, l=100, nseg=5)
+            cell.connect_secs(child="dend", parent="soma")
+            return cell
+
+        Dist.set_seed(13)
+        cls.pop1 = Population("pop_0")
+        cls.pop1.add_cells(num=10, cell_function=cell_template)
+
+        cls.pop2 = Population("pop_1")
+        cls.pop2.add_cells(num=10, cell_function=cell_template)
+
+        connector = cls.pop2.connect(cell_connection_proba=0.5)
+        connector.set_source([c.filter_secs("soma")(0.5) for c in cls.pop1.cells])
+        connector.set_target([c.filter_secs("dend") for c in cls.pop2.cells])
+        connector.add_synapse("Exp2Syn").add_netcon(weight=NormalTruncatedDist(mean=0.1,
+                                                                               std=0.05))
+        connector.build()
+        cls.built = connector.connectivity
+        cls.built_syn_num = len(cls.pop2.syns)
+
+        # replay connectivity of the first connector with different weights and delays
+        replayed = cls.built.to_coo()
+        replayed.data = np.full(replayed.nnz, 0.5)
+
+        connector = cls.pop2.connect()
+        connector.set_source([c.filter_secs("soma")(0.5) for c in cls.pop1.cells])
+        connector.set_target([c.filter_secs("dend") for c in cls.pop2.cells])
+        connector.set_connectivity(replayed, delays=np.full(replayed.nnz, 3))
+        connector.add_synapse("ExpSyn").add_netcon(weight=1)
+        connector.build()
+        cls.replayed = connector.connectivity
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pop1.remove_immediate_from_neuron()
+        cls.pop2.remove_immediate_from_neuron()
+
+        l = len(list(h.allsec()))
+        if len(list(h.allsec())) != 0:
+            raise RuntimeError("Not all section have been removed after teardown. "
+                               "Sections left: %s" % l)
+
+    def test_realized_connectivity(self):
+        built_syns = self.pop2.syns[:self.built_syn_num]
+        self.assertEqual((10, 10), self.built.shape)
+        self.assertEqual(len(built_syns), len(self.built))
+        self.assertEqual(2, len(self.pop2.connectivities))
+
+        coo = self.built.to_coo()
+        weights = sorted(s.netcons[0].get_weight() for s in built_syns)
+        self.assertEqual(len(built_syns), coo.nnz)
+        self.assertTrue(np.allclose(weights, sorted(coo.data)))
+
+    def test_realized_targets(self):
+        built_syns = self.pop2.syns[:self.built_syn_num]
+        for syn, source_i, cell_i in zip(built_syns, self.built.source_ids,
+                                         self.built.target_cell_ids):
+            self.assertEqual(self.pop1.cells[source_i], syn.sources[0].parent.cell)
+            self.assertEqual(self.pop2.cells[cell_i], syn.parent.parent.cell)
+
+    def test_replayed_connectivity(self):
+        replayed_syns = self.pop2.syns[self.built_syn_num:]
+        self.assertEqual(len(self.built), len(replayed_syns))
+        self.assertEqual(sorted(zip(self.built.source_ids.tolist(),
+                                    self.built.target_cell_ids.tolist())),
+                         sorted(zip(self.replayed.source_ids.tolist(),
+                                    self.replayed.target_cell_ids.tolist())))
+        for syn in replayed_syns:
+            self.assertEqual(0.5, syn.netcons[0].get_weight())
+            self.assertEqual(3, syn.netcons[0].hoc.delay)
+
+    def test_wrong_connectivity_index(self):
+        connectivity = Connectivity(source_ids=[0], target_cell_ids=[0])
+        with self.assertRaises(IndexError):
+            self.pop2._prepare_connectivity(connectivity, source_num=0, seg_nums=[1],
+                                            seg_dist="uniform")
+        connectivity = Connectivity(source_ids=[0], target_cell_ids=[1])
+        with self.assertRaises(IndexError):
+            self.pop2._prepare_connectivity(connectivity, source_num=1, seg_nums=[1],
+                                            seg_dist="uniform")
+
+
+class TestPartitionedBuild(unittest.TestCase):
+    @staticmethod
+    def cell_template():
+        cell = Cell(name="cell")
+        cell.add_sec("soma", diam=10, l=10, nseg=1)
+        cell.add_sec("dend", diam=1, l=100, nseg=5)
+        cell.connect_secs(child="dend", parent="soma")
+        return cell
+
+    def build(self, target_ids, seed):
+        Dist.set_seed(seed)
+        pop1 = Population("pop_0")
+        pop1.add_cells(num=20, cell_function=self.cell_template)
+        pop2 = Population("pop_1")
+        pop2.add_cells(num=20, cell_function=self.cell_template)
+
+        connector = pop2.connect(cell_connection_proba=0.5,
+                                 syn_num_per_cell_source=UniformTruncatedDist(low=0, high=3))
+        connector.set_source([c.filter_secs("soma")(0.5) for c in pop1.cells])
+        connector.set_target([pop2.cells[i].filter_secs("dend") for i in target_ids])
+        connector.add_synapse("ExpSyn").add_netcon(weight=NormalTruncatedDist(mean=0.1, std=0.05))
+        connector.build()
+
+        result = [(syn.sources[0].parent.cell.name, syn.parent.parent.cell.name,
+                   syn.parent.x, syn.netcons[0].get_weight()) for syn in pop2.syns]
+        connector = None
+        pop1.remove_immediate_from_neuron()
+        pop2.remove_immediate_from_neuron()
+        return result
+
+    def test_partitioned_build(self):
+        serial = self.build(target_ids=range(20), seed=13)
+        part1 = self.build(target_ids=range(10, 20), seed=13)
+        part2 = self.build(target_ids=range(10), seed=13)
+        self.assertEqual(sorted(serial), sorted(part1 + part2))
+
+    def test_different_seed(self):
+        result1 = self.build(target_ids=range(5), seed=13)
+        result2 = self.build(target_ids=range(5), seed=14)
+        self.assertNotEqual(result1, result2)
+
+
+class TestSpatialConnection(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        def cell_template():
+            cell = Cell(name="cell")
+            cell.add_sec("soma", diam=10, l=10, nseg=1)
+            cell.add_sec("dend", diam=1, l=100, nseg=5)
+            cell.connect_secs(child="dend", parent="soma")
+            return cell
+
+        Dist.set_seed(13)
+        cls.pop1 = Population("pop_0")
+        cls.pop1.add_cells(num=10, cell_function=cell_template)
+        cls.pop2 = Population("pop_1")
+        cls.pop2.add_cells(num=10, cell_function=cell_template)
+        for i, (c1, c2) in enumerate(zip(cls.pop1.cells, cls.pop2.cells)):
+            c1.set_cell_position(x=i * 100, y=0, z=0)
+            c2.set_cell_position(x=i * 100, y=0, z=50)
+
+        connector = cls.pop2.connect(cell_connection_proba=CutoffConnectionProba(max_distance=120))
+        connector.set_source([c.filter_secs("soma")(0.5) for c in cls.pop1.cells])
+        connector.set_target([c.filter_secs("dend") for c in cls.pop2.cells])
+        connector.add_synapse("ExpSyn").add_netcon()
+        connector.build()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pop1.remove_immediate_from_neuron()
+        cls.pop2.remove_immediate_from_neuron()
+
+        l = len(list(h.allsec()))
+        if len(list(h.allsec())) != 0:
+            raise RuntimeError("Not all section have been removed after teardown. "
+                               "Sections left: %s" % l)
+
+    def test_seg_position(self):
+        soma1 = self.pop1.cells[3].filter_secs("soma")(0.5).position
+        soma2 = self.pop2.cells[3].filter_secs("soma")(0.5).position
+        self.assertTrue(np.allclose([0, 0, 50], soma2 - soma1))
+
+    def test_connected_neighbours(self):
+        pairs = sorted((syn.sources[0].parent.cell.name, syn.parent.parent.cell.name)
+                       for syn in self.pop2.syns)
+        expected = sorted((self.pop1.cells[s].name, self.pop2.cells[t].name)
+                          for t in range(10) for s in range(10) if abs(s - t) <= 1)
+        self.assertEqual(expected, pairs)
+
+
 class TestNamingConvention(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
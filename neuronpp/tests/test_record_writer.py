@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+import importlib.util
+
+import numpy as np
+from neuron import h
+
+from neuronpp.cells.cell import Cell
+from neuronpp.utils.record import Record
+from neuronpp.utils.record_writer import RecordWriter
+from neuronpp.utils.simulation import Simulation
+
+HAS_H5PY = importlib.util.find_spec("h5py") is not None
+HAS_ZARR = importlib.util.find_spec("zarr") is not None
+
+
+class TestRecordWriter(unittest.TestCase):
+    def setUp(self):
+        self.cell = Cell(name="cell")
+        self.soma = self.cell.add_sec("soma", diam=10, l=10, nseg=1)
+        self.cell.insert("hh")
+        self.full_rec = Record(self.soma(0.5), variables="v")
+        self.rec = Record(self.soma(0.5), variables="v")
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.rec.remove_immediate_from_neuron()
+        self.full_rec.remove_immediate_from_neuron()
+        self.soma.remove_immediate_from_neuron()
+        self.cell.remove_immediate_from_neuron()
+        self.tmp_dir.cleanup()
+
+        l = len(list(h.allsec()))
+        if len(list(h.allsec())) != 0:
+            raise RuntimeError("Not all section have been removed after teardown. "
+                               "Sections left: %s" % l)
+
+    def _run(self, writer):
+        sim = Simulation(init_v=-65, warmup=0, constant_timestep=True)
+        sim.run(runtime=50, stepsize=10)
+        # vectors are cleared after each flush, 10 ms of values at most
+        self.assertLessEqual(self.rec.time.size(), 10 / h.dt + 1)
+        writer.close()
+        sim.remove_immediate_from_neuron()
+
+        expected = self.full_rec.as_numpy()
+        self.assertEqual(expected.time.size, writer.samples)
+        return expected
+
+    @unittest.skipIf(not HAS_H5PY, "h5py is not installed")
+    def test_hdf5(self):
+        import h5py
+        path = os.path.join(self.tmp_dir.name, "rec.h5")
+        writer = RecordWriter(self.rec, path, flush_every=10)
+        expected = self._run(writer)
+
+        with h5py.File(path, "r") as f:
+            self.assertTrue(np.array_equal(expected.time, f["time"][:]))
+            self.assertTrue(np.array_equal(expected.records, f["v"][self.soma(0.5).name][:]))
+
+    @unittest.skipIf(not HAS_ZARR, "zarr is not installed")
+    def test_zarr(self):
+        import zarr
+        path = os.path.join(self.tmp_dir.name, "rec.zarr")
+        writer = RecordWriter(self.rec, path, flush_every=10)
+        self.assertEqual("zarr", writer.backend)
+        expected = self._run(writer)
+
+        group = zarr.open_group(path, mode="r")
+        self.assertTrue(np.array_equal(expected.time, group["time"][:]))
+        self.assertTrue(np.array_equal(expected.records, group["v"][self.soma(0.5).name][:]))
+
+    def test_wrong_params(self):
+        path = os.path.join(self.tmp_dir.name, "rec.h5")
+        with self.assertRaises(ValueError):
+            RecordWriter(self.rec, path, backend="csv")
+        with self.assertRaises(ValueError):
+            RecordWriter(self.rec, path, flush_every=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -115,6 +115,29 @@ class TestSection(unittest.TestCase):
         hh_soma_mech = soma(0.5).get_mechanism("hh")
         self.assertTrue(isinstance(hh_soma_mech, Mechanism))
 
+    def test_wrappers_are_reused(self):
+        soma = self.cell.add_sec(name="soma", l=10, nseg=3)
+        dend = self.cell.add_sec(name="dend", l=100, nseg=5)
+        self.cell.connect_secs(child=dend, parent=soma)
+
+        self.assertIs(soma.segs[1], soma.segs[1])
+        self.assertIs(soma.segs[2], soma(0.5))
+        self.assertEqual(0.3, soma(0.3).x)
+        self.assertIs(dend.parent, soma)
+        self.assertIs(soma.children[0], dend)
+
+        seg = soma.segs[1]
+        soma.hoc.nseg = 5
+        self.assertEqual(7, len(soma.segs))
+        self.assertIsNot(seg, soma.segs[1])
+        self.assertEqual(0.1, soma.segs[1].x)
+
+    def test_wrappers_without_dict(self):
+        soma = self.cell.add_sec(name="soma", l=10, nseg=3)
+        self.assertFalse(hasattr(soma, "__dict__"))
+        self.assertFalse(hasattr(soma(0.5), "__dict__"))
+        self.assertEqual("Cell[cell].soma(0.5)", soma(0.5).name)
+
 
 if __name__ == '__main__':
     unittest.main()
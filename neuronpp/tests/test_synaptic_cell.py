@@ -5,12 +5,17 @@ import numpy as np
 from neuron import h
 
 from neuronpp.core.cells.synaptic_cell import SynapticCell
-from neuronpp.core.dists.distributions import UniformDist
+from neuronpp.core.dists import random_streams
+from neuronpp.core.dists.distributions import Dist, UniformDist
 
 
 class TestAddSynapsesRandomUniformByLenght(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
+        cls.RAND_SEED = 30
+        # set random seed before creating the cell, since the cell's random stream depends on it
+        Dist.set_seed(cls.RAND_SEED)
+
         cls.cell = SynapticCell(name="cell")
         soma = cls.cell.add_sec("soma", nseg=1000)
         apic1 = cls.cell.add_sec("apic1", nseg=1000)
@@ -21,17 +26,13 @@ class TestAddSynapsesRandomUniformByLenght(unittest.TestCase):
 
         cls.syns = []
         cls.N = 100
-        cls.RAND_SEED = 31
 
         # the location of the first synapse based on random seed
-        cls.FIRST_SYN_RAND_NUM = 0.28605382166051563
-        cls.LAST_SYN_RAND_NUM = 0.7714921151583348
+        cls.FIRST_SYN_RAND_NUM = 0.09910794676014689
+        cls.LAST_SYN_RAND_NUM = 0.9267850058166848
 
         cls.secs_max_len = int(sum([s.hoc.L for s in [soma, apic1, apic2]]))
 
-        # set random seed
-        np.random.seed(cls.RAND_SEED)
-
         secs = [soma, apic1, apic2]
         syns = cls.cell.add_random_uniform_synapses(source=None, secs=secs,
                                                     mod_name="Exp2Syn", number=cls.N,
@@ -53,8 +54,9 @@ class TestAddSynapsesRandomUniformByLenght(unittest.TestCase):
         np.random.seed(None)
 
     def test_rand_seed_for_secs(self):
-        np.random.seed(self.RAND_SEED)
-        rands = np.random.rand(self.N)
+        # locations are drawn from the first stream of the cell
+        rng = random_streams.get_stream(random_streams.CELL_STREAM, *self.cell._stream_key, 0)
+        rands = rng.random(self.N)
         self.assertEqual(self.FIRST_SYN_RAND_NUM, rands[0])
         self.assertEqual(self.LAST_SYN_RAND_NUM, rands[-1])
 
@@ -248,6 +250,10 @@ class TestAddSynapsesRandomUniformBySec(unittest.TestCase):
 class TestAddRandomCentroidNormalDistSynapses(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
+        cls.RAND_SEED = 31
+        # set random seed before creating the cell, since the cell's random stream depends on it
+        Dist.set_seed(cls.RAND_SEED)
+
         cls.cell = SynapticCell(name="cell")
         soma = cls.cell.add_sec("soma", nseg=1000, l=10, diam=10)
         apic1 = cls.cell.add_sec("apic1", nseg=1000, l=50, diam=2)
@@ -266,13 +272,9 @@ class TestAddRandomCentroidNormalDistSynapses(unittest.TestCase):
 
         cls.syns = []
         cls.N = 100
-        cls.RAND_SEED = 31
 
         cls.secs_max_len = int(sum([s.hoc.L for s in [soma, apic1, apic2]]))
 
-        # set random seed
-        np.random.seed(cls.RAND_SEED)
-
         secs = [soma, apic1, apic2]
         dist = UniformDist(low=1, high=2)
         syns = cls.cell.add_random_centroid_normal_dist_synapses(source=None, secs=secs,
@@ -304,13 +306,14 @@ class TestAddRandomCentroidNormalDistSynapses(unittest.TestCase):
         distribution is truncated to only positive values (absolute) and between min-max
         distance from the centroid of all segments
         """
-        np.random.seed(self.RAND_SEED)
+        # distances are drawn from the first stream of the cell
+        rng = random_streams.get_stream(random_streams.CELL_STREAM, *self.cell._stream_key, 0)
 
         dists_to_centroid = [h.distance(self.centroid.hoc, s.parent.hoc) for s in self.syns]
         mean = np.mean(dists_to_centroid)
         std = np.std(dists_to_centroid)
 
-        norm = np.abs(np.random.normal(loc=0, scale=self.std, size=self.N * 100))
+        norm = np.abs(rng.normal(loc=0, scale=self.std, size=self.N * 100))
 
         segs = [seg for sec in self.cell.secs for seg in sec.segs if seg.area > 0]
         dists_seg_ids = []
@@ -323,5 +326,126 @@ class TestAddRandomCentroidNormalDistSynapses(unittest.TestCase):
         norm_std = np.std(normal_locs)
         print("a")
 
-        self.assertEqual(round(norm_mean, 3), round(mean, 3))
-        self.assertEqual(round(norm_std, 3), round(std, 3))
+        # synapses are placed on the nearest segment, so distances may differ by a fraction of
+        # the segment length (0.05 um)
+        self.assertAlmostEqual(norm_mean, mean, places=2)
+        self.assertAlmostEqual(norm_std, std, places=2)
+
+
+class TestAddSynapsesBulk(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cell = SynapticCell(name="cell")
+        cls.cell.add_sec("soma", nseg=1, l=10, diam=10)
+        dend = cls.cell.add_sec("dend", nseg=10, l=100, diam=1)
+        cls.cell.connect_secs(child="dend", parent="soma")
+
+        cls.N = 50
+        cls.segs = [dend(0.05 + (i % 10) / 10) for i in range(cls.N)]
+        cls.weights = np.linspace(0.1, 1, cls.N)
+        cls.syns = cls.cell.add_synapses_bulk(segs=cls.segs, mod_name="Exp2Syn", sources=None,
+                                              weights=cls.weights,
+                                              delays=UniformDist(low=1, high=2), thresholds=5,
+                                              tag="bulk", tau2=np.full(cls.N, 3.0))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.segs = None
+        for sy in cls.syns:
+            sy.remove_immediate_from_neuron()
+        cls.cell.remove_immediate_from_neuron()
+
+        l = len(list(h.allsec()))
+        if len(list(h.allsec())) != 0:
+            raise RuntimeError("Not all section have been removed after teardown. "
+                               "Sections left: %s" % l)
+
+    def test_syns_len(self):
+        self.assertEqual(self.N, len(self.syns))
+        self.assertEqual(["bulk"] * self.N, [s.tag for s in self.syns])
+
+    def test_locations(self):
+        for syn, seg in zip(self.syns, self.segs):
+            self.assertAlmostEqual(seg.hoc.x, syn.parent.hoc.x)
+
+    def test_netcon_values(self):
+        weights = [s.netcons[0].get_weight() for s in self.syns]
+        delays = np.array([s.netcons[0].hoc.delay for s in self.syns])
+        thresholds = [s.netcons[0].hoc.threshold for s in self.syns]
+
+        self.assertTrue(np.allclose(self.weights, weights))
+        self.assertTrue(np.all((delays >= 1) & (delays <= 2)))
+        self.assertEqual(self.N, len(set(delays)))
+        self.assertEqual([5] * self.N, thresholds)
+
+    def test_point_process_params(self):
+        for syn in self.syns:
+            self.assertEqual(3.0, syn.point_process.hoc.tau2)
+
+    def test_wrong_param(self):
+        with self.assertRaises(LookupError):
+            self.cell.add_synapses_bulk(segs=self.segs[:1], mod_name="Exp2Syn", wrong_param=1)
+
+    def test_wrong_size(self):
+        with self.assertRaises(ValueError):
+            self.cell.add_synapses_bulk(segs=self.segs, mod_name="Exp2Syn", weights=[1, 2])
+
+
+class TestSynapseTable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cell = SynapticCell(name="cell")
+        soma = cls.cell.add_sec("soma", nseg=1, l=10, diam=10)
+        dend = cls.cell.add_sec("dend", nseg=10, l=100, diam=1)
+        cls.cell.connect_secs(child="dend", parent="soma")
+
+        cls.N = 20
+        segs = [dend(0.05 + (i % 10) / 10) for i in range(cls.N)]
+        cls.cell.add_synapses_bulk(segs=segs, mod_name="ExpSyn", weights=np.linspace(0, 1, cls.N),
+                                   delays=2)
+        syn = cls.cell.add_synapse(source=None, mod_name="Exp2Syn", seg=soma(0.5),
+                                   netcon_weight=0.5, tag="exp2")
+        syn.add_netcon(source=None, weight=0.7)
+
+    @classmethod
+    def tearDownClass(cls):
+        for sy in cls.cell.syns:
+            sy.remove_immediate_from_neuron()
+        cls.cell.remove_immediate_from_neuron()
+
+        l = len(list(h.allsec()))
+        if len(list(h.allsec())) != 0:
+            raise RuntimeError("Not all section have been removed after teardown. "
+                               "Sections left: %s" % l)
+
+    def test_columns(self):
+        table = self.cell.get_synapse_table()
+        self.assertEqual(self.N + 2, len(table))
+        self.assertEqual(["ExpSyn", "Exp2Syn"], table.mod_names)
+        self.assertEqual(self.N + 2, table.mod_codes.size)
+        self.assertEqual(self.N, np.sum(table.mod_mask("ExpSyn")))
+        self.assertEqual(11, len(table.target_segs))
+        self.assertEqual([self.N, self.N], table.syn_ids[-2:].tolist())
+        self.assertTrue(np.all(table.source_ids == -1))
+        self.assertTrue(np.all(table.delays[:self.N] == 2))
+
+    def test_get_weights(self):
+        table = self.cell.get_synapse_table()
+        weights = table.get_weights()
+        self.assertTrue(np.allclose(np.linspace(0, 1, self.N), weights[:self.N]))
+        self.assertEqual([0.5, 0.7], weights[-2:].tolist())
+
+    def test_set_weights(self):
+        table = self.cell.get_synapse_table(mod_name="Exp2Syn")
+        self.assertEqual(2, len(table))
+        table.set_weights(np.array([0.1, 0.2]))
+        syn = self.cell.syns[-1]
+        self.assertEqual([0.1, 0.2], [nc.get_weight() for nc in syn.netcons])
+
+        table.set_weights(0.3)
+        self.assertEqual([0.3, 0.3], self.cell.get_synapse_table(tag="exp2").get_weights().tolist())
+
+    def test_set_weights_wrong_size(self):
+        table = self.cell.get_synapse_table()
+        with self.assertRaises(ValueError):
+            table.set_weights(np.ones(3))
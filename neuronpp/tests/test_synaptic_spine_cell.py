@@ -2,6 +2,7 @@ import unittest
 import numpy as np
 from neuron import h
 from neuronpp.core.cells.synaptic_spine_cell import SynapticSpineCell
+from neuronpp.core.dists.distributions import Dist
 
 
 class TestAddSynapsesWithSpine(unittest.TestCase):
@@ -65,6 +66,9 @@ class TestAddSynapsesWithSpine(unittest.TestCase):
 class TestAddRandomSynapsesWithSpine(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
+        # set random seed before creating the cell, since the cell's random stream depends on it
+        Dist.set_seed(31)
+
         cls.cell = SynapticSpineCell(name="cell")
         soma = cls.cell.add_sec("soma")
         apic1 = cls.cell.add_sec("apic1")
@@ -74,9 +78,6 @@ class TestAddRandomSynapsesWithSpine(unittest.TestCase):
         cls.heads = []
         cls.N = 10
 
-        # set random seed
-        np.random.seed(31)
-
         secs = [soma, apic1, apic2]
         syns, heads = cls.cell.add_random_synapses_with_spine(source=None, secs=secs,
                                                               mod_name="Exp2Syn", number=cls.N)
@@ -115,4 +116,4 @@ class TestAddRandomSynapsesWithSpine(unittest.TestCase):
         neck = self.heads[0].parent
         neck_loc = neck.parent_loc
         # the location of the first neck based on random seed
-        self.assertEqual(neck_loc, 0.858161464981547)
+        self.assertEqual(neck_loc, 0.133146029088214)
@@ -29,11 +29,11 @@ class RecordOutput:
         :param with_time_vector:
             Default False. If True it will return tuple of (records, time)
         """
-        min_arg = np.min(np.where(self.time >= ms))
+        min_arg = self._get_index(ms, side="left")
         if with_time_vector:
-            return self.records[min_arg:], self.time[min_arg:]
+            return self.records[..., min_arg:], self.time[..., min_arg:]
         else:
-            return self.records[min_arg:]
+            return self.records[..., min_arg:]
 
     def get_records_to_time(self, ms, with_time_vector=False):
         """
@@ -47,11 +47,11 @@ class RecordOutput:
         :param with_time_vector:
             Default False. If True it will return tuple of (records, time)
         """
-        max_arg = np.max(np.where(self.time <= ms))+1
+        max_arg = self._get_index(ms, side="right")
         if with_time_vector:
-            return self.records[:max_arg], self.time[:max_arg]
+            return self.records[..., :max_arg], self.time[..., :max_arg]
         else:
-            return self.records[:max_arg]
+            return self.records[..., :max_arg]
 
     def get_records_by_time(self, from_ms, to_ms, with_time_vector=False):
         """
@@ -67,12 +67,24 @@ class RecordOutput:
         :param with_time_vector:
             Default False. If True it will return tuple of (records, time)
         """
-        from_arg = np.min(np.where(self.time >= from_ms))
-        to_arg = np.max(np.where(self.time <= to_ms))+1
+        from_arg = self._get_index(from_ms, side="left")
+        to_arg = self._get_index(to_ms, side="right")
         if with_time_vector:
-            return self.records[from_arg:to_arg], self.time[from_arg:to_arg]
+            return self.records[..., from_arg:to_arg], self.time[..., from_arg:to_arg]
         else:
-            return self.records[from_arg:to_arg]
+            return self.records[..., from_arg:to_arg]
+
+    def _get_index(self, ms, side):
+        """
+        Binary search on the (monotonic) time array.
+
+        :param ms:
+            time in ms
+        :param side:
+            'left' returns the index of the first time >= ms,
+            'right' returns the index after the last time <= ms
+        """
+        return int(np.searchsorted(np.ravel(self.time), ms, side=side))
 
     @property
     def size(self):
@@ -1,17 +1,31 @@
+import filecmp
 import hashlib
+import logging
 import os
+import platform
 import shutil
+import tempfile
 import time
 from argparse import ArgumentParser
-from distutils.file_util import copy_file
+from contextlib import contextmanager
 from subprocess import PIPE, Popen, STDOUT
 
 import neuron
 import numpy as np
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+MOD_CACHE_DIR_ENV = "NEURONPP_MOD_CACHE_DIR"
+
+logger = logging.getLogger(__name__)
+
 
 class CompileMOD:
-    def __init__(self, compiled_folder_name="x86_64", mod_compile_command="nrnivmodl"):
+    def __init__(self, compiled_folder_name="x86_64", mod_compile_command="nrnivmodl", flags=""):
         """
         Compile all MOD files from the source folder to a single folder
         in the target folder.
@@ -25,43 +39,161 @@ class CompileMOD:
         :param mod_compile_command:
             MOD compile command of NEURON. By default it is 'nrnivmodl' which is Linux command'.
             You can give different command specific for your OS.
+        :param flags:
+            additional flags passed to the MOD compile command, eg. '-incflags "-I/my/include"'
         """
         self.compiled_folder_name = compiled_folder_name
         self.mod_compile_command = mod_compile_command
+        self.flags = flags
 
-    def compile(self, source_paths, target_path):
+    def compile(self, source_paths, target_path, jobs=None, incremental=False):
         """
-        Compile from source path to the target path
+        Compile from source path to the target path.
+
+        Output of the compiler is streamed line by line to the logger of this module (at INFO
+        level).
+
         :param source_paths:
             Path to the source folder.
         :param target_path:
             Path to the target folder.
+        :param jobs:
+            number of parallel jobs of make, which compiles MOD files. Default is None, which means
+            the default of the MOD compile command (nrnivmodl uses 4 jobs).
+        :param incremental:
+            if True - the target folder is not removed before compilation and only MOD files
+            which content has changed are copied, so make will compile only changed MOD files.
+            Default is False, which means the target folder is removed and all MOD files are
+            compiled.
         """
-        working_dir = os.getcwd()
         target_path = target_path.replace(self.compiled_folder_name, "")
-        shutil.rmtree(target_path, ignore_errors=True, onerror=None)
-        os.makedirs(target_path)
+        if not incremental:
+            shutil.rmtree(target_path, ignore_errors=True, onerror=None)
+        os.makedirs(target_path, exist_ok=True)
 
         if isinstance(source_paths, str):
             source_paths = source_paths.split(" ")
 
-        for s in source_paths:
-            self.copy_mods(s, target_path)
+        if incremental:
+            copied = set()
+            for s in source_paths:
+                copied.update(self.sync_mods(s, target_path))
+            # remove MOD files which are no longer in the source paths
+            for filename in os.listdir(target_path):
+                if filename.endswith(".mod") and filename not in copied:
+                    os.remove(os.path.join(target_path, filename))
+        else:
+            for s in source_paths:
+                self.copy_mods(s, target_path)
+
+        env = os.environ.copy()
+        command = ("%s %s" % (self.mod_compile_command, self.flags)).strip()
+        with tempfile.TemporaryDirectory() as bin_path:
+            if jobs is not None:
+                self._make_jobs_wrapper(bin_path, jobs)
+                env["PATH"] = "%s%s%s" % (bin_path, os.pathsep, env.get("PATH", ""))
+
+            p = Popen(command, shell=True, stdin=PIPE, stdout=PIPE, stderr=STDOUT,
+                      close_fds=True, cwd=target_path, env=env)
+            p.stdin.close()
+
+            output = []
+            for line in p.stdout:
+                line = line.decode('utf-8', errors='replace').rstrip()
+                logger.info(line)
+                output.append(line)
+            return_code = p.wait()
+        output = "\n".join(output)
+
+        logger.info('mod path: %s', target_path)
+        if return_code != 0 or "failed" in output.lower() or "error" in output.lower():
+            raise RuntimeError("MOD compilation error: %s" % output)
 
-        os.chdir(target_path)
-        p = Popen('nrnivmodl', shell=True, stdin=PIPE, stdout=PIPE, stderr=STDOUT, close_fds=True)
-        output = p.stdout.read().decode('utf-8')
+    def is_compiled(self, target_path):
+        """
+        :param target_path:
+            Path to the target folder.
+        :return:
+            True if the target folder contains compiled library of mechanisms
+        """
+        compiled_path = os.path.join(target_path, self.compiled_folder_name)
+        return os.path.isfile(os.path.join(compiled_path, "libnrnmech.so")) or \
+            os.path.isfile(os.path.join(compiled_path, ".libs", "libnrnmech.so"))
 
-        print('nrniv output:', output)
-        print('mod path:', target_path)
-        print('mod path list dir:', os.listdir(target_path))
+    def get_hash(self, source_paths):
+        """
+        Hash of the MOD sources, NEURON version, architecture, compile command and its flags.
+        The same hash means that compilation of source paths would produce the same library.
 
-        if "failed" in output.lower() or "error" in output.lower():
-            raise RuntimeError("MOD compilation error: %s" % output)
-        else:
-            print(output)
+        :param source_paths:
+            Paths to the source folders.
+        :return:
+            hex string of 16 characters
+        """
+        if isinstance(source_paths, str):
+            source_paths = source_paths.split(" ")
+
+        sha = hashlib.sha256()
+        for value in [neuron.__version__, platform.machine(), self.compiled_folder_name,
+                      self.mod_compile_command, self.flags]:
+            sha.update(str(value).encode())
+            sha.update(b"\0")
+
+        for source_path in source_paths:
+            for filename in sorted(os.listdir(source_path)):
+                filepath = os.path.join(source_path, filename)
+                if not filename.endswith(".mod") or os.path.isdir(filepath):
+                    continue
+                sha.update(filename.encode())
+                sha.update(b"\0")
+                with open(filepath, "rb") as f:
+                    sha.update(f.read())
+                sha.update(b"\0")
+        return sha.hexdigest()[:16]
+
+    def sync_mods(self, source_path, tmp_path):
+        """
+        Copy MOD files from the source path to the tmp_path, but only those which are not in the
+        tmp_path or their content is different. Copied files get the current modification time
+        (even if the source file is older than the compiled one, eg. after git checkout), so make
+        will compile only changed MOD files.
+
+        :return:
+            list of MOD file names found in the source path
+        """
+        filenames = []
+        for filename in os.listdir(source_path):
+            filepath = os.path.join(source_path, filename)
+
+            if filename == self.compiled_folder_name or os.path.isdir(filepath) or \
+                    not filename.endswith(".mod"):
+                continue
+            target_filepath = os.path.join(tmp_path, filename)
+            if not os.path.isfile(target_filepath) or \
+                    not filecmp.cmp(filepath, target_filepath, shallow=False):
+                shutil.copyfile(filepath, target_filepath)
+            filenames.append(filename)
+
+        if len(filenames) == 0:
+            raise RuntimeError("No MOD files found on path: %s" % source_path)
+        return filenames
+
+    @staticmethod
+    def _make_jobs_wrapper(bin_path, jobs):
+        """
+        nrnivmodl calls make with a fixed number of jobs (-j 4) and MAKEFLAGS can't override
+        options of the command line. So a make wrapper, which adds -j jobs at the end of the
+        command line (the last -j wins), is created in the bin_path folder, which need to be
+        added to PATH.
+        """
+        make_path = shutil.which("make")
+        if make_path is None:
+            raise RuntimeError("Can't find make command required to compile MOD files.")
 
-        os.chdir(working_dir)
+        wrapper_path = os.path.join(bin_path, "make")
+        with open(wrapper_path, "w") as f:
+            f.write('#!/bin/sh\nexec "%s" "$@" -j %s\n' % (make_path, int(jobs)))
+        os.chmod(wrapper_path, 0o755)
 
     def copy_mods(self, source_path, tmp_path):
         mods_found = 0
@@ -71,7 +203,7 @@ class CompileMOD:
             if filename == self.compiled_folder_name or os.path.isdir(filepath):
                 continue
             elif filename.endswith(".mod"):
-                copy_file(src=filepath, dst=tmp_path, update=1, preserve_times=False)
+                shutil.copyfile(filepath, os.path.join(tmp_path, filename))
                 mods_found += 1
         if mods_found == 0:
             raise RuntimeError("No MOD files found on path: %s" % source_path)
@@ -95,13 +227,24 @@ if __name__ == '__main__':
                         help="MOD compile command of NEURON. By default it is 'nrnivmodl "
                              "which is Linux command'. You can give different command specific for your OS",
                         default='nrnivmodl')
+    parser.add_argument("-j", "--jobs", help="Number of parallel jobs of make.", type=int,
+                        default=None)
+    parser.add_argument("-i", "--incremental", action="store_true",
+                        help="Compile only MOD files changed since the last compilation "
+                             "to the target folder.")
     args = parser.parse_args()
 
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     comp = CompileMOD(compiled_folder_name=args.compiled_folder_name,
                       mod_compile_command=args.mod_compile_command)
-    comp.compile(source_paths=args.sources, target_path=args.target)
+    comp.compile(source_paths=args.sources, target_path=args.target, jobs=args.jobs,
+                 incremental=args.incremental)
 
 mods_loaded = []
+# absolute paths of source MOD folders already loaded into NEURON
+mod_folders_loaded = set()
+# source MOD folders of each compiled path, which was not loaded yet
+_compiled_sources = {}
 
 
 def get_mod_compiled_target_path(compile_mods_with_random_subfolder=True):
@@ -113,7 +256,8 @@ def get_mod_compiled_target_path(compile_mods_with_random_subfolder=True):
         return os.path.join(os.getcwd(), "compiled", "mods%s" % len(mods_loaded))
 
 
-def compile_mods(mod_folders, override=True, compile_mods_with_random_subfolder=True):
+def compile_mods(mod_folders, override=True, compile_mods_with_random_subfolder=True,
+                 cache_dir=None, flags="", jobs=None, incremental=False):
     """
     Compile all MOD files from the source folder(s) and load them into NEURON.
 
@@ -126,67 +270,189 @@ def compile_mods(mod_folders, override=True, compile_mods_with_random_subfolder=
     :param override:
        If True, the function will override existing compiled MOD files in the target folder.
        If False and the target path exists, the function will skip the compilation step.
-       Default is True.
+       Default is True. It is used only with compile_mods_with_random_subfolder=False, because
+       compiled/HASH folders are always reused.
     :param compile_mods_with_random_subfolder:
-        if True it will create a random subfolder in the target folder as compiled/random_string/modsNUM.
+        if True MODs are compiled to the subfolder compiled/HASH (see cache_dir), so concurrent
+        processes compiling the same MODs share a single compilation.
         if False it will create folder compiled/modsNUM
+    :param cache_dir:
+        Path to the folder of compiled MODs cache. Default is None, which means the path from
+        NEURONPP_MOD_CACHE_DIR environment variable will be used (if set) or the compiled folder
+        if compile_mods_with_random_subfolder is True.
+
+        If the cache is used - MODs are compiled to cache_dir/HASH, where HASH depends on MOD
+        sources, NEURON version and compile flags. If the folder already contains compiled
+        library it is reused without compilation (override and compile_mods_with_random_subfolder
+        params are ignored), so all processes and scripts share a single compilation.
+    :param flags:
+        additional flags passed to the MOD compile command
+    :param jobs:
+        number of parallel jobs of make. Default is None, which means the default of nrnivmodl
+    :param incremental:
+        if True and the target folder exists - only changed MOD files will be compiled.
+        It makes sense only with compile_mods_with_random_subfolder=False.
+    :return:
+        path to the compiled MODs or None if MODs from all folders are already loaded into NEURON
     """
 
     if isinstance(mod_folders, str):
         mod_folders = mod_folders.split(" ")
 
-    mod_folders = [m for m in mod_folders if m not in mods_loaded]
+    # MODs can be loaded into NEURON only once
+    mod_folders = [m for m in mod_folders if os.path.abspath(m) not in mod_folders_loaded]
 
     if len(mod_folders) == 0:
         return
 
-    targ_path = get_mod_compiled_target_path(compile_mods_with_random_subfolder=compile_mods_with_random_subfolder)
+    if cache_dir is None:
+        cache_dir = os.environ.get(MOD_CACHE_DIR_ENV)
+    if not cache_dir and compile_mods_with_random_subfolder:
+        cache_dir = os.path.join(os.getcwd(), "compiled")
+    if cache_dir:
+        targ_path = compile_mods_cached(mod_folders, cache_dir=cache_dir, flags=flags, jobs=jobs)
+        _compiled_sources[targ_path] = [os.path.abspath(m) for m in mod_folders]
+        return targ_path
+
+    targ_path = get_mod_compiled_target_path(compile_mods_with_random_subfolder=False)
 
     do_compile = True
     if os.path.exists(targ_path):
         if override:
-            print(f"Overriding existing target path: {targ_path}")
+            logger.info("Overriding existing target path: %s", targ_path)
         else:
-            print(f"Target path exists and override is False. Skipping compilation: {targ_path}")
+            logger.info("Target path exists and override is False. Skipping compilation: %s",
+                        targ_path)
             do_compile = False
 
     if do_compile:
-        comp = CompileMOD()
-        comp.compile(source_paths=mod_folders, target_path=targ_path)
+        comp = CompileMOD(flags=flags)
+        # compiled/modsNUM is shared by all processes started in the same folder
+        with file_lock(targ_path):
+            comp.compile(source_paths=mod_folders, target_path=targ_path, jobs=jobs,
+                         incremental=incremental)
+
+    _compiled_sources[targ_path] = [os.path.abspath(m) for m in mod_folders]
+    return targ_path
+
+
+def compile_mods_cached(mod_folders, cache_dir, flags="", jobs=None):
+    """
+    Compile all MOD files from the source folder(s) to the cache folder cache_dir/HASH, where HASH
+    depends on MOD sources, NEURON version and compile flags. If the folder already contains
+    compiled library - compilation is skipped.
+
+    It is safe to call it from many processes at once: the first process compiles MODs to a
+    temporary folder under the file lock and atomically renames it to cache_dir/HASH. Other
+    processes wait on the lock and then use the compiled library.
+
+    :param mod_folders:
+       Path(s) to the folders containing MOD files. Can be a single string (space-separated) or
+       a list of strings.
+    :param cache_dir:
+        Path to the folder of compiled MODs cache.
+    :param flags:
+        additional flags passed to the MOD compile command
+    :param jobs:
+        number of parallel jobs of make. Default is None, which means the default of nrnivmodl
+    :return:
+        path to the compiled MODs
+    """
+    if isinstance(mod_folders, str):
+        mod_folders = mod_folders.split(" ")
+
+    comp = CompileMOD(flags=flags)
+    targ_path = os.path.join(os.path.abspath(cache_dir), comp.get_hash(mod_folders))
+
+    # the folder appears only after the whole compilation, so no lock is required to check it
+    if comp.is_compiled(targ_path):
+        logger.info("Using cached compiled MODs: %s", targ_path)
+        return targ_path
+
+    os.makedirs(os.path.dirname(targ_path), exist_ok=True)
+    with file_lock(targ_path):
+        # other process could compile MODs while we were waiting for the lock
+        if comp.is_compiled(targ_path):
+            logger.info("Using cached compiled MODs: %s", targ_path)
+            return targ_path
+
+        tmp_path = "%s.tmp-%s" % (targ_path, os.getpid())
+        try:
+            comp.compile(source_paths=mod_folders, target_path=tmp_path, jobs=jobs)
+            # remove leftovers of the interrupted compilation (if any)
+            shutil.rmtree(targ_path, ignore_errors=True)
+            os.rename(tmp_path, targ_path)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
 
     return targ_path
 
 
-def load_mods(path: str, try_num=10, wait_in_sec=2):
+@contextmanager
+def file_lock(path: str, shared=False):
     """
+    Cross-process lock of the path, made with fcntl.flock() on the path.lock file. On systems
+    without fcntl (eg. Windows) it does nothing.
+
+    Both locks create the lock file (if it doesn't exist) and flock() it. The exclusive lock
+    removes the lock file on release, processes waiting on the removed file take the lock on
+    the new one.
+
     :param path:
-       Single string containing compiled folder (in most cases named x86_64/ on 64-bit architecture).
-    :param wait_in_sec:
-       The number of seconds to wait between retries if loading the mechanisms fails.
-       Default is 2 seconds.
-    :param try_num:
-       The number of retry attempts if loading the mechanisms fails. After `try_num` failed
-       attempts, the function will raise an error. Default is 10 attempts.
+        path to lock. It doesn't need to exist, but its parent folder must exist
+    :param shared:
+        if True - it takes shared lock (eg. for reading), which waits only for exclusive locks.
+        Otherwise it takes exclusive lock.
     """
-    # Load compiled MODS with retries
-    for attempt in range(try_num):
+    if fcntl is None:
+        yield
+        return
+
+    lock_path = "%s.lock" % path.rstrip(os.sep)
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+
+    while True:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT)
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
         try:
-            neuron.load_mechanisms(path)
-            mods_loaded.append(path)
-            print(f"Successfully loaded mechanisms from {path}")
-            break
+            # the lock file could be removed (and created again) by the previous lock holder
+            # while we were waiting, in this case the lock is on the removed file
+            if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+    try:
+        yield
+    finally:
+        if not shared:
+            os.remove(lock_path)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def load_mods(path: str, try_num=None, wait_in_sec=None):
+    """
+    Load compiled MODs into NEURON.
 
-        except Exception as e:
-            print(f"Attempt to load MODs ({attempt + 1}/{try_num}) failed: {e}")
+    If other process compiles MODs to the path (see compile_mods()) - it waits on the file lock
+    until the compilation is finished.
 
-            if attempt < try_num - 1:
-                # wait_tmp hack - to prevent race condition where all processes will wait the same anout of
-                # time and possibly block each other
-                wait_tmp = wait_in_sec + np.random.rand()
+    :param path:
+       Single string containing compiled folder (in most cases named x86_64/ on 64-bit
+       architecture).
+    :param try_num:
+       Not used. It is left for backward compatibility.
+    :param wait_in_sec:
+       Not used. It is left for backward compatibility.
+    """
+    with file_lock(path, shared=True):
+        is_loaded = neuron.load_mechanisms(path)
 
-                print(f"Retrying in {wait_tmp} seconds...")
-                time.sleep(wait_tmp)
-            else:
-                print(f"Failed to load mechanisms after {try_num} attempts.")
-                raise e
+    if not is_loaded:
+        raise RuntimeError("Failed to load mechanisms from %s" % path)
 
+    mods_loaded.append(path)
+    mod_folders_loaded.update(_compiled_sources.pop(path, []))
+    logger.info("Successfully loaded mechanisms from %s", path)
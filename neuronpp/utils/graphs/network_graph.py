@@ -2,6 +2,7 @@ import numpy as np
 from typing import List
 import matplotlib.pyplot as plt
 
+from neuronpp.core.hocwrappers.synapses.synapse_table import SynapseTable
 from neuronpp.core.populations.population import Population
 
 
@@ -76,10 +77,9 @@ class NetworkGraph:
             it will be ignored. In such case only weight from netcon will be displayed.
         """
         new_weights = []
-        for p in self.populations:
-            for c in p.cells:
-                for weight in self._get_new_weights(c, additional_weight_name):
-                    new_weights.append(weight)
+        for table, mask in self._tables:
+            weights = self._get_weights(table, additional_weight_name)[mask]
+            new_weights.extend(weights.tolist())
 
         for i, weight in enumerate(new_weights):
             self.lines[i].set_linewidth(weight)
@@ -118,6 +118,8 @@ class NetworkGraph:
 
     def _get_edges(self, additional_weight_name):
         result = []
+        # SynapseTable of each cell and mask of NetCons which source is a cell of any population
+        self._tables = []
         for population in self.populations:
             source_x_pos = self.population_names.index(population.name)
 
@@ -131,40 +133,37 @@ class NetworkGraph:
                 else:
                     self.colors.append('green')
 
-                for i, target_syn in enumerate(target_cell.syns):
-                    for nc in target_syn.netcons:
-                        source_y_pos = i
-
-                        try:
-                            target_x_pos = nc.source.parent.cell.population.name
-                        except AttributeError:
-                            # show only connections from other cells as source
-                            continue
-
-                        weight = nc.get_weight()
-                        if hasattr(target_syn.hoc, additional_weight_name):
-                            weight *= getattr(target_cell.hoc, additional_weight_name)
-
-                        target_y_pos = int(target_cell.name.split('[')[-1][:-1])
-                        xs = source_x_pos, target_x_pos
-                        ys = source_y_pos, target_y_pos
-                        result.append((xs, ys, weight))
+                table = SynapseTable(target_cell.syns)
+                # show only connections from other cells as source
+                source_populations = [self._get_source_population(nc) for nc in table.netcons]
+                mask = np.array([p is not None for p in source_populations], dtype=bool)
+                self._tables.append((table, mask))
+
+                weights = self._get_weights(table, additional_weight_name)
+                target_y_pos = int(target_cell.name.split('[')[-1][:-1])
+                for nc_i in np.flatnonzero(mask):
+                    xs = source_x_pos, source_populations[nc_i]
+                    ys = table.syn_ids[nc_i], target_y_pos
+                    result.append((xs, ys, weights[nc_i]))
         return result
 
     @staticmethod
-    def _get_new_weights(cell, additional_weight_name):
-        result = []
-        for syn in cell.syns:
-            for nc in syn.netcons:
-                try:
-                    target_x_pos = nc.source.parent.cell.population.name
-                except AttributeError:
-                    # get only connections from other cells as source
-                    continue
-
-                weight = nc.get_weight()
-                if hasattr(syn.hoc, additional_weight_name):
-                    weight *= getattr(cell.hoc, additional_weight_name)
+    def _get_source_population(nc):
+        try:
+            return nc.source.parent.cell.population.name
+        except AttributeError:
+            return None
 
-                result.append(weight)
-        return result
+    @staticmethod
+    def _get_weights(table: SynapseTable, additional_weight_name):
+        """
+        :return:
+            numpy array of weights of all NetCons in the table, multiplied by the additional
+            weight of the point process if exists
+        """
+        weights = table.get_weights()
+        factors = np.ones(len(table.synapses))
+        for syn_i, syn in enumerate(table.synapses):
+            if hasattr(syn.hoc, additional_weight_name):
+                factors[syn_i] = getattr(syn.hoc, additional_weight_name)
+        return weights * factors[table.syn_ids]
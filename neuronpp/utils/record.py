@@ -1,8 +1,8 @@
+import weakref
+
 import numpy as np
-import pandas as pd
 from neuron import h
 from nrn import Mechanism
-import matplotlib.pyplot as plt
 from typing import Union, Optional, Iterable
 from collections import defaultdict, OrderedDict
 
@@ -13,9 +13,12 @@ from neuronpp.core.hocwrappers.hoc_wrapper import HocWrapper
 
 
 class Record(NeuronRemovable):
+    DECIMATIONS = ("min", "max", "mean")
+
     def __init__(self, elements: Union[Iterable[Union[HocWrapper, Mechanism]],
                                        Union[HocWrapper, Mechanism]],
-                 variables='v'):
+                 variables='v', max_samples: Optional[int] = None,
+                 dt_record: Optional[float] = None, decimation: Optional[str] = None):
         """
         Making Record after simulation run() makes it has no effect on the current simulation.
         However it will appear in the next simulation if:
@@ -31,7 +34,49 @@ class Record(NeuronRemovable):
             which indicates first synapse of type ExpSyn.
         :param variables:
             str or list_of_str of variable names to track
+        :param max_samples:
+            if provided, Record works as a ring buffer which keeps only the last max_samples
+            samples of each variable (and time), so the memory doesn't grow during long
+            simulations. Vectors are trimmed during the simulation when they reach
+            2*max_samples samples, all outputs (as_numpy(), plot(), to_csv()) return only
+            the last max_samples samples in chronological order. Default is None, which means
+            all samples are kept.
+        :param dt_record:
+            in ms. If provided, variables are recorded at the fixed interval dt_record instead of
+            each simulation step (also for constant_timestep=False). Default is None, which means
+            that each simulation step is recorded.
+        :param decimation:
+            'min', 'max' or 'mean'. Requires dt_record. If provided, each simulation step is
+            recorded, but for each window of dt_record ms only a single value (min, max or mean
+            of the window) is kept. The mean is weighted by the duration of steps (trapezoidal
+            mean of samples of the window), so it is not biased by uneven steps of the variable
+            timestep. The time of each value is the start of the window. Windows are reduced
+            during the simulation, when the next window begins. The last (pending) window of
+            the run is reduced by flush_decimation(), which is called by as_numpy(), plot() and
+            to_csv(). If the next run continues the pending window, its value is replaced.
+            Default is None, which means no decimation.
         """
+        if max_samples is not None and max_samples < 1:
+            raise ValueError("max_samples must be a positive integer, but provided: %s"
+                             % max_samples)
+        if dt_record is not None and dt_record <= 0:
+            raise ValueError("dt_record must be > 0, but provided: %s" % dt_record)
+        if decimation is not None:
+            if decimation not in self.DECIMATIONS:
+                raise ValueError("decimation must be one of %s, but provided: %s"
+                                 % (self.DECIMATIONS, decimation))
+            if dt_record is None:
+                raise ValueError("decimation requires dt_record to be provided.")
+        self.max_samples = max_samples
+        self.dt_record = dt_record
+        self.decimation = decimation
+        self._step_callback = None
+        self._init_handler = None
+        self._raw_recs = []
+        self._raw_time = None
+        self._pending_size = None
+        self._time_cache = (None, None)
+
         if not isinstance(elements, (list, set, tuple, np.ndarray)):
             elements = [elements]
 
@@ -67,10 +112,24 @@ class Record(NeuronRemovable):
                 except AttributeError:
                     raise AttributeError("there is no attribute of %s" % var)
 
-                rec = h.Vector().record(s)
+                rec = self._record(s)
                 self.recs[var].append((name, rec))
 
-        self.time = h.Vector().record(h._ref_t)
+        self.time = self._record(h._ref_t)
+        if self.decimation is not None:
+            self._raw_time = self._raw_recs.pop()[0]
+            self._add_init_handler()
+
+        if self.max_samples is not None or self.decimation is not None:
+            self._add_step_callback()
+
+    def remove_immediate_from_neuron(self):
+        callback = getattr(self, "_step_callback", None)
+        if callback is not None:
+            h.CVode().extra_scatter_gather_remove(callback)
+            self._step_callback = None
+        self._init_handler = None
+        NeuronRemovable.remove_immediate_from_neuron(self)
 
     def plot(self, animate=False, **kwargs):
         """
@@ -88,6 +147,7 @@ class Record(NeuronRemovable):
             * position=None -> Default, each neuron has separated  axis (row) on the figure.
         :return:
         """
+        self.flush_decimation()
         if animate:
             self._plot_animate(**kwargs)
         else:
@@ -103,14 +163,17 @@ class Record(NeuronRemovable):
             * position=None -> Default, each neuron has separated  axis (row) on the figure.
         :return:
         """
+        import matplotlib.pyplot as plt
+
         for i, (var_name, variable_recs) in enumerate(self.recs.items()):
             fig = plt.figure()
 
             if position is "merge":
                 ax = fig.add_subplot(1, 1, 1)
 
+            time = self._get_window(self.time)
             for i, (segment_name, rec) in enumerate(variable_recs):
-                rec_np = rec.as_numpy()
+                rec_np = self._get_window(rec)
                 if np.max(np.isnan(rec_np)):
                     raise ValueError("Vector recorded for variable: '%s' in the segment: '%s' "
                                      "contains nan values." % (var_name, segment_name))
@@ -119,7 +182,7 @@ class Record(NeuronRemovable):
                     ax = self._get_subplot(fig=fig, var_name=var_name, position=position,
                                            row_len=len(variable_recs), index=i + 1)
                 ax.set_title("Variable: %s" % var_name)
-                ax.plot(self.time, rec, label=segment_name)
+                ax.plot(time, rec_np, label=segment_name)
                 ax.set(xlabel='t (ms)', ylabel=var_name)
                 ax.legend()
 
@@ -139,6 +202,8 @@ class Record(NeuronRemovable):
             * position=None -> Default, each neuron has separated  axis (row) on the figure.
         :return:
         """
+        import matplotlib.pyplot as plt
+
         create_fig = False
         for var_name, section_recs in self.recs.items():
             if var_name not in self.figs:
@@ -151,11 +216,11 @@ class Record(NeuronRemovable):
                 fig.canvas.draw()
                 self.figs[var_name] = fig
 
-            records = np.array([rec.as_numpy()[-steps:] for name, rec in section_recs])
+            records = np.array([self._get_window(rec)[-steps:] for name, rec in section_recs])
             names = [name for name, rec in section_recs]
             if position == "merge" and y_lim is None:
                 y_lim = records.min(), records.max()
-            current_time = self.time.as_numpy()[-steps:]
+            current_time = self._get_window(self.time)[-steps:]
 
             for i, name in enumerate(names):
                 rec = records[i]
@@ -199,6 +264,10 @@ class Record(NeuronRemovable):
         """
         Returns dictionary[variable_name][segment_name] = numpy_record
 
+        The time array of the output is read-only, since it is shared by all outputs of the
+        Record until the next step of the simulation (time is copied once, not on each call).
+        To modify time (eg. shift or normalize it) - make a copy first, eg. output.time.copy()
+
         :param variable:
             variable name. Default is None, meaning - it will take the first variable encountered
         :param segment_name:
@@ -211,7 +280,6 @@ class Record(NeuronRemovable):
         :return:
             Returns dictionary[variable_name][segment_name] = numpy_record
         """
-        result = []
         if variable is None:
             variable = list(self.recs.keys())[0]
 
@@ -224,34 +292,222 @@ class Record(NeuronRemovable):
         elif segment_name not in seg_names:
             raise NameError("Cannot find segment name: %s in variable: %s." % (seg_names, variable))
 
-        for seg_name, rec in self.recs[variable]:
-            if seg_name in segment_name:
-                result.append(np.array(rec.as_numpy()))
-
-        result = np.array(result)
-        if result.shape[0] == 1:
-            result = result[0]
+        recs = [rec for seg_name, rec in self.recs[variable] if seg_name in segment_name]
 
-        time = np.array(self.time.as_numpy())
+        self.flush_decimation()
+        # fill preallocated array directly from Vector views, without intermediate copies
+        time = self._get_time()
+        result = np.empty([len(recs), time.size])
+        for i, rec in enumerate(recs):
+            result[i] = self._get_window(rec)
 
-        if return_as_2d_array and len(result.shape) == 1:
-            result = result.reshape([1, result.size])
+        if result.shape[0] == 1 and not return_as_2d_array:
+            result = result[0]
+        elif return_as_2d_array and len(recs) == 1:
             time = time.reshape([1, time.size])
 
         return RecordOutput(variable=variable, records=result, time=time)
 
     def to_csv(self, filename):
-        cols = ['time']
-        data = [self.time.as_numpy().tolist()]
+        import pandas as pd
 
+        self.flush_decimation()
+        cols = ['time']
+        vecs = [self.time]
         for var_name, rec_data in self.recs.items():
             for sec_name, vec in rec_data:
                 cols.append(sec_name)
-                data.append(vec.as_numpy().tolist())
+                vecs.append(vec)
 
-        df = pd.DataFrame(list(zip(*data)), columns=cols)
+        data = np.empty([self._get_window(self.time).size, len(vecs)])
+        for i, vec in enumerate(vecs):
+            data[:, i] = self._get_window(vec)
+
+        df = pd.DataFrame(data, columns=cols, copy=False)
         df.to_csv(filename, index=False)
 
+    def _get_time(self) -> np.ndarray:
+        """
+        :return:
+            read-only copy of the time window, shared by all as_numpy() calls until the time
+            Vector changes (eg. after the next step of the simulation)
+        """
+        window = self._get_window(self.time)
+        key = (window.size, window[0], window[-1]) if window.size > 0 else (0,)
+        cached_key, time = self._time_cache
+        if key != cached_key:
+            time = np.array(window)
+            time.flags.writeable = False
+            self._time_cache = (key, time)
+        return time
+
+    def _get_window(self, vec) -> np.ndarray:
+        """
+        :return:
+            numpy view of the vector, only the last max_samples samples if max_samples is set
+        """
+        arr = vec.as_numpy()
+        if self.max_samples is not None:
+            arr = arr[-self.max_samples:]
+        return arr
+
+    def _record(self, ref):
+        """
+        :return:
+            Vector recording the reference. If decimation is set - it is an output Vector of
+            decimated values, while the reference is recorded by the raw Vector in _raw_recs
+        """
+        if self.decimation is not None:
+            raw = h.Vector().record(ref)
+            rec = h.Vector()
+            self._raw_recs.append((raw, rec))
+        elif self.dt_record is not None:
+            rec = h.Vector().record(ref, self.dt_record)
+        else:
+            rec = h.Vector().record(ref)
+        return rec
+
+    def _add_init_handler(self):
+        """
+        Clear decimated Vectors on h.finitialize(), like NEURON clears recording Vectors.
+        """
+        ref = weakref.ref(self)
+
+        def callback():
+            record = ref()
+            if record is not None:
+                record.time.resize(0)
+                for raw, rec in record._raw_recs:
+                    rec.resize(0)
+                record._pending_size = None
+
+        self._init_handler = h.FInitializeHandler(callback)
+
+    def _add_step_callback(self):
+        """
+        Register the callback called by NEURON after each step of the simulation. The callback
+        holds only a weak reference to the Record.
+        """
+        ref = weakref.ref(self)
+
+        def callback():
+            record = ref()
+            if record is not None:
+                record._on_step()
+
+        h.CVode().extra_scatter_gather(0, callback)
+        self._step_callback = callback
+
+    def _on_step(self):
+        if self.decimation is not None:
+            self._decimate()
+        if self.max_samples is not None:
+            self._trim()
+
+    def flush_decimation(self):
+        """
+        Reduce raw values of all windows of the decimated Record recorded so far and append them
+        to the output Vectors, so outputs contain all windows of the run. Raw values of the
+        last (pending) window are kept, so if the next run continues the window - its value will
+        be replaced by the value of the whole window. A window which has only its first sample
+        (eg. the last sample of the run on the window boundary) covers no time yet, so it stays
+        pending.
+
+        It does nothing if the Record has no decimation.
+        """
+        if self.decimation is None:
+            return
+        self._decimate()
+        raw_time = self._raw_time.as_numpy()
+        if raw_time.size < 2:
+            return
+        window = np.floor(raw_time[0] / self.dt_record + 1e-6)
+        starts = np.array([0])
+
+        self._append(self.time, np.array([window * self.dt_record]))
+        for raw, rec in self._raw_recs:
+            self._append(rec, self._reduce(raw.as_numpy(), raw_time, starts))
+        self._pending_size = int(self.time.size())
+
+    def _drop_pending(self):
+        """
+        Remove the value of the pending window appended by flush_decimation() from the output
+        Vectors, unless they were cleared or streamed in the meantime.
+        """
+        if self._pending_size is None:
+            return
+        if int(self.time.size()) == self._pending_size:
+            last = self._pending_size - 1
+            self.time.resize(last)
+            for raw, rec in self._raw_recs:
+                rec.resize(last)
+        self._pending_size = None
+
+    def _decimate(self):
+        """
+        Reduce raw values of all completed windows to a single value per window and append it
+        to the output Vectors. Reduced values are removed from raw Vectors.
+        """
+        raw_time = self._raw_time.as_numpy()
+        if self._pending_size is not None and raw_time.size > 0:
+            # new raw values arrived, so the pending window may have changed
+            self._drop_pending()
+        if raw_time.size == 0:
+            return
+        windows = np.floor(raw_time / self.dt_record + 1e-6)
+        # the window of the last sample is not completed yet
+        completed = np.searchsorted(windows, windows[-1], side="left")
+        if completed == 0:
+            return
+        windows = windows[:completed]
+        starts = np.flatnonzero(np.r_[True, windows[1:] != windows[:-1]])
+
+        self._append(self.time, windows[starts] * self.dt_record)
+        for raw, rec in self._raw_recs:
+            self._append(rec, self._reduce(raw.as_numpy()[:completed], raw_time[:completed],
+                                           starts))
+            raw.remove(0, completed - 1)
+        self._raw_time.remove(0, completed - 1)
+
+    def _reduce(self, values: np.ndarray, time: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        if self.decimation == "min":
+            return np.minimum.reduceat(values, starts)
+        elif self.decimation == "max":
+            return np.maximum.reduceat(values, starts)
+        else:
+            # trapezoidal mean weighted by the duration of steps, since steps of the variable
+            # timestep are uneven. Steps between windows are not included.
+            durations = np.diff(time)
+            areas = np.r_[0, np.cumsum((values[1:] + values[:-1]) / 2 * durations)]
+            total = np.r_[0, np.cumsum(durations)]
+            ends = np.r_[starts[1:], values.size] - 1
+            area = areas[ends] - areas[starts]
+            duration = total[ends] - total[starts]
+            # a window with a single sample has no duration, its mean is the sample
+            mean = values[starts].astype(float)
+            np.divide(area, duration, out=mean, where=duration > 0)
+            return mean
+
+    @staticmethod
+    def _append(vec, values: np.ndarray):
+        size = int(vec.size())
+        vec.resize(size + values.size)
+        vec.as_numpy()[size:] = values
+
+    def _trim(self):
+        """
+        Trim vectors to the last max_samples samples when they reach 2*max_samples samples.
+        """
+        size = int(self.time.size())
+        if size >= 2 * self.max_samples:
+            last = size - self.max_samples - 1
+            if self._pending_size is not None:
+                self._pending_size -= last + 1
+            self.time.remove(0, last)
+            for variable_recs in self.recs.values():
+                for name, rec in variable_recs:
+                    rec.remove(0, last)
+
     @staticmethod
     def _get_subplot(fig, var_name, position, row_len=1, index=1):
         if position is None:
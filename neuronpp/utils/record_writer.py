@@ -0,0 +1,186 @@
+import math
+import weakref
+from typing import Optional
+
+import numpy as np
+from neuron import h
+
+from neuronpp.utils.record import Record
+from neuronpp.core.neuron_removable import NeuronRemovable
+
+
+class RecordWriter(NeuronRemovable):
+    BACKENDS = ("hdf5", "zarr")
+
+    def __init__(self, record: Record, path: str, flush_every: float = 100,
+                 backend: Optional[str] = None):
+        """
+        Streams recorded values of the Record to the chunked on-disk store (HDF5 or Zarr) during
+        the simulation.
+
+        Every flush_every ms of the simulation time all vectors of the Record (including time)
+        are appended to the store and cleared, so the memory used by the Record doesn't grow
+        during long simulations. Flushes are made after the simulation step which reaches the
+        flush time, so they don't depend on the stepsize of Simulation.run().
+
+        After the flush, Record.as_numpy() returns only values recorded since the last flush.
+        Call close() (or flush()) after the simulation to write the remaining values. Bear in mind
+        that h.finitialize() (eg. Simulation.reinit()) clears vectors of the Record, so values not
+        flushed before are lost.
+
+        Structure of the store:
+            * time - time (in ms)
+            * VARIABLE/SEGMENT_NAME - recorded values, eg. 'v/Cell[cell].soma(0.5)'
+
+        Requires h5py (for hdf5) or zarr (for zarr) to be installed.
+
+        :param record:
+            Record object to stream. It can't be a ring buffer Record (with max_samples)
+        :param path:
+            path to the file (hdf5) or the directory (zarr). Existing store will be overwritten
+        :param flush_every:
+            in ms (simulation time). Default is 100 ms
+        :param backend:
+            'hdf5' or 'zarr'. Default is None, which means 'zarr' if the path ends with '.zarr'
+            and 'hdf5' otherwise
+        """
+        if backend is None:
+            backend = "zarr" if path.rstrip("/").endswith(".zarr") else "hdf5"
+        if backend not in self.BACKENDS:
+            raise ValueError("backend must be one of %s, but provided: %s"
+                             % (self.BACKENDS, backend))
+        if flush_every <= 0:
+            raise ValueError("flush_every must be > 0, but provided: %s" % flush_every)
+        if record.max_samples is not None:
+            raise ValueError("Can't stream a ring buffer Record (with max_samples).")
+
+        self.record = record
+        self.path = path
+        self.backend = backend
+        self.flush_every = flush_every
+        self.samples = 0
+
+        self._vectors = [("time", record.time)]
+        for var_name, variable_recs in record.recs.items():
+            for segment_name, vec in variable_recs:
+                name = "%s/%s" % (var_name, segment_name.replace("/", "_"))
+                self._vectors.append((name, vec))
+
+        if backend == "hdf5":
+            self._store = _Hdf5Store(path)
+        else:
+            self._store = _ZarrStore(path)
+
+        self._next_flush = self._get_next_flush(h.t)
+        self._step_callback = None
+        self._add_step_callback()
+
+    def flush(self):
+        """
+        Append all values recorded since the last flush to the store and clear vectors of the
+        Record. The pending window of the decimated Record is not flushed, since its value may
+        change during the next steps.
+        """
+        self.record._drop_pending()
+        self._write()
+
+    def close(self):
+        """
+        Flush remaining values (including the last window of the decimated Record), stop
+        streaming and close the store.
+        """
+        if self._store is None:
+            return
+        self._remove_step_callback()
+        self.record.flush_decimation()
+        self._write()
+        self._store.close()
+        self._store = None
+
+    def _write(self):
+        size = int(self.record.time.size())
+        if size == 0:
+            return
+        for name, vec in self._vectors:
+            self._store.append(name, vec.as_numpy())
+        for name, vec in self._vectors:
+            vec.resize(0)
+        self.samples += size
+
+    def remove_immediate_from_neuron(self):
+        if getattr(self, "_store", None) is not None:
+            self.close()
+        NeuronRemovable.remove_immediate_from_neuron(self)
+
+    def _get_next_flush(self, t: float) -> float:
+        return (math.floor(t / self.flush_every) + 1) * self.flush_every
+
+    def _add_step_callback(self):
+        """
+        Register the callback called by NEURON after each step of the simulation. The callback
+        holds only a weak reference to the RecordWriter.
+        """
+        ref = weakref.ref(self)
+
+        def callback():
+            writer = ref()
+            if writer is not None:
+                writer._on_step()
+
+        h.CVode().extra_scatter_gather(0, callback)
+        self._step_callback = callback
+
+    def _remove_step_callback(self):
+        if self._step_callback is not None:
+            h.CVode().extra_scatter_gather_remove(self._step_callback)
+            self._step_callback = None
+
+    def _on_step(self):
+        # half of dt compensates the floating point error of the accumulated time
+        t = h.t + h.dt / 2
+        if t >= self._next_flush:
+            self.flush()
+            self._next_flush = self._get_next_flush(t)
+        elif h.t < self._next_flush - self.flush_every:
+            # time went back after h.finitialize()
+            self._next_flush = self._get_next_flush(t)
+
+
+class _Hdf5Store:
+    def __init__(self, path: str):
+        import h5py
+        self.file = h5py.File(path, "w")
+
+    def append(self, name: str, data: np.ndarray):
+        dataset = self.file.get(name)
+        if dataset is None:
+            self.file.create_dataset(name, data=data, maxshape=(None,),
+                                     chunks=(max(data.size, 1),))
+        else:
+            start = dataset.shape[0]
+            dataset.resize((start + data.size,))
+            dataset[start:] = data
+
+    def close(self):
+        self.file.close()
+
+
+class _ZarrStore:
+    def __init__(self, path: str):
+        import zarr
+        self.group = zarr.open_group(path, mode="w")
+        self.arrays = {}
+
+    def append(self, name: str, data: np.ndarray):
+        array = self.arrays.get(name)
+        if array is None:
+            array = self.group.zeros(name=name, shape=(0,), chunks=(max(data.size, 1),),
+                                     dtype=data.dtype)
+            self.arrays[name] = array
+        array.append(data)
+
+    def close(self):
+        self.arrays = {}
+        close = getattr(self.group.store, "close", None)
+        if close is not None:
+            close()
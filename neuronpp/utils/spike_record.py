@@ -0,0 +1,126 @@
+import weakref
+from typing import List, Tuple
+
+import numpy as np
+from neuron import h
+
+from neuronpp.core.cells.netcon_cell import NetConCell
+from neuronpp.core.decorators import non_removable_fields
+from neuronpp.core.neuron_removable import NeuronRemovable
+
+
+@non_removable_fields("cells")
+class SpikeRecord(NeuronRemovable):
+    def __init__(self, cells: List[NetConCell], sec_name="soma", loc=0.5, threshold=10):
+        """
+        Records spikes of all cells in a single pair of Vectors (spike times and gids) with
+        NEURON's ParallelContext.spike_record(), instead of a separated Vector for each cell.
+
+        Each cell gets a unique gid (global id of the ParallelContext) assigned to its spike
+        detector. If the cell has no spike detector - it will be created on the sec_name(loc)
+        segment (see NetConCell.make_spike_detector()). New gids are the lowest gids not used
+        in the ParallelContext. NEURON can't release a single gid, so the cell keeps its gid
+        after remove_immediate_from_neuron() of the SpikeRecord and reuses it when it is
+        recorded again. The gid is released by NEURON when the cell is removed.
+
+        NEURON keeps a single spike Vector for each spike detector, so while the cell is
+        recorded by the SpikeRecord, cell.spikes() returns spikes from the SpikeRecord.
+        After remove_immediate_from_neuron() of the SpikeRecord the cell's own Vector is
+        restored and Vectors of the SpikeRecord no longer record spikes.
+
+        Like other Vectors, recorded spikes are cleared on h.finitialize().
+
+        :param cells:
+            list of cells to record
+        :param sec_name:
+            name of the section for the spike detector (if the cell has no detector)
+        :param loc:
+            location on the section for the spike detector (if the cell has no detector)
+        :param threshold:
+            mV threshold of the spike detector (if the cell has no detector)
+        """
+        self.cells = list(cells)
+        pc = h.ParallelContext()
+
+        gids = []
+        free_gid = 0
+        for cell in self.cells:
+            if cell._spike_record is not None:
+                raise RuntimeError("Spikes of the cell %s are recorded already by another "
+                                   "SpikeRecord." % cell.name)
+            if cell._spike_detector is None:
+                seg = cell.filter_secs(sec_name, as_list=True)[0](loc)
+                cell.make_spike_detector(seg=seg, threshold=threshold)
+
+            gid = cell._spike_gid
+            if gid is None or not pc.gid_exists(gid):
+                gid = free_gid = self._get_free_gid(pc, free_gid)
+                pc.set_gid2node(gid, pc.id())
+                pc.cell(gid, cell.get_spike_detector().hoc)
+                cell._spike_gid = gid
+            cell._spike_record = (weakref.ref(self), gid)
+            gids.append(gid)
+
+        self.gids = np.array(gids, dtype=int)
+        # sorted gids map recorded gids to cells by binary search
+        self._gids_order = np.argsort(self.gids, kind="stable")
+        self._sorted_gids = self.gids[self._gids_order]
+        self.time = h.Vector()
+        self.ids = h.Vector()
+        # a gid Vector (not -1 for all gids) so many SpikeRecords can record at the same time
+        pc.spike_record(h.Vector(self.gids.astype(float)), self.time, self.ids)
+
+    def as_numpy(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return:
+            tuple of flat numpy arrays (spike_times, cell_ids) in the order of spikes, where
+            cell_ids are indices of cells in the cells list
+        """
+        time = np.array(self.time.as_numpy())
+        index = np.searchsorted(self._sorted_gids, self.ids.as_numpy().astype(int))
+        cell_ids = self._gids_order[index]
+        return time, cell_ids
+
+    def spikes_per_cell(self) -> List[np.ndarray]:
+        """
+        :return:
+            list of numpy arrays of spike times (in ms), one array for each cell in the order
+            of the cells list
+        """
+        time, cell_ids = self.as_numpy()
+        order = np.argsort(cell_ids, kind="stable")
+        counts = np.bincount(cell_ids, minlength=len(self.cells))
+        return np.split(time[order], np.cumsum(counts)[:-1])
+
+    def get_spikes(self, gid: int) -> np.ndarray:
+        """
+        :param gid:
+            gid of the cell
+        :return:
+            numpy array of spike times (in ms) of the cell
+        """
+        return self.time.as_numpy()[self.ids.as_numpy() == gid]
+
+    def remove_immediate_from_neuron(self):
+        for cell in getattr(self, "cells", []):
+            spike_detector = getattr(cell, "_spike_detector", None)
+            if spike_detector is None:
+                continue
+            cell._spike_record = None
+            # NEURON keeps a single spike Vector for each spike detector, so recording to the
+            # cell's Vector unregisters the Vectors of the SpikeRecord
+            nc, vector = spike_detector
+            if nc.hoc is not None:
+                nc.hoc.record(vector)
+        self.cells = []
+        NeuronRemovable.remove_immediate_from_neuron(self)
+
+    @staticmethod
+    def _get_free_gid(pc, gid=0) -> int:
+        """
+        :return:
+            the lowest gid >= gid which is not used in the ParallelContext
+        """
+        while pc.gid_exists(gid):
+            gid += 1
+        return gid
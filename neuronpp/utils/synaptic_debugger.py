@@ -7,7 +7,7 @@ from neuronpp.core.hocwrappers.seg import Seg
 from neuronpp.utils.simulation import Simulation
 from neuronpp.core.hocwrappers.netcon import NetCon
 from neuronpp.core.hocwrappers.synapses.synapse import Synapse
-from neuronpp.utils.utils import key_release_listener, KEY_LISTENER_IMPORTED
+from neuronpp.utils.utils import key_release_listener, get_key_listener
 
 
 class SynapticDebugger(NeuronRemovable):
@@ -117,12 +117,8 @@ class SynapticDebugger(NeuronRemovable):
             in ms
         :return:
         """
-        if not KEY_LISTENER_IMPORTED:
-            raise ImportError("Interactive debugging won't work due to import error related to:"
-                              " pynput.keyboard.Listener.\n"
-                              "Do not use Interactive debugging unless you fix this issue.\n"
-                              "Bear in mind that Interactive debugging requires a machine with a "
-                              "display. Interactive debugging won't work no the server.")
+        # raises ImportError if the key listener can't be used, before warmup of the simulation
+        get_key_listener()
 
         self.warmup()
         keys = ['']
@@ -3,17 +3,6 @@ import os
 from neuron import h
 from typing import cast
 from threading import Thread
-from Xlib.error import DisplayConnectionError
-
-from pyvis.network import Network
-try:
-    from pynput.keyboard import Listener
-    KEY_LISTENER_IMPORTED = True
-
-except DisplayConnectionError as e:
-    print("Warning: key listeners and interactive debugging (on key press) won't work "
-          "due to the error: %s" % str(e))
-    KEY_LISTENER_IMPORTED = False
 
 from neuronpp.core.hocwrappers.seg import Seg
 from neuronpp.core.hocwrappers.netcon import NetCon
@@ -99,6 +88,8 @@ def show_connectivity_graph(cells, result_folder=None, file_name="conectivity_gr
     :param node_distance:
     :param spring_strength:
     """
+    from pyvis.network import Network
+
     g = Network(height=height, width=width, bgcolor=bgcolor, font_color=font_color, directed=True)
     nodes = []
     for c in cells:
@@ -160,6 +151,8 @@ def key_release_listener(on_press_func):
     :return:
     """
 
+    Listener = get_key_listener()
+
     def final_func(key):
         if key is not None and hasattr(key, 'char'):
             on_press_func(key.char)
@@ -170,3 +163,23 @@ def key_release_listener(on_press_func):
 
     listenThread = Thread(target=listen)
     listenThread.start()
+
+
+def get_key_listener():
+    """
+    Import keyboard Listener from pynput. It is imported only when needed, since importing pynput
+    connects to the display (X11), which is slow and fails on machines without a display.
+
+    :return:
+        pynput.keyboard.Listener class
+    :raises ImportError:
+        if pynput can't be imported (eg. there is no display)
+    """
+    try:
+        from pynput.keyboard import Listener
+    except Exception as e:
+        raise ImportError("Key listeners and interactive debugging (on key press) won't work "
+                          "due to the error related to pynput.keyboard.Listener: %s\n"
+                          "Bear in mind that Interactive debugging requires a machine with a "
+                          "display. Interactive debugging won't work on the server." % e) from e
+    return Listener